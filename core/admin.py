@@ -26,8 +26,8 @@ class ProductoAdmin(admin.ModelAdmin):
     search_fields = ("codigo", "codigo_barras", "tipo")
 
 class TareaLogisticaAdmin(admin.ModelAdmin):
-    list_display = ("id", "tipo", "estado", "prioridad", "fecha_asignacion", "fecha_fin")
-    list_filter = ("estado", "prioridad")
+    list_display = ("id", "tipo", "estado", "prioridad", "bodega", "fecha_asignacion", "vence_reclamo", "fecha_fin")
+    list_filter = ("estado", "prioridad", "bodega")
     search_fields = ("tipo", "estado")
 
 class TrabajadorBaseAdmin(admin.ModelAdmin):
@@ -44,9 +44,21 @@ class ClienteAdmin(admin.ModelAdmin):
     search_fields = ("nombre",)
 
 class EstadoPedidoAdmin(admin.ModelAdmin):
-    list_display = ("id", "nombre")
+    """Historial de solo lectura: los estados se agregan con pedido_service.cambiar_estado,
+    que mantiene Pedido.estado_actual y respeta el grafo de transiciones."""
+    list_display = ("id", "pedido", "nombre", "fecha_hora", "asignado")
+    list_filter = ("nombre",)
     search_fields = ("nombre",)
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 class ProductoPedidoAdmin(admin.ModelAdmin):
     list_display = ("id", "pedido", "producto", "cantidad", "precio_unitario", "subtotal")
     list_filter = ("pedido",)
@@ -72,9 +84,14 @@ class DireccionAdmin(admin.ModelAdmin):
     list_filter = ("tipo", "pais")
 
 class PedidoAdmin(admin.ModelAdmin):
-    list_display = ("id", "precio_calculado", "cliente", "direccion")
+    list_display = ("id", "precio_calculado", "cliente", "direccion", "estado_actual")
     list_filter = ("cliente",)
     search_fields = ("cliente__nombre",)
+    readonly_fields = ("estado_actual", "fecha_estado")
+
+class ResumenStockAdmin(admin.ModelAdmin):
+    list_display = ("id", "total_disponible", "total_reservado", "registros", "stockouts", "ultima_actualizacion")
+    readonly_fields = ("total_disponible", "total_reservado", "registros", "stockouts", "ultima_actualizacion")
 
 # Registro de modelos
 safe_register(models.Bodega, BodegaAdmin)
@@ -98,3 +115,5 @@ safe_register(models.Ubicacion, UbicacionAdmin)
 safe_register(models.Evidencia, EvidenciaAdmin)
 safe_register(models.Direccion, DireccionAdmin)
 safe_register(models.Pedido, PedidoAdmin)
+safe_register(models.ResumenStockBodega, ResumenStockAdmin)
+safe_register(models.ResumenStockProducto, ResumenStockAdmin)
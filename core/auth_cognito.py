@@ -1,29 +1,151 @@
+import hashlib
 import json
+import threading
+import time
 import urllib.request
+from collections import OrderedDict
 from jose import jwt
 from django.conf import settings
+from django.utils.module_loading import import_string
 
 COGNITO_POOL_ID = settings.COGNITO_USER_POOL_ID
 COGNITO_REGION = settings.COGNITO_REGION
 COGNITO_APP_CLIENT_ID = settings.COGNITO_APP_CLIENT_ID
 
 JWKS_URL = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_POOL_ID}/.well-known/jwks.json"
+ISSUER = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_POOL_ID}"
 
-_jwks = None
+# Seconds a downloaded key set is trusted before it is fetched again (key rotation)
+JWKS_TTL = getattr(settings, "COGNITO_JWKS_TTL", 3600)
+# Minimum seconds between refreshes triggered by an unknown kid or a failed fetch
+JWKS_REFRESCO_MINIMO = getattr(settings, "COGNITO_JWKS_REFRESCO_MINIMO", 30)
+# Maximum number of verified tokens remembered
+TOKENS_CACHE_MAX = getattr(settings, "COGNITO_TOKENS_CACHE_MAX", 4096)
 
-def get_jwks():
+
+def fetch_jwks():
+    """Default JWKS source: download the Cognito user pool key set."""
+    with urllib.request.urlopen(JWKS_URL, timeout=5) as f:
+        return json.loads(f.read().decode("utf-8"))
+
+
+class JWKSCache:
+    """
+    kid-indexed key set with TTL refresh and refresh-on-unknown-kid.
+    Refreshes are single-flight: threads that ask while a fetch is running wait for it
+    and reuse its result instead of hitting the endpoint again.
+    """
+
+    def __init__(self, fuente=fetch_jwks, ttl=JWKS_TTL, refresco_minimo=JWKS_REFRESCO_MINIMO, reloj=time.monotonic):
+        self.fuente = fuente
+        self.ttl = ttl
+        self.refresco_minimo = refresco_minimo
+        self.reloj = reloj
+        self._claves = {}
+        self._cargado_en = None
+        self._lock = threading.Lock()
+
+    def _refrescar(self, visto_en):
+        with self._lock:
+            if self._cargado_en is not None and (visto_en is None or self._cargado_en > visto_en):
+                return  # another thread refreshed while we waited
+            try:
+                jwks = self.fuente()
+            except Exception:
+                if not self._claves:
+                    raise
+                # keep serving the keys we have and retry after refresco_minimo
+                self._cargado_en = self.reloj() - self.ttl + self.refresco_minimo
+                return
+            self._claves = {k["kid"]: k for k in jwks.get("keys", [])}
+            self._cargado_en = self.reloj()
+
+    def _asegurar_vigente(self):
+        visto_en = self._cargado_en
+        if visto_en is None or self.reloj() - visto_en >= self.ttl:
+            self._refrescar(visto_en)
+
+    def obtener(self, kid):
+        """Return the JWK for `kid`, refreshing once if it is unknown, or None."""
+        self._asegurar_vigente()
+        clave = self._claves.get(kid)
+        visto_en = self._cargado_en
+        if clave is None and self.reloj() - visto_en >= self.refresco_minimo:
+            self._refrescar(visto_en)
+            clave = self._claves.get(kid)
+        return clave
+
+    def jwks(self):
+        self._asegurar_vigente()
+        return {"keys": list(self._claves.values())}
+
+
+class TokensVerificados:
+    """LRU of sha256(token) -> claims for tokens that already passed verification.
+    Entries expire at the token's `exp` claim."""
+
+    def __init__(self, maximo=TOKENS_CACHE_MAX, reloj=time.time):
+        self.maximo = maximo
+        self.reloj = reloj
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def obtener(self, token):
+        digest = self._digest(token)
+        with self._lock:
+            item = self._datos.get(digest)
+            if item is None:
+                return None
+            claims, exp = item
+            if exp <= self.reloj():
+                del self._datos[digest]
+                return None
+            self._datos.move_to_end(digest)
+        return dict(claims)
+
+    def guardar(self, token, claims):
+        exp = claims.get("exp")
+        if not exp:
+            return
+        digest = self._digest(token)
+        with self._lock:
+            self._datos[digest] = (dict(claims), exp)
+            self._datos.move_to_end(digest)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+_fuente = getattr(settings, "COGNITO_JWKS_FUENTE", None)
+_jwks = JWKSCache(import_string(_fuente) if _fuente else fetch_jwks)
+_tokens = TokensVerificados()
+
+
+def configurar_fuente_jwks(fuente, **opciones):
+    """Replace the JWKS source (any callable returning a JWKS dict), e.g. a local key set."""
     global _jwks
-    if _jwks is None:
-        with urllib.request.urlopen(JWKS_URL) as f:
-            _jwks = json.loads(f.read().decode("utf-8"))
-    return _jwks
+    _jwks = JWKSCache(fuente, **opciones)
+    _tokens.limpiar()
+
+
+def get_jwks():
+    return _jwks.jwks()
+
 
 def verify_cognito_token(token: str):
-    jwks = get_jwks()
-    headers = jwt.get_unverified_header(token)
-    kid = headers["kid"]
+    claims = _tokens.obtener(token)
+    if claims is not None:
+        return claims
 
-    key = next((k for k in jwks["keys"] if k["kid"] == kid), None)
+    headers = jwt.get_unverified_header(token)
+    key = _jwks.obtener(headers["kid"])
     if key is None:
         raise ValueError("No matching JWK")
 
@@ -32,7 +154,8 @@ def verify_cognito_token(token: str):
         key,
         algorithms=[key["alg"]],
         audience=COGNITO_APP_CLIENT_ID,
-        issuer=f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_POOL_ID}",
+        issuer=ISSUER,
     )
 
+    _tokens.guardar(token, claims)
     return claims
@@ -1,6 +1,10 @@
 from functools import wraps
-from django.http import JsonResponse
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from core.auth_cognito import verify_cognito_token
+from core.services import cache_service, idempotencia_service, nonce_service
 
 def require_auth(required_role=None):
     def wrapper(func):
@@ -28,3 +32,164 @@ def require_auth(required_role=None):
             return func(request, *args, **kwargs)
         return decorated
     return wrapper
+
+
+def _buscar_en_cache(request, espacios, nombre):
+    """(clave, etag, respuesta guardada o 304) de una petición GET de dashboard."""
+    alcance = request.GET.get('bodega_id') or cache_service.GLOBAL
+    versiones = cache_service.versiones(espacios, alcance)
+    clave = cache_service.clave_respuesta(nombre, request.GET, versiones)
+    etag = quote_etag(clave.rsplit(':', 1)[-1])
+
+    # el ETag solo vale mientras su respuesta siga guardada: expirada (o expulsada) se
+    # recalcula, así DASHBOARD_CACHE_TIMEOUT también acota lo que ve un cliente con 304
+    guardada = cache_service.obtener_respuesta(clave)
+    if guardada is None:
+        return clave, etag, None
+    if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return clave, etag, HttpResponseNotModified()
+    contenido, content_type = guardada
+    return clave, etag, HttpResponse(contenido, content_type=content_type)
+
+
+def _cerrar_respuesta(response, clave, etag, nueva):
+    if nueva:
+        if response.status_code != 200:
+            return response
+        cache_service.guardar_respuesta(clave, response.content, response['Content-Type'])
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def cache_dashboard(*espacios):
+    """Cachea respuestas GET 200 por endpoint, query string y versión de los `espacios`
+    (ver core.services.cache_service). Responde 304 a If-None-Match sin tocar la base de
+    datos mientras la respuesta siga en el cache. Lo calculado respecto de now() debe
+    incluir un espacio de tiempo (cache_service.DIA) para no servirse de un día a otro.
+    Funciona igual sobre vistas async (el cache se consulta en un hilo, por si su backend
+    es de red); vistas sync y async del mismo nombre comparten las respuestas guardadas.
+    """
+    def wrapper(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def adecorated(request, *args, **kwargs):
+                if request.method != 'GET':
+                    return await func(request, *args, **kwargs)
+                clave, etag, response = await sync_to_async(_buscar_en_cache)(request, espacios, func.__name__)
+                if response is not None:
+                    return _cerrar_respuesta(response, clave, etag, nueva=False)
+                response = await func(request, *args, **kwargs)
+                return await sync_to_async(_cerrar_respuesta)(response, clave, etag, nueva=True)
+            return adecorated
+
+        @wraps(func)
+        def decorated(request, *args, **kwargs):
+            if request.method != 'GET':
+                return func(request, *args, **kwargs)
+            clave, etag, response = _buscar_en_cache(request, espacios, func.__name__)
+            nueva = response is None
+            if nueva:
+                response = func(request, *args, **kwargs)
+            return _cerrar_respuesta(response, clave, etag, nueva)
+        return decorated
+    return wrapper
+
+def anti_replay(idempotente=True):
+    """Rechaza peticiones firmadas repetidas. El cliente envía `nonce` (único por petición)
+    y `timestamp` (segundos Unix) junto al hash, y ambos entran en el mensaje firmado
+    (ver nonce_service.campos_firmados), así que no se pueden cambiar sin invalidar el HMAC.
+
+    Un nonce ya usado en este endpoint recibe 409, salvo en modo `idempotente`: si la
+    primera petición respondió 2xx y la repetición trae el mismo hash, se devuelve esa
+    respuesta sin volver a procesarla. Las respuestas de error no consumen el nonce
+    (incluye las de firma inválida, así una petición falsa no lo bloquea). Si el almacén
+    no tiene lugar para un nonce más, 503 en vez de olvidar uno vigente.
+    """
+    def wrapper(func):
+        @wraps(func)
+        def decorated(request, *args, **kwargs):
+            campos = nonce_service.campos(request)
+            if not any(campos.values()) and not nonce_service.requerido():
+                return func(request, *args, **kwargs)
+
+            error = nonce_service.validar(campos['nonce'], campos['timestamp'])
+            if error:
+                return JsonResponse({'success': False, 'error': error}, status=400)
+
+            almacen = nonce_service.almacen()
+            clave = nonce_service.clave(func.__name__, campos['nonce'])
+            firma = request.POST.get('hash') or request.GET.get('hash')
+            previa = almacen.reservar(clave, nonce_service.ttl())
+            if previa == nonce_service.LLENO:
+                return JsonResponse({'success': False, 'error': 'Too many recent requests, retry later'},
+                                    status=503)
+            if previa is not None:
+                if previa == nonce_service.EN_PROCESO:
+                    return JsonResponse({'success': False, 'error': 'Request with this nonce in progress'}, status=409)
+                firma_previa, contenido, status, content_type = previa
+                if not idempotente or firma_previa != firma:
+                    return JsonResponse({'success': False, 'error': 'Nonce already used'}, status=409)
+                response = HttpResponse(contenido, status=status, content_type=content_type)
+                response['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = func(request, *args, **kwargs)
+            except BaseException:
+                almacen.liberar(clave)
+                raise
+            if 200 <= response.status_code < 300:
+                almacen.guardar(clave, (firma, response.content, response.status_code, response['Content-Type']),
+                                nonce_service.ttl())
+            else:
+                almacen.liberar(clave)
+            return response
+        return decorated
+    return wrapper
+
+
+def idempotency_key(func):
+    """Contrato del header Idempotency-Key: la primera petición con una clave se procesa y,
+    si responde 2xx, su respuesta se guarda (tabla RespuestaIdempotente, IDEMPOTENCY_TTL).
+    Las repeticiones con la misma clave y parámetros reciben esa respuesta sin llegar a la
+    vista; con otros parámetros, 422; mientras la primera sigue en curso, 409. Una
+    respuesta de error libera la clave para reintentar. Sin el header no cambia nada.
+
+    Las claves son por cliente (idempotencia_service.cliente) y los parámetros comparados
+    incluyen la firma: la respuesta solo se devuelve a una copia exacta de una petición
+    cuyo HMAC la vista ya verificó; cualquier otra pasa por anti_replay y la vista.
+    """
+    @wraps(func)
+    def decorated(request, *args, **kwargs):
+        clave = request.headers.get('Idempotency-Key')
+        if clave is None:
+            return func(request, *args, **kwargs)
+        if not clave or len(clave) > idempotencia_service.LARGO_MAXIMO_CLAVE:
+            return JsonResponse({'success': False, 'error': 'Invalid Idempotency-Key'}, status=400)
+
+        resultado, registro = idempotencia_service.iniciar(
+            func.__name__, idempotencia_service.cliente(request), clave, idempotencia_service.huella(request))
+        if resultado == idempotencia_service.REPETIDA:
+            response = HttpResponse(bytes(registro.contenido), status=registro.status_code,
+                                    content_type=registro.content_type)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        if resultado == idempotencia_service.EN_PROCESO:
+            return JsonResponse({'success': False, 'error': 'Request with this Idempotency-Key in progress'},
+                                status=409)
+        if resultado == idempotencia_service.OTRA_PETICION:
+            return JsonResponse({'success': False, 'error': 'Idempotency-Key reused with different parameters'},
+                                status=422)
+
+        try:
+            response = func(request, *args, **kwargs)
+        except BaseException:
+            idempotencia_service.descartar(registro)
+            raise
+        if 200 <= response.status_code < 300:
+            idempotencia_service.completar(registro, response)
+        else:
+            idempotencia_service.descartar(registro)
+        return response
+    return decorated
@@ -0,0 +1,72 @@
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.db import connection
+from jose import jwk
+
+
+@contextmanager
+def base_temporal(verbosity=0, en_archivo=False):
+    """Ejecuta el bloque sobre una base de datos de prueba (creada y migrada, luego destruida),
+    para que los benchmarks nunca escriban en la base configurada.
+
+    Con `en_archivo`, en SQLite la base de prueba es un archivo temporal en vez de la base
+    en memoria compartida, sobre la que dos hilos escribiendo a la vez fallan con "table
+    is locked" en vez de esperar el lock de escritura como lo harían dos procesos.
+    """
+    nombre = connection.settings_dict['NAME']
+    prueba = connection.settings_dict['TEST']
+    nombre_prueba = prueba.get('NAME')
+    directorio = None
+    if en_archivo and connection.vendor == 'sqlite':
+        directorio = tempfile.mkdtemp()
+        prueba['NAME'] = os.path.join(directorio, 'bench.sqlite3')
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nombre, verbosity=verbosity)
+        if directorio:
+            prueba['NAME'] = nombre_prueba
+            shutil.rmtree(directorio, ignore_errors=True)
+
+
+def llave_local(kid):
+    """RSA key pair plus its public JWK, standing in for the Cognito key set."""
+    privada = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = privada.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    publica = jwk.construct(pem, "RS256").public_key().to_dict()
+    publica.update({"kid": kid, "use": "sig"})
+    return pem, publica
+
+
+def medir(funcion, repeticiones=20, preparar=None):
+    """Ejecuta `funcion` varias veces y devuelve latencias en milisegundos.
+
+    Si se da `preparar`, se llama antes de cada ejecución (fuera del tiempo medido) y su
+    resultado se pasa a `funcion`.
+    """
+    def una_vez():
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcion(argumento) if preparar else funcion()
+        return (time.perf_counter() - inicio) * 1000
+
+    una_vez()  # calentamiento
+    tiempos = [una_vez() for _ in range(repeticiones)]
+    tiempos.sort()
+    return {
+        'p50_ms': round(statistics.median(tiempos), 3),
+        'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 3),
+        'min_ms': round(tiempos[0], 3),
+    }
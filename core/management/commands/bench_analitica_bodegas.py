@@ -0,0 +1,114 @@
+import math
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import analitica_bodegas_service
+
+from ._bench import base_temporal
+
+
+def promedio_anterior(bodega_id):
+    """bodega_services.obtener_promedio_inventario antes de analitica_bodegas_service: una
+    consulta por bodega y el cálculo fila por fila en Python (referencia de los resultados)."""
+    bodega = Bodega.objects.filter(id=bodega_id).first()
+    if not bodega:
+        return None
+    total = 0
+    count = 0
+    for inv in bodega.inventarios.all():
+        if inv.cantidad_reservada and inv.cantidad_reservada != 0:
+            total += inv.cantidad_disponible / (inv.cantidad_reservada + inv.cantidad_disponible)
+            count += 1
+    if count == 0:
+        return None
+    return total / count
+
+
+def _iguales(a, b):
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+
+
+class Command(BaseCommand):
+    help = ("Compara el promedio de proporción disponible por bodega anterior (N+1 consultas) "
+            "con analitica_bodegas_service (una consulta) y verifica promedios y percentiles.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bodegas', type=int, default=10_000)
+        parser.add_argument('--skus', type=int, default=1_000, help='registros de inventario por bodega')
+        parser.add_argument('--muestra', type=int, default=50,
+                            help='bodegas sobre las que se mide la versión anterior (se extrapola)')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def _poblar(self, options):
+        rnd = random.Random(options['semilla'])
+        Producto.objects.bulk_create([
+            Producto(codigo_barras=str(7700000000000 + i), tipo='Ropa', peso=1.0, volumen=0.1,
+                     codigo=f"DOT-{i:06d}")
+            for i in range(options['skus'])
+        ], batch_size=5000)
+        Bodega.objects.bulk_create([
+            # algunas sin coordenadas: el cálculo anterior fallaba con float(None)
+            Bodega(codigo=f"BOD{i:05d}", nombre=f"Bodega {i}", ciudad='Bogotá', direccion='-',
+                   capacidad=100000, latitud=None if i % 100 == 0 else 4.6, longitud=None if i % 100 == 0 else -74.1)
+            for i in range(options['bodegas'])
+        ], batch_size=5000)
+        productos = list(Producto.objects.values_list('id', flat=True))
+        momento = now()
+        lote = []
+        for bodega_id in Bodega.objects.values_list('id', flat=True):
+            for producto_id in productos:
+                disponible = rnd.randint(0, 200)
+                lote.append(Inventario(producto_id=producto_id, bodega_id=bodega_id,
+                                       cantidad_disponible=disponible,
+                                       cantidad_reservada=rnd.randint(0, disponible // 2),
+                                       ultima_actualizacion=momento))
+            if len(lote) >= 50_000:
+                Inventario.objects.bulk_create(lote, batch_size=5000)
+                lote = []
+        Inventario.objects.bulk_create(lote, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            inicio = time.perf_counter()
+            self._poblar(options)
+            filas = options['bodegas'] * options['skus']
+            self.stdout.write(f"{options['bodegas']} bodegas x {options['skus']} SKUs = {filas} filas "
+                              f"de inventario en {time.perf_counter() - inicio:.1f}s")
+
+            inicio = time.perf_counter()
+            estadisticas = analitica_bodegas_service.estadisticas_por_bodega()
+            actual = time.perf_counter() - inicio
+
+            ids = list(Bodega.objects.values_list('id', flat=True))
+            muestra = random.Random(options['semilla']).sample(ids, k=min(options['muestra'], len(ids)))
+            inicio = time.perf_counter()
+            anteriores = {bodega_id: promedio_anterior(bodega_id) for bodega_id in muestra}
+            anterior = (time.perf_counter() - inicio) / len(muestra) * len(ids)
+
+            for bodega_id, promedio in anteriores.items():
+                nuevo = estadisticas.get(bodega_id)
+                if (promedio is None) != (nuevo is None) or (nuevo and not _iguales(promedio, nuevo['promedio'])):
+                    raise CommandError(f"Promedio distinto en la bodega {bodega_id}: {promedio} vs {nuevo}")
+                if nuevo:
+                    proporciones = sorted(
+                        inv.cantidad_disponible / (inv.cantidad_disponible + inv.cantidad_reservada)
+                        for inv in Inventario.objects.filter(bodega_id=bodega_id).exclude(cantidad_reservada=0))
+                    cuantiles = statistics.quantiles(proporciones, n=100, method='inclusive')
+                    esperados = [statistics.median(proporciones)] + [
+                        cuantiles[p - 1] for p in analitica_bodegas_service.PERCENTILES]
+                    obtenidos = [nuevo['mediana']] + list(nuevo['percentiles'].values())
+                    if not all(_iguales(a, b) for a, b in zip(esperados, obtenidos)):
+                        raise CommandError(f"Percentiles distintos en la bodega {bodega_id}")
+            self.stdout.write(f"promedios, medianas y percentiles idénticos en {len(muestra)} bodegas de muestra")
+
+            self.stdout.write(f"anterior (estimado desde {len(muestra)} bodegas): {anterior:9.2f} s")
+            self.stdout.write(f"analitica_bodegas_service:                 {actual:9.2f} s "
+                              f"({anterior / actual:.0f}x, {filas / actual:,.0f} filas/s)")
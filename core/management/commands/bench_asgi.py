@@ -0,0 +1,198 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import AsyncRequestFactory, RequestFactory
+from django.test.utils import override_settings
+
+from core import poblacionDB
+from core.models import Bodega, Inventario
+
+from ._bench import base_temporal
+
+# Lecturas con versión síncrona (/...) y async (/async/...)
+RUTAS = [
+    'api/kpis/',
+    'api/kpis/?bodega_id={b}',
+    'api/aging/',
+    'api/top-skus/',
+    'api/tareas-estado/',
+    'api/bodegas/',
+    'inventario/detail/?id={i}',
+    'inventario/por_bodega/?bodega_id={b}&limit=50',
+    'inventario/disponibilidad/?producto_id={p}',
+    'inventario/total_stock/',
+    'inventario/contar_bodega/?bodega_id={b}',
+]
+
+
+def _percentil(ordenados, q):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * q))]
+
+
+def _resumen(modo, latencias, errores, segundos):
+    ordenados = sorted(latencias)
+    return {
+        'modo': modo,
+        'peticiones': len(latencias),
+        'errores': errores,
+        'req_s': round(len(latencias) / segundos, 1),
+        'p50_ms': round(statistics.median(ordenados), 2),
+        'p99_ms': round(_percentil(ordenados, 0.99), 2),
+    }
+
+
+# Servidores en proceso (sin red): C clientes en lazo cerrado contra cada handler
+
+def wsgi(rutas, n, clientes, hilos):
+    """Como un servidor WSGI con `hilos` hilos y cola FIFO: cada petición ocupa un hilo de
+    principio a fin; la latencia incluye la espera en la cola."""
+    handler = WSGIHandler()
+    fabrica = RequestFactory()
+    latencias, errores = [], []
+
+    def procesar(ruta):
+        estado = []
+        cuerpo = handler(fabrica.get(ruta).environ, lambda status, headers, exc_info=None: estado.append(status))
+        for _ in cuerpo:
+            pass
+        cuerpo.close()
+        return estado[0]
+
+    with ThreadPoolExecutor(max_workers=hilos) as servidor:
+        def cliente(k):
+            for j in range(k, n, clientes):
+                ruta = rutas[j % len(rutas)]
+                inicio = time.perf_counter()
+                estado = servidor.submit(procesar, ruta).result()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                if not estado.startswith('200'):
+                    errores.append(ruta)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clientes) as pool:
+            list(pool.map(cliente, range(clientes)))
+        segundos = time.perf_counter() - inicio
+    return latencias, len(errores), segundos
+
+
+def asgi(rutas, n, clientes):
+    """Un solo event loop con ASGIHandler, como uvicorn con un worker."""
+    handler = ASGIHandler()
+    fabrica = AsyncRequestFactory()
+    latencias, errores = [], []
+
+    async def una(ruta):
+        scope = fabrica.get(ruta).scope
+        cuerpo_leido = False
+        estado = []
+
+        async def receive():
+            nonlocal cuerpo_leido
+            if not cuerpo_leido:
+                cuerpo_leido = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await asyncio.Event().wait()  # el cliente nunca se desconecta
+
+        async def send(mensaje):
+            if mensaje['type'] == 'http.response.start':
+                estado.append(mensaje['status'])
+
+        inicio = time.perf_counter()
+        await handler(scope, receive, send)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if estado[0] != 200:
+            errores.append(ruta)
+
+    async def cliente(k):
+        for j in range(k, n, clientes):
+            await una(rutas[j % len(rutas)])
+
+    async def todos():
+        await asyncio.gather(*(cliente(k) for k in range(clientes)))
+
+    inicio = time.perf_counter()
+    asyncio.run(todos())
+    return latencias, len(errores), time.perf_counter() - inicio
+
+
+class LatenciaSimulada:
+    """Agrega `ms` de espera a cada consulta, como el viaje de red a un servidor de base de
+    datos (SQLite en proceso no tiene I/O que esperar)."""
+
+    def __init__(self, ms):
+        self.segundos = ms / 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        time.sleep(self.segundos)
+        return execute(sql, params, many, context)
+
+    def instalar(self, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+    def __enter__(self):
+        if self.segundos:
+            connection_created.connect(self.instalar, dispatch_uid='bench_asgi.latencia')
+            for connection in connections.all(initialized_only=True):
+                self.instalar(connection)
+        return self
+
+    def __exit__(self, *exc):
+        connection_created.disconnect(dispatch_uid='bench_asgi.latencia')
+        for connection in connections.all(initialized_only=True):
+            if self in connection.execute_wrappers:
+                connection.execute_wrappers.remove(self)
+
+
+class Command(BaseCommand):
+    help = ("Prueba de carga en proceso de las lecturas de inventario y dashboard: "
+            "req/s y p99 bajo WSGI (vistas síncronas) y ASGI (síncronas y /async/).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', choices=sorted(poblacionDB.TAMANOS), default='small')
+        parser.add_argument('--peticiones', type=int, default=2000)
+        parser.add_argument('--clientes', type=int, default=32, help='clientes concurrentes')
+        parser.add_argument('--hilos', type=int, default=8, help='hilos del servidor WSGI')
+        parser.add_argument('--latencia-db', type=float, default=0.0,
+                            help='ms agregados a cada consulta (simula una base de datos remota)')
+        parser.add_argument('--con-cache', action='store_true',
+                            help='deja activo el cache de respuestas del dashboard')
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        n, clientes = options['peticiones'], options['clientes']
+        ajustes = dict(DEBUG=False, ALLOWED_HOSTS=['testserver'], PROFILING_ENABLED=False)
+        if not options['con_cache']:
+            ajustes['DASHBOARD_CACHE_TIMEOUT'] = 0
+
+        with base_temporal(), override_settings(**ajustes):
+            poblacionDB.generar(**poblacionDB.TAMANOS[options['tamano']], semilla=options['semilla'])
+            inventario = Inventario.objects.order_by('id').first()
+            valores = dict(b=Bodega.objects.order_by('id').values_list('id', flat=True).first(),
+                           i=inventario.id, p=inventario.producto_id)
+            sincronas = ['/' + r.format(**valores) for r in RUTAS]
+            asincronas = ['/async/' + r.format(**valores) for r in RUTAS]
+
+            self.stdout.write(
+                f"{options['tamano']}: {n} peticiones, {clientes} clientes, {options['hilos']} hilos WSGI, "
+                f"latencia de base de datos {options['latencia_db']} ms")
+            with LatenciaSimulada(options['latencia_db']):
+                resultados = [
+                    _resumen('WSGI vistas síncronas', *wsgi(sincronas, n, clientes, options['hilos'])),
+                    _resumen('ASGI vistas síncronas', *asgi(sincronas, n, clientes)),
+                    _resumen('ASGI vistas async', *asgi(asincronas, n, clientes)),
+                    _resumen('WSGI /api/dashboard/', *wsgi(['/api/dashboard/'], max(1, n // 10), clientes, options['hilos'])),
+                    _resumen('ASGI /async/api/dashboard/', *asgi(['/async/api/dashboard/'], max(1, n // 10), clientes)),
+                ]
+
+        for r in resultados:
+            self.stdout.write(
+                f"{r['modo']:28} {r['req_s']:9.1f} req/s   p50 {r['p50_ms']:8.2f} ms   "
+                f"p99 {r['p99_ms']:8.2f} ms   errores {r['errores']}")
@@ -0,0 +1,129 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from core.models import Bodega, Direccion, Inventario, Pedido, Producto, ProductoPedido
+from core.services import asignacion_service, cache_service, localizador_service
+
+from ._bench import base_temporal, medir
+from .bench_localizador import LATITUDES, LONGITUDES
+
+
+def por_linea(pedidas, stock, distancias):
+    """Referencia: cada línea a la bodega más cercana que la cubre entera, sin mirar las
+    demás líneas (lo que se haría pedido por pedido sin un solver)."""
+    envios = {}
+    for producto_id, cantidad in pedidas.items():
+        cubren = [b for b, disponible in stock.get(producto_id, {}).items() if disponible >= cantidad]
+        if cubren:
+            bodega_id = min(cubren, key=lambda b: (distancias.get(b, float('inf')), b))
+            envios.setdefault(bodega_id, {})[producto_id] = cantidad
+    return envios
+
+
+def _validar(plan, pedidas, stock):
+    asignado = {}
+    for envio in plan['envios']:
+        for linea in envio['lineas']:
+            if linea['cantidad'] > stock[linea['producto_id']][envio['bodega_id']]:
+                raise CommandError(f"Asignación mayor al stock: {envio['bodega_id']} / {linea}")
+            asignado[linea['producto_id']] = asignado.get(linea['producto_id'], 0) + linea['cantidad']
+    for linea in plan['faltantes']:
+        asignado[linea['producto_id']] = asignado.get(linea['producto_id'], 0) + linea['cantidad']
+    if asignado != pedidas:
+        raise CommandError("El plan no cubre exactamente las líneas del pedido")
+
+
+class Command(BaseCommand):
+    help = ("Mide asignacion_service con pedidos de decenas a cientos de líneas (consulta de "
+            "stock + solver + reserva) y compara los envíos con asignar cada línea por separado.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bodegas', type=int, default=500)
+        parser.add_argument('--skus', type=int, default=2_000)
+        parser.add_argument('--cobertura', type=float, default=0.3,
+                            help='fracción de bodegas con inventario de cada SKU')
+        parser.add_argument('--lineas', default='10,100,300,500',
+                            help='lista separada por comas de líneas por pedido')
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=11)
+
+    def _poblar(self, rnd, options):
+        Producto.objects.bulk_create([
+            Producto(codigo_barras=str(7700000000000 + i), tipo='Ropa', peso=1.0, volumen=0.1,
+                     codigo=f"ASG-{i:05d}")
+            for i in range(options['skus'])
+        ], batch_size=5000)
+        Bodega.objects.bulk_create([
+            Bodega(codigo=f"BOD{i:05d}", nombre=f"Bodega {i}", ciudad='-', direccion='-', capacidad=1000,
+                   latitud=round(rnd.uniform(*LATITUDES), 5), longitud=round(rnd.uniform(*LONGITUDES), 5))
+            for i in range(options['bodegas'])
+        ], batch_size=5000)
+        productos = list(Producto.objects.values_list('id', flat=True))
+        momento = now()
+        lote = []
+        for bodega_id in Bodega.objects.values_list('id', flat=True):
+            for producto_id in productos:
+                if rnd.random() < options['cobertura']:
+                    lote.append(Inventario(producto_id=producto_id, bodega_id=bodega_id,
+                                           cantidad_disponible=rnd.randint(0, 60), cantidad_reservada=0,
+                                           ultima_actualizacion=momento))
+        Inventario.objects.bulk_create(lote, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cache_service.incrementar(cache_service.BODEGAS)  # bulk_create no dispara señales
+        return productos
+
+    def _pedido(self, rnd, productos, lineas):
+        direccion = Direccion.objects.create(
+            tipo='Entrega', calle='-', ciudad='-', dpto='-', pais='Colombia', contacto_nombre='-', tel='-',
+            latitud=rnd.uniform(*LATITUDES), longitud=rnd.uniform(*LONGITUDES))
+        pedido = Pedido.objects.create(precio_calculado=0, direccion=direccion)
+        ProductoPedido.objects.bulk_create([
+            ProductoPedido(pedido=pedido, producto_id=producto_id, cantidad=rnd.randint(1, 20),
+                           precio_unitario=1000, subtotal=1000)
+            for producto_id in rnd.sample(productos, k=lineas)
+        ])
+        return Pedido.objects.select_related('direccion').get(id=pedido.id)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        with base_temporal(), override_settings(DEBUG=False):
+            inicio = time.perf_counter()
+            productos = self._poblar(rnd, options)
+            self.stdout.write(f"{options['bodegas']} bodegas x {options['skus']} SKUs al "
+                              f"{options['cobertura']:.0%}: {Inventario.objects.count()} filas "
+                              f"en {time.perf_counter() - inicio:.1f}s")
+            localizador_service.indice()
+
+            for lineas in [int(x) for x in options['lineas'].split(',')]:
+                pedidos = [self._pedido(rnd, productos, lineas) for _ in range(options['repeticiones'])]
+                envios_solver = envios_referencia = faltantes = 0
+                for pedido in pedidos:
+                    pedidas = asignacion_service.pedidas_de_pedido(pedido)
+                    plan = asignacion_service.asignar_pedido(pedido)
+                    stock = asignacion_service.stock_candidato(list(pedidas))
+                    _validar(plan, pedidas, stock)
+                    distancias = localizador_service.indice().distancias_km(
+                        pedido.direccion.latitud, pedido.direccion.longitud,
+                        {b for por_bodega in stock.values() for b in por_bodega})
+                    # solo las bodegas que envían alguna línea entera, como en la referencia
+                    envios_solver += sum(1 for e in plan['envios']
+                                         if any(l['cantidad'] == pedidas[l['producto_id']] for l in e['lineas']))
+                    envios_referencia += len(por_linea(pedidas, stock, distancias))
+                    faltantes += len(plan['faltantes'])
+
+                ciclo = iter(pedidos * 2)
+                calculo = medir(lambda p: asignacion_service.asignar_pedido(p), len(pedidos) - 1, lambda: next(ciclo))
+                ciclo = iter(pedidos)
+                reserva = medir(lambda p: asignacion_service.asignar_pedido(p, reservar=True),
+                                len(pedidos) - 1, lambda: next(ciclo))
+                n = len(pedidos)
+                self.stdout.write(
+                    f"{lineas:4} líneas  plan p50 {calculo['p50_ms']:8.1f} ms p95 {calculo['p95_ms']:8.1f} ms   "
+                    f"plan+reserva p50 {reserva['p50_ms']:8.1f} ms   envíos {envios_solver / n:5.1f} "
+                    f"(por línea {envios_referencia / n:5.1f})   líneas con faltante {faltantes / n:4.1f}")
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand
+from jose import jwt
+
+from core import auth_cognito
+
+from ._bench import llave_local
+
+
+class Command(BaseCommand):
+    help = "Mide la latencia de verify_cognito_token en frío (RSA completo) y en caliente (cache de tokens)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iteraciones", type=int, default=500)
+
+    def handle(self, *args, **options):
+        n = options["iteraciones"]
+        pem, publica = llave_local("bench-kid")
+        descargas = []
+
+        def fuente():
+            descargas.append(1)
+            return {"keys": [publica]}
+
+        auth_cognito.configurar_fuente_jwks(fuente)
+        ahora = int(time.time())
+        token = jwt.encode(
+            {
+                "sub": "bench",
+                "aud": auth_cognito.COGNITO_APP_CLIENT_ID,
+                "iss": auth_cognito.ISSUER,
+                "iat": ahora,
+                "exp": ahora + 3600,
+                "cognito:groups": ["ADMIN"],
+            },
+            pem,
+            algorithm="RS256",
+            headers={"kid": "bench-kid"},
+        )
+
+        inicio = time.perf_counter()
+        for _ in range(n):
+            auth_cognito._tokens.limpiar()
+            auth_cognito.verify_cognito_token(token)
+        frio = (time.perf_counter() - inicio) / n
+
+        inicio = time.perf_counter()
+        for _ in range(n):
+            auth_cognito.verify_cognito_token(token)
+        caliente = (time.perf_counter() - inicio) / n
+
+        self.stdout.write(f"iteraciones: {n}, descargas de JWKS: {len(descargas)}")
+        self.stdout.write(f"frío:     {frio * 1e6:10.1f} µs/token")
+        self.stdout.write(f"caliente: {caliente * 1e6:10.1f} µs/token ({frio / caliente:.0f}x)")
@@ -0,0 +1,94 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import busqueda_service, resumen_stock_service
+from core.services.inventario_service import InventarioService
+
+from ._bench import base_temporal, medir
+
+CAMPOS = ('id', 'producto__codigo', 'bodega__nombre', 'cantidad_disponible', 'cantidad_reservada')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la búsqueda de inventario por icontains (antes) con el índice de búsqueda, "
+        "sobre una base temporal con datos sintéticos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inventario', type=int, default=1_000_000)
+        parser.add_argument('--productos', type=int, default=20_000)
+        parser.add_argument('--bodegas', type=int, default=200)
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def _poblar(self, options):
+        rnd = random.Random(options['semilla'])
+        Producto.objects.bulk_create([
+            Producto(codigo_barras=str(7700000000000 + i), tipo='Ropa', peso=1.0, volumen=0.1,
+                     codigo=f"DOT-{i:06d}")
+            for i in range(options['productos'])
+        ], batch_size=5000)
+        Bodega.objects.bulk_create([
+            Bodega(codigo=f"BOD{i:04d}", nombre=f"Bodega {rnd.choice(['Norte', 'Sur', 'Centro'])} {i}",
+                   ciudad='Bogotá', direccion='-', capacidad=100000)
+            for i in range(options['bodegas'])
+        ], batch_size=5000)
+        productos = list(Producto.objects.values_list('id', flat=True))
+        bodegas = list(Bodega.objects.values_list('id', flat=True))
+        momento = now()
+        # pares (producto, bodega) distintos: sin ubicación cada par tiene una sola fila
+        pares = rnd.sample(range(len(productos) * len(bodegas)),
+                           min(options['inventario'], len(productos) * len(bodegas)))
+        for inicio in range(0, len(pares), 50_000):
+            Inventario.objects.bulk_create([
+                Inventario(producto_id=productos[par % len(productos)], bodega_id=bodegas[par // len(productos)],
+                           cantidad_disponible=rnd.randint(0, 200), cantidad_reservada=0,
+                           ultima_actualizacion=momento)
+                for par in pares[inicio:inicio + 50_000]
+            ], batch_size=5000)
+        resumen_stock_service.reconstruir()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')  # estadísticas del planificador, como en una base en uso
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            inicio = time.perf_counter()
+            self._poblar(options)
+            self.stdout.write(f"{options['inventario']} filas de inventario en {time.perf_counter() - inicio:.1f}s")
+
+            casos = [
+                ('codigo exacto', {'producto_codigo': 'DOT-012345'}),
+                ('codigo parcial', {'producto_codigo': '1234'}),
+                ('codigo de barras', {'producto_codigo': '7700000019'}),
+                ('bodega', {'bodega_nombre': 'Norte 1'}),
+                ('codigo + bodega', {'producto_codigo': 'DOT-0001', 'bodega_nombre': 'Sur'}),
+                ('codigo muy común', {'producto_codigo': 'DOT-'}),
+            ]
+            n = options['repeticiones']
+            for nombre, filtros in casos:
+                def antes():
+                    qs = Inventario.objects.all()
+                    if 'producto_codigo' in filtros:
+                        qs = qs.filter(producto__codigo__icontains=filtros['producto_codigo'])
+                    if 'bodega_nombre' in filtros:
+                        qs = qs.filter(bodega__nombre__icontains=filtros['bodega_nombre'])
+                    return list(qs.order_by('id').values(*CAMPOS)[:101])
+
+                def despues():
+                    qs = InventarioService.buscar_inventario(**filtros)
+                    return list(qs.order_by('id').values(*CAMPOS)[:101])
+
+                a, d = medir(antes, n), medir(despues, n)
+                self.stdout.write(
+                    f"{nombre:18} icontains p50 {a['p50_ms']:9.2f} ms | índice p50 {d['p50_ms']:9.2f} ms "
+                    f"({a['p50_ms'] / max(d['p50_ms'], 1e-6):.0f}x)"
+                )
+
+            sugerencias = medir(lambda: busqueda_service.buscar_productos('DOT-0123', 10), n)
+            self.stdout.write(f"sugerencias        p50 {sugerencias['p50_ms']:.2f} ms")
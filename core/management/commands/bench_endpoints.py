@@ -0,0 +1,392 @@
+import json
+import platform
+import random
+import time
+import uuid
+
+import django
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver
+from django.utils.timezone import now
+from jose import jwt
+
+from core import auth_cognito, poblacionDB
+from core.models import Alistador, Bodega, Inventario, Pedido, Producto
+from core.services import pedido_service, tareas_service
+from core.services.checks_service import ChecksService
+from core.services.inventario_service import InventarioService
+from core.urls import urlpatterns
+
+from ._bench import base_temporal, llave_local, medir
+
+
+SUB = 'bench'  # sub del token de las peticiones autenticadas
+
+# Rutas que no se miden con una petición del Client, y dónde se miden
+SIN_ESCENARIO = {
+    'stock_eventos': 'flujo SSE sin fin y solo ASGI: ver bench_eventos',
+}
+
+
+def _nombres_rutas(patrones):
+    for patron in patrones:
+        if isinstance(patron, URLResolver):
+            yield from _nombres_rutas(patron.url_patterns)
+        elif isinstance(patron, URLPattern) and patron.name:
+            yield patron.name
+
+
+class Escenarios:
+    """Una petición válida por ruta de core/urls.py sobre los datos generados.
+
+    Cada escenario es (ruta, etiqueta, preparar): `preparar()` corre fuera del tiempo medido
+    (elige ids, crea el estado que la petición consume, firma el HMAC) y devuelve los
+    argumentos de la petición.
+    """
+
+    def __init__(self, semilla, token):
+        self.rnd = random.Random(semilla)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+        self.bodega_id = (Bodega.objects.order_by('-resumen_stock__registros', 'id')
+                          .values_list('id', flat=True).first())
+        self.producto_id = (Producto.objects.order_by('-resumen_stock__registros', 'id')
+                            .values_list('id', flat=True).first())
+        self.con_stock = list(Inventario.objects.filter(cantidad_disponible__gte=20)
+                              .order_by('id').values_list('id', 'producto_id', 'bodega_id')[:5000])
+        self.ids = list(Inventario.objects.order_by('id').values_list('id', flat=True)[:5000])
+        self.pedido_ids = list(Pedido.objects.order_by('id').values_list('id', flat=True)[:5000])
+        self.alistador = (Alistador.objects.filter(bodega_asignada__isnull=False).order_by('id')
+                          .values_list('id', 'bodega_asignada_id').first())
+        # las vistas de tareas actúan como el trabajador dueño del token
+        Alistador.objects.filter(id=self.alistador[0]).update(cognito_sub=SUB)
+        self.producto = Producto.objects.get(id=self.producto_id)
+        self.codigo_bodega = Bodega.objects.get(id=self.bodega_id).codigo
+        if not self.con_stock:
+            raise CommandError("El conjunto de datos no tiene inventario con stock")
+
+    @staticmethod
+    def _nonce():
+        return {'nonce': uuid.uuid4().hex, 'timestamp': str(int(time.time()))}
+
+    @classmethod
+    def _firmado(cls, datos):
+        datos = {**datos, **cls._nonce()}
+        return {**{k: v for k, v in datos.items() if v is not None},
+                'hash': ChecksService.generar_hash_hmac(datos)}
+
+    def _fila_con_stock(self):
+        return self.rnd.choice(self.con_stock)
+
+    def _get(self, ruta, **extra):
+        return lambda: {'metodo': 'get', 'ruta': ruta, **extra}
+
+    def _reserva_previa(self):
+        inventario_id = self._fila_con_stock()[0]
+        InventarioService.reservar_producto(inventario_id, 1)
+        return self._firmado({'inventario_id': str(inventario_id), 'cantidad': '1'})
+
+    def _producto_nuevo(self):
+        # un producto sin inventario: cada bodega admite una sola fila sin ubicación por producto
+        return Producto.objects.create(codigo_barras=uuid.uuid4().hex[:13], tipo='Bench', peso=1.0,
+                                       volumen=0.1, codigo=f"BENCH-{uuid.uuid4().hex[:8]}").id
+
+    def _crear(self):
+        bodega_id, producto_id = self._fila_con_stock()[2], self._producto_nuevo()
+        return {'metodo': 'post', 'ruta': '/inventario/create/', 'datos': self._firmado({
+            'producto_id': str(producto_id), 'bodega_id': str(bodega_id), 'ubicacion_id': None,
+            'cantidad_disponible': '10', 'cantidad_reservada': '0',
+        })}
+
+    def _actualizar(self):
+        inventario_id = self.rnd.choice(self.ids)
+        datos = self._firmado({
+            'inventario_id': str(inventario_id), 'cantidad_disponible': str(self.rnd.randint(20, 200)),
+            'cantidad_reservada': '', 'ubicacion_id': '',
+        })
+        datos.pop('inventario_id')
+        return {'metodo': 'post', 'ruta': f'/inventario/update/?id={inventario_id}', 'datos': datos}
+
+    def _borrar(self):
+        bodega_id, producto_id = self._fila_con_stock()[2], self._producto_nuevo()
+        inventario = InventarioService.crear_inventario(producto_id, bodega_id, None, 5, 0)
+        nonce = self._nonce()
+        firma = ChecksService.generar_hash_hmac({'inventario_id': str(inventario.id), **nonce})
+        return {'metodo': 'delete', 'ruta': f'/inventario/delete/?id={inventario.id}&hash={firma}&'
+                                            f'nonce={nonce["nonce"]}&timestamp={nonce["timestamp"]}'}
+
+    def _reservar(self):
+        _, producto_id, bodega_id = self._fila_con_stock()
+        return {'metodo': 'post', 'ruta': '/inventario/reservar/', 'datos': self._firmado({
+            'bodega_id': str(bodega_id), 'cantidad': '1', 'producto_id': str(producto_id),
+        })}
+
+    def _reservar_lote(self):
+        _, _, bodega_id = self._fila_con_stock()
+        productos = [p for _, p, b in self.con_stock if b == bodega_id][:3]
+        lineas = [{'producto_id': p, 'cantidad': 1} for p in productos]
+        datos = self._firmado({'bodega_id': str(bodega_id), 'lineas': lineas, 'pedido_id': ''})
+        datos['lineas'] = json.dumps(lineas)
+        return {'metodo': 'post', 'ruta': '/inventario/reservar_lote/', 'datos': datos}
+
+    def _asignar(self):
+        pedido_id = self.rnd.choice(self.pedido_ids)
+        return {'metodo': 'post', 'ruta': '/inventario/asignar/',
+                'datos': self._firmado({'pedido_id': str(pedido_id)})}
+
+    def _cambiar_estado(self):
+        # avanza un pedido que todavía no llegó a un estado final
+        pedido_id, actual = (Pedido.objects.filter(estado_actual__in=pedido_service.ESTADOS[:4])
+                             .order_by('id').values_list('id', 'estado_actual').first())
+        siguiente = pedido_service.ESTADOS[pedido_service.ESTADOS.index(actual) + 1]
+        return {'metodo': 'post', 'ruta': f'/api/pedido/{pedido_id}/estado/',
+                'datos': json.dumps({'estado': siguiente}),
+                'extra': {**self.auth, 'content_type': 'application/json'}}
+
+    def _sobre_tarea(self, accion):
+        # encola y reclama una tarea para que la petición actúe sobre un reclamo vigente
+        alistador_id, bodega_id = self.alistador
+        tareas_service.encolar(bodega_id, 'ALISTAMIENTO', prioridad='ALTA')
+        tarea = tareas_service.reclamar(bodega_id, 'alistador', alistador_id)
+        return {'metodo': 'post', 'ruta': f'/api/tarea/{tarea.id}/{accion}/',
+                'datos': json.dumps({'rol': 'alistador'}),
+                'extra': {**self.auth, 'content_type': 'application/json'}}
+
+    def _reclamar(self):
+        bodega_id = self.alistador[1]
+        tareas_service.encolar(bodega_id, 'ALISTAMIENTO', prioridad='ALTA')
+        return {'metodo': 'post', 'ruta': '/api/tareas/reclamar/',
+                'datos': json.dumps({'rol': 'alistador'}),
+                'extra': {**self.auth, 'content_type': 'application/json'}}
+
+    def _importar(self):
+        codigos = list(Producto.objects.order_by('id').values_list('codigo', flat=True)[:100])
+        contenido = 'producto,bodega,cantidad_disponible\n' + ''.join(
+            f'"{codigo}",{self.codigo_bodega},{self.rnd.randint(0, 200)}\n' for codigo in codigos)
+        archivo = SimpleUploadedFile('bench.csv', contenido.encode('utf-8'), content_type='text/csv')
+        return {'metodo': 'post', 'ruta': '/inventario/importar/', 'datos': {'archivo': archivo}, 'extra': self.auth}
+
+    def lista(self):
+        escenarios = self._sincronos()
+        # las vistas async (core/urls.py, prefijo /async/) se miden con los mismos GET
+        asincronas = {n for n in _nombres_rutas(urlpatterns) if n.startswith('async_')}
+        for nombre, etiqueta, preparar in list(escenarios):
+            if f'async_{nombre}' in asincronas and etiqueta.startswith('GET'):
+                escenarios.append((f'async_{nombre}', etiqueta, self._en_async(preparar)))
+        return escenarios
+
+    @staticmethod
+    def _en_async(preparar):
+        def en_async():
+            peticion = preparar()
+            return {**peticion, 'ruta': '/async' + peticion['ruta']}
+        return en_async
+
+    def _sincronos(self):
+        b, p = self.bodega_id, self.producto_id
+        return [
+            ('mapa_bodegas', 'GET', self._get('/bodegas/mapa/')),
+            ('dashboard_bodegas', 'GET', self._get('/bodegas/dashboard/')),
+            ('bodegas_data_api', 'GET', self._get('/api/bodegas/')),
+            ('bodegas_cercanas_api', 'GET', self._get(f'/api/bodegas/cercanas/?producto_id={p}&latitud=4.65&longitud=-74.1')),
+            ('kpis_api', 'GET', self._get('/api/kpis/')),
+            ('kpis_api', 'GET bodega', self._get(f'/api/kpis/?bodega_id={b}')),
+            ('mix_disponible_reservado_api', 'GET', self._get('/api/mix-disponible-reservado/')),
+            ('aging_api', 'GET', self._get('/api/aging/')),
+            ('top_skus_api', 'GET', self._get('/api/top-skus/')),
+            ('tareas_estado_api', 'GET', self._get('/api/tareas-estado/')),
+            ('tareas_estado_api', 'GET bodega', self._get(f'/api/tareas-estado/?bodega_id={b}')),
+            ('dashboard_api', 'GET', self._get('/api/dashboard/')),
+            ('dashboard_api', 'GET bodega', self._get(f'/api/dashboard/?bodega_id={b}')),
+            ('perfil_api', 'GET', self._get('/api/perfil/', extra=self.auth)),
+            ('productos_list_create_api', 'GET', self._get('/api/productos/', extra=self.auth)),
+            ('productos_list_create_api', 'GET codigo_barras',
+             self._get(f'/api/productos/?codigo_barras={self.producto.codigo_barras}', extra=self.auth)),
+            ('producto_detail_api', 'GET', self._get(f'/api/producto/{p}/', extra=self.auth)),
+            ('pedidos_api', 'GET', self._get('/api/pedidos/')),
+            ('pedidos_api', 'GET estado', self._get('/api/pedidos/?estado=DESPACHADO')),
+            ('pedidos_estados_api', 'GET', self._get('/api/pedidos/estados/')),
+            ('pedido_estado_api', 'POST', self._cambiar_estado),
+            ('tarea_reclamar_api', 'POST', self._reclamar),
+            ('tarea_renovar_api', 'POST', lambda: self._sobre_tarea('renovar')),
+            ('tarea_completar_api', 'POST', lambda: self._sobre_tarea('completar')),
+            ('tarea_soltar_api', 'POST', lambda: self._sobre_tarea('soltar')),
+            ('inventario_list', 'GET', self._get('/inventario/')),
+            ('inventario_create', 'POST', self._crear),
+            ('inventario_importar', 'POST 100 filas', self._importar),
+            ('inventario_detail', 'GET', self._get(f'/inventario/detail/?id={self.ids[0]}')),
+            ('inventario_update', 'POST', self._actualizar),
+            ('inventario_delete', 'DELETE', self._borrar),
+            ('inventario_reservar', 'POST', self._reservar),
+            ('inventario_reservar_lote', 'POST 3 lineas', self._reservar_lote),
+            ('inventario_asignacion', 'GET', lambda: {
+                'metodo': 'get', 'ruta': f'/inventario/asignacion/?pedido_id={self.rnd.choice(self.pedido_ids)}'}),
+            ('inventario_asignar', 'POST', self._asignar),
+            ('inventario_liberar_reserva', 'POST', lambda: {
+                'metodo': 'post', 'ruta': '/inventario/liberar/', 'datos': self._reserva_previa()}),
+            ('inventario_confirmar_reserva', 'POST', lambda: {
+                'metodo': 'post', 'ruta': '/inventario/confirmar/', 'datos': self._reserva_previa()}),
+            ('inventario_bajo_stock', 'GET', self._get('/inventario/bajo_stock/')),
+            ('inventario_bajo_stock', 'GET ndjson', self._get('/inventario/bajo_stock/?formato=ndjson')),
+            ('inventario_por_bodega', 'GET', self._get(f'/inventario/por_bodega/?bodega_id={b}')),
+            ('inventario_por_producto', 'GET', self._get(f'/inventario/por_producto/?producto_id={p}')),
+            ('inventario_disponibilidad_producto', 'GET', self._get(f'/inventario/disponibilidad/?producto_id={p}')),
+            ('inventario_disponibilidad_bodega_producto', 'GET',
+             self._get(f'/inventario/disponibilidad_bodega/?producto_id={p}&bodega_id={b}')),
+            ('inventario_total_stock', 'GET', self._get('/inventario/total_stock/')),
+            ('inventario_total_stock', 'GET bodega', self._get(f'/inventario/total_stock/?bodega_id={b}')),
+            ('inventario_buscar', 'GET codigo', self._get('/inventario/buscar/?producto_codigo=DOT-10')),
+            ('inventario_buscar', 'GET bodega', self._get('/inventario/buscar/?bodega_nombre=Norte')),
+            ('inventario_sugerencias', 'GET', self._get('/inventario/sugerencias/?q=DOT-12')),
+            ('inventario_contar', 'GET', self._get('/inventario/contar/')),
+            ('inventario_contar_bodega', 'GET', self._get(f'/inventario/contar_bodega/?bodega_id={b}')),
+        ]
+
+
+class ContadorConsultas:
+    """Cuenta las consultas ejecutadas (CaptureQueriesContext no sirve aquí: cada petición
+    del Client dispara request_started, que vacía connection.queries)."""
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+def _peticion(cliente, p):
+    """Hace la petición y lee el cuerpo completo (también de respuestas en streaming)."""
+    metodo = getattr(cliente, p['metodo'])
+    if 'datos' in p:
+        respuesta = metodo(p['ruta'], p['datos'], **p.get('extra', {}))
+    else:
+        respuesta = metodo(p['ruta'], **p.get('extra', {}))
+    # iterar la respuesta (y no streaming_content) también consume iteradores async
+    contenido = b''.join(respuesta) if respuesta.streaming else respuesta.content
+    return respuesta, contenido
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera datos sintéticos (small/medium/large) en una base temporal, mide cada endpoint "
+        "de core/urls.py y escribe un reporte JSON comparable entre versiones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', default='small,medium,large',
+                            help=f"Lista separada por comas de {', '.join(poblacionDB.TAMANOS)}.")
+        parser.add_argument('--repeticiones', type=int, default=20)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--solo', help="Mide solo las rutas cuyo nombre contiene este texto.")
+        parser.add_argument('--salida', help="Archivo del reporte JSON (por defecto, stdout).")
+        parser.add_argument('--comparar', help="Reporte JSON anterior contra el cual buscar regresiones.")
+        parser.add_argument('--tolerancia', type=float, default=1.25,
+                            help="Razón p50 nuevo/anterior a partir de la cual se reporta una regresión.")
+
+    def handle(self, *args, **options):
+        tamanos = [t.strip() for t in options['tamanos'].split(',') if t.strip()]
+        desconocidos = [t for t in tamanos if t not in poblacionDB.TAMANOS]
+        if desconocidos:
+            raise CommandError(f"Tamaños desconocidos: {', '.join(desconocidos)}")
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as f:
+                anterior = json.load(f)
+
+        pem, publica = llave_local('bench-kid')
+        auth_cognito.configurar_fuente_jwks(lambda: {'keys': [publica]})
+        token = jwt.encode({
+            'sub': SUB, 'aud': auth_cognito.COGNITO_APP_CLIENT_ID, 'iss': auth_cognito.ISSUER,
+            'exp': int(time.time()) + 24 * 3600, 'cognito:groups': ['ADMIN'],
+        }, pem, algorithm='RS256', headers={'kid': 'bench-kid'})
+
+        reporte = {
+            'generado': now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'motor': connection.vendor,
+            'semilla': options['semilla'],
+            'repeticiones': options['repeticiones'],
+            'tamanos': {},
+        }
+        for tamano in tamanos:
+            reporte['tamanos'][tamano] = self._medir_tamano(tamano, token, options)
+
+        texto = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as f:
+                f.write(texto + '\n')
+            self.stderr.write(f"Reporte escrito en {options['salida']}")
+        else:
+            self.stdout.write(texto)
+
+        if anterior is not None:
+            self._comparar(anterior, reporte, options['tolerancia'])
+
+    def _medir_tamano(self, tamano, token, options):
+        with base_temporal():
+            inicio = time.perf_counter()
+            datos = poblacionDB.generar(semilla=options['semilla'], **poblacionDB.TAMANOS[tamano])
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stderr.write(f"[{tamano}] datos generados en {time.perf_counter() - inicio:.1f}s: {datos}")
+
+            escenarios = Escenarios(options['semilla'], token).lista()
+            cubiertas = {ruta for ruta, _, _ in escenarios}
+            sin_escenario = sorted(set(_nombres_rutas(urlpatterns)) - cubiertas - set(SIN_ESCENARIO))
+            if sin_escenario:
+                self.stderr.write(self.style.WARNING(f"Rutas sin escenario: {', '.join(sin_escenario)}"))
+
+            cliente = Client(raise_request_exception=False)  # un 500 queda en el reporte
+            resultados = {}
+            # como en producción: sin el registro de consultas de DEBUG; 'testserver' es el host del Client
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                for ruta, etiqueta, preparar in escenarios:
+                    if options['solo'] and options['solo'] not in ruta:
+                        continue
+                    r = resultados[f'{ruta} {etiqueta}'] = self._medir(
+                        cliente, preparar, options['repeticiones'])
+                    estado = self.style.ERROR(str(r['status'])) if r['status'] >= 400 else r['status']
+                    self.stderr.write(
+                        f"[{tamano}] {ruta + ' ' + etiqueta:48} {estado} {r['consultas']:4} consultas "
+                        f"primera {r['primera_ms']:9.2f} ms | p50 {r['p50_ms']:9.2f} ms | p95 {r['p95_ms']:9.2f} ms")
+            return {'datos': datos, 'sin_escenario': sin_escenario, 'endpoints': resultados}
+
+    def _medir(self, cliente, preparar, repeticiones):
+        cache.clear()  # la primera petición mide el camino sin cache de respuestas
+        peticion = preparar()
+        consultas = ContadorConsultas()
+        with connection.execute_wrapper(consultas):
+            inicio = time.perf_counter()
+            respuesta, contenido = _peticion(cliente, peticion)
+            primera = (time.perf_counter() - inicio) * 1000
+        tiempos = medir(lambda p: _peticion(cliente, p), repeticiones, preparar=preparar)
+        return {
+            'ruta': peticion['ruta'].split('?')[0],
+            'metodo': peticion['metodo'].upper(),
+            'status': respuesta.status_code,
+            'consultas': consultas.total,
+            'bytes': len(contenido),
+            'primera_ms': round(primera, 3),
+            **tiempos,
+        }
+
+    def _comparar(self, anterior, actual, tolerancia):
+        regresiones = []
+        for tamano, datos in actual['tamanos'].items():
+            base = anterior.get('tamanos', {}).get(tamano, {}).get('endpoints', {})
+            for nombre, r in datos['endpoints'].items():
+                previo = base.get(nombre)
+                # diferencias por debajo de 1 ms son ruido de medición
+                if previo and r['p50_ms'] > previo['p50_ms'] * tolerancia and r['p50_ms'] - previo['p50_ms'] > 1:
+                    regresiones.append(
+                        f"[{tamano}] {nombre}: p50 {previo['p50_ms']} -> {r['p50_ms']} ms, "
+                        f"consultas {previo['consultas']} -> {r['consultas']}")
+        if regresiones:
+            raise CommandError("Regresiones frente al reporte anterior:\n  " + "\n  ".join(regresiones))
+        self.stderr.write(self.style.SUCCESS("Sin regresiones frente al reporte anterior"))
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core import poblacionDB
+from core.models import Inventario
+from core.services import eventos_service
+from core.services.inventario_service import InventarioService
+
+from ._bench import base_temporal, medir
+
+
+class Clientes:
+    """N suscriptores del broker leyendo en un event loop propio (como el servidor ASGI),
+    que anotan cuándo reciben cada evento."""
+
+    def __init__(self, n):
+        self.n = n
+        self.recibidos = {}  # id de evento -> [perf_counter de cada suscriptor]
+        self.resyncs = 0
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _leer(self, suscripcion):
+        while True:
+            for evento_id, tipo, _ in await suscripcion.recibir(1):
+                if tipo == eventos_service.RESYNC:
+                    self.resyncs += 1
+                else:
+                    self.recibidos.setdefault(evento_id, []).append(time.perf_counter())
+
+    async def _iniciar(self):
+        broker = eventos_service.broker()
+        self._tareas = [asyncio.ensure_future(self._leer(broker.suscribir())) for _ in range(self.n)]
+
+    def __enter__(self):
+        self._hilo.start()
+        asyncio.run_coroutine_threadsafe(self._iniciar(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        async def detener():
+            for tarea in self._tareas:
+                tarea.cancel()
+        asyncio.run_coroutine_threadsafe(detener(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join()
+
+    def ultimo(self):
+        return max(self.recibidos, default=0)
+
+    def esperar_siguiente(self, anterior, segundos=5):
+        """Espera a que el primer evento posterior a `anterior` llegue a todos; devuelve su id."""
+        limite = time.perf_counter() + segundos
+        while True:
+            evento_id = min((i for i in self.recibidos if i > anterior), default=None)
+            if evento_id is not None and len(self.recibidos[evento_id]) == self.n:
+                return evento_id
+            if time.perf_counter() > limite:
+                raise CommandError(f"Un evento no llegó a los {self.n} suscriptores")
+            time.sleep(0.0002)
+
+
+class Command(BaseCommand):
+    help = ("Mide el flujo de cambios de stock (/api/eventos/stock/): costo agregado a cada "
+            "escritura de inventario, latencia hasta N suscriptores y bytes por actualización "
+            "frente a volver a pedir el dashboard.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamano', choices=sorted(poblacionDB.TAMANOS), default='small')
+        parser.add_argument('--suscriptores', default='0,10,100,1000',
+                            help='lista separada por comas de cantidades de clientes conectados')
+        parser.add_argument('--escrituras', type=int, default=300)
+        parser.add_argument('--semilla', type=int, default=1)
+
+    def handle(self, *args, **options):
+        cantidades = [int(x) for x in options['suscriptores'].split(',')]
+        n = options['escrituras']
+
+        with base_temporal(), override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver'],
+                                                PROFILING_ENABLED=False, DASHBOARD_CACHE_TIMEOUT=0):
+            poblacionDB.generar(**poblacionDB.TAMANOS[options['tamano']], semilla=options['semilla'])
+            inventario = Inventario.objects.filter(cantidad_disponible__gte=1).order_by('id').first()
+            paso = [0]
+
+            def escribir():
+                # reserva y libera alternadamente: el stock vuelve a su valor
+                if paso[0] % 2 == 0:
+                    InventarioService.reservar_producto(inventario.id, 1)
+                else:
+                    InventarioService.liberar_reserva(inventario.id, 1)
+                paso[0] += 1
+
+            self.stdout.write(f"{options['tamano']}: {n} escrituras (reservar/liberar) por medición")
+            base = None
+            for cantidad in cantidades:
+                with Clientes(cantidad) as clientes:
+                    escritura = medir(escribir, n)
+                    base = base or escritura['p50_ms']
+
+                    latencias = []
+                    for _ in range(min(n, 100) if cantidad else 0):
+                        anterior = clientes.ultimo()
+                        inicio = time.perf_counter()
+                        escribir()
+                        evento_id = clientes.esperar_siguiente(anterior)
+                        latencias.extend((t - inicio) * 1000 for t in clientes.recibidos[evento_id])
+
+                linea = (f"{cantidad:5} suscriptores  escritura p50 {escritura['p50_ms']:7.3f} ms "
+                         f"({escritura['p50_ms'] / base:4.2f}x)")
+                if latencias:
+                    latencias.sort()
+                    linea += (f"   escritura→suscriptor p50 {statistics.median(latencias):7.2f} ms "
+                              f"p99 {latencias[int(len(latencias) * 0.99)]:7.2f} ms   resync {clientes.resyncs}")
+                self.stdout.write(linea)
+
+            dashboard = Client().get('/api/dashboard/').content
+            evento = eventos_service.formatear(1, eventos_service.STOCK, {
+                'bodega_id': inventario.bodega_id, **dict.fromkeys(eventos_service.CAMPOS, 0)})
+            self.stdout.write(
+                f"bytes por actualización: evento {len(evento.encode('utf-8'))} "
+                f"vs /api/dashboard/ {len(dashboard)} ({json.dumps(list(json.loads(dashboard)))})")
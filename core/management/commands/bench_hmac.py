@@ -0,0 +1,103 @@
+import hashlib
+import hmac
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.checks_service import ChecksService
+
+
+def _canonicalize_anterior(mensaje):
+    """ChecksService._canonicalize antes de la ruta rápida (referencia de los digests)."""
+    if isinstance(mensaje, str):
+        try:
+            mensaje = json.loads(mensaje)
+        except Exception:
+            return mensaje
+    if isinstance(mensaje, (dict, list)):
+        return json.dumps(mensaje, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return str(mensaje)
+
+
+def hmac_anterior(mensaje):
+    key = (ChecksService.SECRET_KEY or "").encode('utf-8')
+    return hmac.new(key, _canonicalize_anterior(mensaje).encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def cargas_tipicas():
+    """Mensajes como los que arman las vistas de inventario."""
+    return {
+        'reservar': {'bodega_id': '12', 'cantidad': '3', 'producto_id': '4567'},
+        'crear': {'producto_id': '4567', 'bodega_id': '12', 'ubicacion_id': None,
+                  'cantidad_disponible': '40', 'cantidad_reservada': '0'},
+        'reservar_lote': {'pedido_id': None, 'bodega_id': '12',
+                          'lineas': [{'producto_id': 4567 + i, 'cantidad': 2} for i in range(5)]},
+        'texto': 'inventario-4567-bodega-12',
+        'texto_json': '{"cantidad":"3","producto_id":"4567"}',
+    }
+
+
+def cargas_aleatorias(rnd, n):
+    """Casos borde para comparar digests: unicode, escapes, números, JSON embebido."""
+    atomos = ['', ' ', '0', '-1', '1e3', '1.50', 'NaN', 'Infinity', 'true', 'false', 'null',
+              '"x"', '[1, 2]', '{"b": 1, "a": [2, {"d": null}]}', ' \t{"a":1}', '\ufeff{"a":1}',
+              'ñandú', 'Bodega "Norte"', 'línea\nnueva', 'tab\there', 'emoji 📦', '\\', '\x00', ' ',
+              'abc', 'fin}', '{roto', ' 42 ']
+    cargas = list(atomos)
+    for _ in range(n):
+        claves = rnd.sample(['producto_id', 'bodega_id', 'cantidad', 'ñ', 'A', 'a', 'z"'], k=rnd.randint(0, 5))
+        cargas.append({c: rnd.choice(atomos + [None]) for c in claves})
+        cargas.append({c: rnd.choice([rnd.randint(-5, 5), 1.5, True, None, rnd.choice(atomos), [rnd.choice(atomos)]])
+                       for c in claves})
+        cargas.append([rnd.choice(atomos + [None, 3, 2.5]) for _ in range(rnd.randint(0, 4))])
+    cargas += [7, 2.5, None, True, b'bytes']
+    return cargas
+
+
+def ops_por_segundo(funcion, n, rondas=3):
+    """Mejor de `rondas` corridas de `n` llamadas (la mínima es la menos afectada por ruido)."""
+    mejor = float('inf')
+    for _ in range(rondas):
+        inicio = time.perf_counter()
+        for _ in range(n):
+            funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return n / mejor
+
+
+class Command(BaseCommand):
+    help = ("Compara el throughput de la firma HMAC anterior con la actual y verifica que "
+            "ambas producen exactamente los mismos digests.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iteraciones", type=int, default=50000)
+        parser.add_argument("--casos", type=int, default=5000, help="cargas aleatorias a comparar")
+        parser.add_argument("--semilla", type=int, default=1)
+
+    def handle(self, *args, **options):
+        n = options["iteraciones"]
+
+        distintos = [c for c in cargas_aleatorias(random.Random(options["semilla"]), options["casos"])
+                     if hmac_anterior(c) != ChecksService.generar_hash_hmac(c)]
+        if distintos:
+            raise CommandError(f"{len(distintos)} digests distintos, p. ej. {distintos[0]!r}")
+        self.stdout.write(f"digests idénticos en {options['casos'] * 3} cargas aleatorias y casos borde")
+
+        for nombre, carga in cargas_tipicas().items():
+            firma = hmac_anterior(carga)
+            if firma != ChecksService.generar_hash_hmac(carga):
+                raise CommandError(f"digest distinto para {nombre}")
+
+            anterior = ops_por_segundo(lambda: hmac.compare_digest(firma, hmac_anterior(carga)), n)
+            actual = ops_por_segundo(lambda: ChecksService.verificar_integridad(firma, carga), n)
+
+            self.stdout.write(f"{nombre:15} anterior: {anterior:10,.0f} ops/s   "
+                              f"actual: {actual:10,.0f} ops/s ({actual / anterior:.1f}x)")
+
+        pares = [(ChecksService.generar_hash_hmac(c), c) for c in cargas_tipicas().values()] * 20
+        if not all(ChecksService.verificar_lote(pares)):
+            raise CommandError("verificar_lote rechazó un par válido")
+        lotes = ops_por_segundo(lambda: ChecksService.verificar_lote(pares), max(1, n // len(pares)))
+        self.stdout.write(f"verificar_lote: {lotes * len(pares):,.0f} mensajes/s")
@@ -0,0 +1,133 @@
+import itertools
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import cache_service, localizador_service
+
+from ._bench import base_temporal, medir
+
+# Caja aproximada de Colombia
+LATITUDES = (-4.2, 12.5)
+LONGITUDES = (-79.0, -66.9)
+
+
+def escaneo_simple(latitud, longitud, producto_id, cantidad=1, k=3):
+    """Sin índice: todas las bodegas con stock suficiente del producto, distancia de cada
+    una y orden completo (referencia de los resultados)."""
+    candidatas = (Inventario.objects
+                  .filter(producto_id=producto_id, cantidad_disponible__gte=cantidad,
+                          bodega__latitud__isnull=False, bodega__longitud__isnull=False)
+                  .values_list('bodega_id', 'bodega__nombre', 'bodega__latitud', 'bodega__longitud',
+                               'cantidad_disponible'))
+    ordenadas = sorted(
+        (localizador_service.haversine_km(latitud, longitud, lat, lon), bodega_id, nombre, disponible)
+        for bodega_id, nombre, lat, lon, disponible in candidatas)
+    return [{'bodega_id': bodega_id, 'nombre': nombre, 'distancia_km': round(distancia, 3),
+             'disponible': disponible}
+            for distancia, bodega_id, nombre, disponible in ordenadas[:k]]
+
+
+def _iguales(a, b):
+    return ([x['bodega_id'] for x in a] == [x['bodega_id'] for x in b]
+            and all(math.isclose(x['distancia_km'], y['distancia_km'], abs_tol=2e-3) for x, y in zip(a, b)))
+
+
+class Command(BaseCommand):
+    help = ("Compara localizador_service.bodegas_cercanas (k-d tree + stock por lotes) con el "
+            "escaneo de todas las bodegas con stock, verificando que den las mismas bodegas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bodegas', type=int, default=5_000)
+        parser.add_argument('--skus', type=int, default=20)
+        parser.add_argument('--cobertura', type=float, default=0.5,
+                            help='fracción de bodegas con inventario de cada SKU')
+        parser.add_argument('--consultas', type=int, default=300)
+        parser.add_argument('--k', type=int, default=3)
+        parser.add_argument('--semilla', type=int, default=7)
+
+    def _poblar(self, rnd, options):
+        Producto.objects.bulk_create([
+            Producto(codigo_barras=str(7700000000000 + i), tipo='Ropa', peso=1.0, volumen=0.1,
+                     codigo=f"LOC-{i:05d}")
+            for i in range(options['skus'])
+        ])
+        Bodega.objects.bulk_create([
+            Bodega(codigo=f"BOD{i:05d}", nombre=f"Bodega {i}", ciudad='-', direccion='-', capacidad=1000,
+                   # algunas sin coordenadas: no entran al índice
+                   latitud=None if i % 200 == 0 else round(rnd.uniform(*LATITUDES), 5),
+                   longitud=None if i % 200 == 0 else round(rnd.uniform(*LONGITUDES), 5))
+            for i in range(options['bodegas'])
+        ], batch_size=5000)
+        momento = now()
+        Inventario.objects.bulk_create([
+            Inventario(producto_id=producto_id, bodega_id=bodega_id, cantidad_disponible=rnd.randint(0, 100),
+                       cantidad_reservada=0, ultima_actualizacion=momento)
+            for bodega_id in Bodega.objects.values_list('id', flat=True)
+            for producto_id in Producto.objects.values_list('id', flat=True)
+            if rnd.random() < options['cobertura']
+        ], batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cache_service.incrementar(cache_service.BODEGAS)  # bulk_create no dispara señales
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        k = options['k']
+        with base_temporal(), override_settings(DEBUG=False):
+            self._poblar(rnd, options)
+            productos = list(Producto.objects.values_list('id', flat=True))
+            consultas = [
+                (rnd.uniform(*LATITUDES), rnd.uniform(*LONGITUDES), rnd.choice(productos),
+                 rnd.choice((1, 1, 10, 50, 95)))
+                for _ in range(options['consultas'])
+            ]
+
+            inicio = time.perf_counter()
+            indice = localizador_service.indice()
+            construccion = (time.perf_counter() - inicio) * 1000
+            self.stdout.write(f"{options['bodegas']} bodegas ({len(indice)} con coordenadas), "
+                              f"{options['skus']} SKUs al {options['cobertura']:.0%}; "
+                              f"índice construido en {construccion:.1f} ms")
+
+            for consulta in consultas:
+                esperado = escaneo_simple(*consulta, k=k)
+                obtenido = localizador_service.bodegas_cercanas(*consulta, k=k)
+                if not _iguales(esperado, obtenido):
+                    raise CommandError(f"Resultados distintos para {consulta}: {esperado} vs {obtenido}")
+            self.stdout.write(f"mismas {k} bodegas en las {len(consultas)} consultas")
+
+            ciclo = itertools.cycle(consultas)
+            siguiente = lambda: next(ciclo)  # noqa: E731
+            n = len(consultas)
+            filas = [
+                ('escaneo simple', medir(lambda c: escaneo_simple(*c, k=k), n, siguiente)),
+                ('localizador_service', medir(lambda c: localizador_service.bodegas_cercanas(*c, k=k), n, siguiente)),
+                ('  solo el índice (sin stock)', medir(
+                    lambda c: list(itertools.islice(indice.recorrer(c[0], c[1]), k)), n, siguiente)),
+            ]
+            base = filas[0][1]['p50_ms']
+            for nombre, tiempos in filas:
+                self.stdout.write(f"{nombre:30} p50 {tiempos['p50_ms'] * 1000:9.1f} µs   "
+                                  f"p95 {tiempos['p95_ms'] * 1000:9.1f} µs   ({base / tiempos['p50_ms']:.0f}x)")
+
+            # invalidación: una bodega que se mueve junto al punto consultado pasa a ser la más cercana
+            latitud, longitud, producto_id, _ = consultas[0]
+            inventario = Inventario.objects.filter(producto_id=producto_id, cantidad_disponible__gte=1,
+                                                   bodega__latitud__isnull=False).first()
+            bodega = Bodega.objects.get(id=inventario.bodega_id)
+            bodega.latitud, bodega.longitud = latitud, longitud
+            bodega.save()
+            inicio = time.perf_counter()
+            cercanas = localizador_service.bodegas_cercanas(latitud, longitud, producto_id, k=1)
+            reconstruccion = (time.perf_counter() - inicio) * 1000
+            if cercanas[0]['bodega_id'] != bodega.id:
+                raise CommandError("El índice no se reconstruyó al cambiar una bodega")
+            self.stdout.write(f"bodega movida: aparece en la siguiente consulta ({reconstruccion:.1f} ms, "
+                              f"con la reconstrucción del índice)")
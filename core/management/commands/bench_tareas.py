@@ -0,0 +1,202 @@
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from core.models import Alistador, Bodega, TareaLogistica
+from core.services import tareas_service
+
+from ._bench import base_temporal
+
+ROL = 'alistador'
+TIPO = tareas_service.ROLES[ROL][1]
+ESPERA = 0.02  # segundos entre sondeos cuando solo quedan tareas en proceso
+
+
+def reclamo_ingenuo(bodega_id, rol, trabajador_id, momento=None):
+    """Referencia: lee la siguiente tarea y la asigna por id, sin condición sobre el estado
+    ni bloqueo (lo que se haría sin tareas_service). Dos trabajadores pueden tomar la misma."""
+    momento = momento or now()
+    tarea_id = tareas_service.cola(bodega_id, TIPO).values_list('id', flat=True).first()
+    if tarea_id is None:
+        return None
+    TareaLogistica.objects.filter(id=tarea_id).update(
+        estado=tareas_service.EN_PROCESO, alistador_id=trabajador_id, fecha_asignacion=momento,
+        vence_reclamo=momento + tareas_service.duracion_reclamo(), reclamos=F('reclamos') + 1)
+    return TareaLogistica.objects.get(id=tarea_id)
+
+
+class Trabajador(threading.Thread):
+    """Un alistador con su propia conexión: reclama y completa tareas de su bodega hasta
+    que no queda ninguna pendiente ni en proceso. Con probabilidad `abandono` deja la
+    tarea sin completar (como un trabajador que se cae), y vuelve a la cola al vencer."""
+
+    def __init__(self, alistador_id, bodega_id, abandono, semilla, reclamar, esperar):
+        super().__init__(daemon=True)
+        self.alistador_id, self.bodega_id = alistador_id, bodega_id
+        self.abandono, self.rnd = abandono, random.Random(semilla)
+        self.reclamar, self.esperar = reclamar, esperar
+        self.reclamos = []  # (tarea_id, nivel_prioridad)
+        self.completadas = []
+        self.abandonadas = []
+        self.robadas = []
+        self.tiempos = []
+        self.error = None
+
+    def _quedan(self):
+        return TareaLogistica.objects.filter(
+            bodega_id=self.bodega_id, tipo=TIPO,
+            estado__in=[tareas_service.PENDIENTE, tareas_service.EN_PROCESO]).exists()
+
+    def run(self):
+        try:
+            while True:
+                inicio = time.perf_counter()
+                tarea = self.reclamar(self.bodega_id, ROL, self.alistador_id)
+                if tarea is None:
+                    if not self.esperar or not self._quedan():
+                        return
+                    time.sleep(ESPERA)
+                    continue
+                self.tiempos.append((time.perf_counter() - inicio) * 1000)
+                self.reclamos.append((tarea.id, tarea.nivel_prioridad))
+                if self.rnd.random() < self.abandono:
+                    self.abandonadas.append(tarea.id)
+                    continue
+                try:
+                    tareas_service.completar(tarea.id, ROL, self.alistador_id)
+                    self.completadas.append(tarea.id)
+                except tareas_service.ReclamoInvalido:
+                    # solo se pierde una tarea cuyo lease venció (y que otro reclamó): cuenta
+                    # como abandonada; antes de vencer, o sin lease (el reclamo sin condición
+                    # leyó la fila ya cerrada por otro), es una asignación doble
+                    if tarea.vence_reclamo is None or now() < tarea.vence_reclamo:
+                        self.robadas.append(tarea.id)
+                    else:
+                        self.abandonadas.append(tarea.id)
+        except Exception as e:  # noqa: BLE001 - se reporta desde el hilo principal
+            self.error = e
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = ("Mide reclamos por segundo de tareas_service.reclamar con varios trabajadores "
+            "simultáneos sobre la misma cola y verifica que ninguna tarea se asigne a dos a la "
+            "vez, que las abandonadas vuelvan a la cola y que cada tarea se complete una vez.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tareas', type=int, default=2_000, help='tareas por corrida')
+        parser.add_argument('--hilos', default='1,2,4,8',
+                            help='lista separada por comas de trabajadores simultáneos')
+        parser.add_argument('--bodegas', type=int, default=1,
+                            help='bodegas entre las que se reparten trabajadores y tareas')
+        parser.add_argument('--abandono', type=float, default=0.02,
+                            help='fracción de reclamos que el trabajador abandona')
+        parser.add_argument('--lease', type=float, default=0.5, help='segundos del lease en el benchmark')
+        parser.add_argument('--semilla', type=int, default=13)
+
+    def _poblar(self, rnd, corrida, hilos, options):
+        bodegas = Bodega.objects.bulk_create([
+            Bodega(codigo=f"T{corrida}-{i}", nombre=f"Bodega {corrida}-{i}", ciudad='-', direccion='-',
+                   capacidad=1000)
+            for i in range(min(options['bodegas'], hilos))
+        ])
+        alistadores = Alistador.objects.bulk_create([
+            Alistador(nombre=f"Alistador {corrida}-{i}", bodega_asignada_id=bodegas[i % len(bodegas)].id)
+            for i in range(hilos)
+        ])
+        momento = now()
+        tareas = []
+        for i in range(options['tareas']):
+            prioridad = rnd.choice(list(tareas_service.NIVELES))
+            tareas.append(TareaLogistica(
+                tipo=TIPO, estado=tareas_service.PENDIENTE, prioridad=prioridad,
+                nivel_prioridad=tareas_service.NIVELES[prioridad], fecha_asignacion=momento,
+                bodega_id=bodegas[i % len(bodegas)].id))
+        TareaLogistica.objects.bulk_create(tareas, batch_size=5000)
+        return [(a.id, a.bodega_asignada_id) for a in alistadores]
+
+    def _correr(self, trabajadores_ids, abandono, semilla, reclamar, esperar):
+        trabajadores = [Trabajador(alistador_id, bodega_id, abandono, semilla + i, reclamar, esperar)
+                        for i, (alistador_id, bodega_id) in enumerate(trabajadores_ids)]
+        inicio = time.perf_counter()
+        for t in trabajadores:
+            t.start()
+        for t in trabajadores:
+            t.join()
+        duracion = time.perf_counter() - inicio
+        for t in trabajadores:
+            if t.error is not None:
+                raise CommandError(f"Error en un trabajador: {t.error!r}")
+        return trabajadores, duracion
+
+    def _verificar(self, trabajadores, bodega_ids):
+        """Sin asignaciones dobles: ningún trabajador pierde una tarea antes de que venza su
+        lease, cada tarea se reclama una vez más que las veces que fue abandonada (en
+        tareas.reclamos y en lo que vieron los trabajadores) y se completa una sola vez."""
+        robadas = [tarea_id for t in trabajadores for tarea_id in t.robadas]
+        if robadas:
+            raise CommandError(f"Tareas reclamadas por otro antes de vencer el lease: {robadas[:10]}")
+        reclamos = Counter(tarea_id for t in trabajadores for tarea_id, _ in t.reclamos)
+        abandonos = Counter(tarea_id for t in trabajadores for tarea_id in t.abandonadas)
+        completadas = Counter(tarea_id for t in trabajadores for tarea_id in t.completadas)
+        tareas = {tarea_id: (estado, n) for tarea_id, estado, n in TareaLogistica.objects
+                  .filter(bodega_id__in=bodega_ids).values_list('id', 'estado', 'reclamos')}
+        for tarea_id, (estado, n) in tareas.items():
+            if estado != tareas_service.COMPLETADA or completadas[tarea_id] != 1:
+                raise CommandError(f"Tarea {tarea_id} {estado}, completada {completadas[tarea_id]} veces")
+            if not n == reclamos[tarea_id] == abandonos[tarea_id] + 1:
+                raise CommandError(f"Tarea {tarea_id}: {n} reclamos registrados, {reclamos[tarea_id]} "
+                                   f"vistos, {abandonos[tarea_id]} abandonos")
+
+    def _orden_prioridad(self, trabajador):
+        # un solo trabajador: las tareas que reclama por primera vez salen en el orden de la
+        # cola (nivel y luego id); las abandonadas que vuelven se reclaman de nuevo aparte
+        vistos, primeros = set(), []
+        for tarea_id, nivel in trabajador.reclamos:
+            if tarea_id not in vistos:
+                vistos.add(tarea_id)
+                primeros.append((nivel, tarea_id))
+        return primeros == sorted(primeros)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        hilos_lista = [int(x) for x in options['hilos'].split(',')]
+        camino = ('SELECT ... FOR UPDATE SKIP LOCKED' if connection.features.has_select_for_update_skip_locked
+                  else 'UPDATE condicional')
+        with base_temporal(en_archivo=True), override_settings(DEBUG=False,
+                                                               TAREAS_LEASE_SEGUNDOS=options['lease']):
+            self.stdout.write(f"{connection.vendor}: reclamo por {camino}; {options['tareas']} tareas por "
+                              f"corrida, {options['abandono']:.0%} abandonadas, lease {options['lease']}s")
+            for corrida, hilos in enumerate(hilos_lista):
+                ids = self._poblar(rnd, corrida, hilos, options)
+                trabajadores, duracion = self._correr(ids, options['abandono'], options['semilla'],
+                                                      tareas_service.reclamar, esperar=True)
+                self._verificar(trabajadores, {b for _, b in ids})
+                if hilos == 1 and not self._orden_prioridad(trabajadores[0]):
+                    raise CommandError("Un solo trabajador no reclamó en orden de prioridad")
+                tiempos = sorted(x for t in trabajadores for x in t.tiempos)
+                reclamos = len(tiempos)
+                abandonadas = sum(len(t.abandonadas) for t in trabajadores)
+                self.stdout.write(
+                    f"{hilos:3} trabajadores  {reclamos / duracion:8.0f} reclamos/s   reclamar p50 "
+                    f"{statistics.median(tiempos):6.2f} ms p95 {tiempos[int(len(tiempos) * 0.95)]:6.2f} ms   "
+                    f"{reclamos} reclamos en {duracion:.1f}s, {abandonadas} abandonados y reasignados, 0 dobles")
+
+            # referencia sin condición sobre el estado, con el máximo de trabajadores
+            hilos = max(hilos_lista)
+            ids = self._poblar(rnd, len(hilos_lista), hilos, options)
+            trabajadores, duracion = self._correr(ids, 0, options['semilla'], reclamo_ingenuo, esperar=False)
+            dobles = (TareaLogistica.objects.filter(bodega_id__in={b for _, b in ids}, reclamos__gt=1)
+                      .count())
+            reclamos = sum(len(t.reclamos) for t in trabajadores)
+            self.stdout.write(f"{hilos:3} trabajadores  {reclamos / duracion:8.0f} reclamos/s   "
+                              f"sin condición (referencia): {dobles} tareas asignadas a más de un trabajador")
@@ -0,0 +1,52 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import importacion_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa inventario desde un CSV o NDJSON (producto, bodega, ubicacion, "
+        "cantidad_disponible, cantidad_reservada) haciendo upsert por lotes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo, o - para leer de stdin.")
+        parser.add_argument('--formato', choices=importacion_service.FORMATOS,
+                            help="Por defecto se deduce de la extensión (.csv / .ndjson / .jsonl).")
+        parser.add_argument('--lote', type=int, default=importacion_service.TAMANO_LOTE,
+                            help="Filas por transacción.")
+
+    def handle(self, *args, **options):
+        archivo = options['archivo']
+        formato = options['formato']
+        if formato is None:
+            extension = os.path.splitext(archivo)[1].lower()
+            formato = 'csv' if extension == '.csv' else 'ndjson' if extension in ('.ndjson', '.jsonl') else None
+        if formato is None:
+            raise CommandError("No se puede deducir el formato; use --formato")
+        if options['lote'] < 1:
+            raise CommandError("--lote debe ser >= 1")
+
+        if archivo == '-':
+            reporte = importacion_service.importar(
+                importacion_service.leer(sys.stdin, formato), options['lote'])
+        else:
+            try:
+                lineas = open(archivo, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(str(e))
+            with lineas:
+                reporte = importacion_service.importar(
+                    importacion_service.leer(lineas, formato), options['lote'])
+
+        for error in reporte['detalle_errores']:
+            self.stderr.write(f"fila {error['fila']}: {error['error']}")
+        self.stdout.write(
+            f"{reporte['filas']} filas en {reporte['lotes']} lotes: {reporte['creadas']} creadas, "
+            f"{reporte['actualizadas']} actualizadas, {reporte['errores']} con error"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{reporte['segundos']}s ({reporte['filas_por_segundo']} filas/s)"))
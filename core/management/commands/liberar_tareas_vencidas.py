@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.services import tareas_service
+
+
+class Command(BaseCommand):
+    help = ("Devuelve a la cola las tareas logísticas EN_PROCESO cuyo lease venció "
+            "(TAREAS_LEASE_SEGUNDOS sin renovarse), de todas las bodegas.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bodega', type=int, help='Solo las tareas de esta bodega.')
+
+    def handle(self, *args, **options):
+        liberadas = tareas_service.liberar_vencidas(options['bodega'])
+        self.stdout.write(self.style.SUCCESS(f"{liberadas} tareas devueltas a la cola"))
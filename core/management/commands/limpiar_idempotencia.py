@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from core.services import idempotencia_service
+
+
+class Command(BaseCommand):
+    help = "Borra las respuestas guardadas por Idempotency-Key más antiguas que IDEMPOTENCY_TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horas',
+            type=float,
+            help='Antigüedad mínima de las respuestas a borrar (por defecto IDEMPOTENCY_TTL).',
+        )
+
+    def handle(self, *args, **options):
+        antes_de = now() - timedelta(hours=options['horas']) if options['horas'] is not None else None
+        borradas = idempotencia_service.limpiar(antes_de)
+        self.stdout.write(self.style.SUCCESS(f"{borradas} respuestas idempotentes borradas"))
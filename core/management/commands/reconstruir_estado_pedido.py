@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import pedido_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Rellena Pedido.estado_actual/fecha_estado con el último registro del historial "
+        "(EstadoPedido) y verifica que coincidan. Se puede ejecutar con la aplicación en uso."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-faltantes',
+            action='store_true',
+            help='Solo los pedidos sin estado_actual (p. ej. creados antes de la migración).',
+        )
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='No actualiza; solo compara con el historial y falla si difieren.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['solo_verificar']:
+            actualizados = pedido_service.reconstruir_estados(solo_faltantes=options['solo_faltantes'])
+            self.stdout.write(f"{actualizados} pedidos actualizados")
+
+        diffs = pedido_service.diferencias()
+        for pedido_id, esperado, actual in diffs[:50]:
+            self.stderr.write(f"pedido {pedido_id}: esperado {esperado}, actual {actual}")
+        if diffs:
+            raise CommandError(f"{len(diffs)} pedidos con estado_actual distinto al historial")
+        self.stdout.write(self.style.SUCCESS("estado_actual consistente con el historial"))
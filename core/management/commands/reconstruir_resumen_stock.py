@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services import resumen_stock_service
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye ResumenStockBodega y ResumenStockProducto desde Inventario y verifica "
+        "que coincidan con un recálculo completo. Ejecutar sin escrituras de inventario en curso. "
+        "Con --solo-verificar sirve como chequeo periódico (cron) de las escrituras con update() "
+        "o SQL directo que no pasan por InventarioService ni por las señales."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--solo-verificar',
+            action='store_true',
+            help='No reconstruye; solo compara los resúmenes con Inventario y falla si difieren.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['solo_verificar']:
+            escritas = resumen_stock_service.reconstruir()
+            for tabla, filas in escritas.items():
+                self.stdout.write(f"{tabla}: {filas} filas")
+
+        diffs = resumen_stock_service.diferencias()
+        for campo, clave, esperado, actual in diffs[:50]:
+            self.stderr.write(f"{campo}={clave}: esperado {esperado}, actual {actual}")
+        if diffs:
+            raise CommandError(f"{len(diffs)} filas del resumen no coinciden con Inventario")
+        self.stdout.write(self.style.SUCCESS("Resumen de stock consistente con Inventario"))
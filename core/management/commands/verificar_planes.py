@@ -0,0 +1,72 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.timezone import now
+
+from core.models import Inventario, Producto, TareaLogistica
+from core.services import pedido_service, tareas_service
+from core.services.inventario_service import InventarioService
+
+# Full table scans as reported by EXPLAIN (SQLite: a SCAN without USING INDEX/PRIMARY KEY)
+ESCANEO_COMPLETO = {
+    'sqlite': re.compile(r'\bSCAN (\w+)(?: AS \w+)?\s*$'),
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+}
+
+
+def consultas_calientes():
+    """Las consultas de los caminos calientes, construidas como las ejecuta la aplicación."""
+    hace_90_dias = now() - timedelta(days=90)
+    return {
+        'reservar (producto, bodega)': Inventario.objects.filter(producto_id=1, bodega_id=1).order_by('pk')[:1],
+        'inventario por bodega y producto': Inventario.objects.filter(bodega_id=1, producto_id=1, ubicacion_id=1),
+        'bajo stock (umbral por defecto, paginado)':
+            InventarioService.obtener_inventario_bajo().order_by('id').values('id', 'producto__codigo')[:101],
+        'aging (ultima_actualizacion)': Inventario.objects.filter(ultima_actualizacion__lte=hace_90_dias),
+        'inventario por bodega (paginado)':
+            InventarioService.obtener_inventario_por_bodega(1).order_by('id').values('id')[:101],
+        'inventario por producto (paginado)':
+            InventarioService.obtener_inventario_por_producto(1).order_by('id').values('id')[:101],
+        'producto por codigo_barras': Producto.objects.filter(codigo_barras='7700000000000'),
+        'producto por codigo': Producto.objects.filter(codigo='DOT-1000'),
+        'tareas por estado': TareaLogistica.objects.filter(estado='PENDIENTE'),
+        'siguiente tarea de la cola (reclamar)': tareas_service.cola(1, 'ALISTAMIENTO').values('id')[:1],
+        'tareas con lease vencido': TareaLogistica.objects.filter(
+            bodega_id=1, tipo='ALISTAMIENTO', estado='EN_PROCESO', vence_reclamo__lt=now()),
+        'pedidos por estado (paginado)':
+            pedido_service.pedidos_en_estado('CREADO').order_by('id').values('id', 'estado_actual')[:101],
+    }
+
+
+def escaneos_completos(plan, vendor=None):
+    """Tablas que el plan de EXPLAIN recorre completas."""
+    patron = ESCANEO_COMPLETO[vendor or connection.vendor]
+    return [m.group(1) for linea in plan.splitlines() if (m := patron.search(linea))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Ejecuta EXPLAIN sobre las consultas calientes de inventario y falla si alguna "
+        "recorre una tabla completa (p. ej. porque se perdió un índice)."
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ESCANEO_COMPLETO:
+            raise CommandError(f"Backend no soportado: {connection.vendor}")
+
+        regresiones = []
+        for nombre, qs in consultas_calientes().items():
+            plan = qs.explain()
+            escaneos = escaneos_completos(plan)
+            estado = self.style.ERROR('SCAN') if escaneos else self.style.SUCCESS('ok')
+            self.stdout.write(f"[{estado}] {nombre}")
+            if options['verbosity'] > 1 or escaneos:
+                for linea in plan.splitlines():
+                    self.stdout.write(f"    {linea}")
+            if escaneos:
+                regresiones.append(f"{nombre}: {', '.join(escaneos)}")
+
+        if regresiones:
+            raise CommandError("Consultas con recorrido completo:\n  " + "\n  ".join(regresiones))
@@ -0,0 +1,221 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Perfil de la petición en curso (None si no está muestreada). Es una ContextVar para que
+# las consultas hechas desde hilos de sync_to_async se atribuyan a la petición que las originó.
+_perfil_actual = ContextVar('perfil_actual', default=None)
+
+
+def sample_rate():
+    return getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+
+
+def ventana():
+    return getattr(settings, 'PROFILING_WINDOW', 500)
+
+
+# Registro de consultas
+
+class Perfil:
+    """Consultas y tiempo SQL de una petición muestreada."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.sql_ms = 0.0
+        self.por_sentencia = Counter()   # SQL parametrizado -> ejecuciones
+        self.exactas = Counter()         # (SQL, parámetros) -> ejecuciones
+        self._lock = threading.Lock()
+
+    def registrar(self, sql, params, ms):
+        try:
+            clave = (sql, repr(params))
+        except Exception:
+            clave = (sql, id(params))
+        with self._lock:
+            self.consultas += 1
+            self.sql_ms += ms
+            self.por_sentencia[sql] += 1
+            self.exactas[clave] += 1
+
+    def duplicadas(self):
+        """Ejecuciones sobrantes de consultas idénticas (mismo SQL y parámetros)."""
+        return sum(n - 1 for n in self.exactas.values() if n > 1)
+
+    def repetidas(self):
+        """Sentencias (SQL parametrizado) ejecutadas más de una vez: típico de un N+1."""
+        return {sql: n for sql, n in self.por_sentencia.items() if n > 1}
+
+
+def _registrar_consulta(execute, sql, params, many, context):
+    perfil = _perfil_actual.get()
+    if perfil is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        perfil.registrar(sql, params, (time.perf_counter() - inicio) * 1000)
+
+
+def _instalar(connection, **kwargs):
+    if _registrar_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_registrar_consulta)
+
+
+# Estadísticas acumuladas por endpoint
+
+def _percentiles(valores):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    n = len(ordenados)
+
+    def p(q):
+        return round(ordenados[min(n - 1, int(n * q))], 3)
+
+    return {'p50': p(0.50), 'p95': p(0.95), 'p99': p(0.99), 'max': round(ordenados[-1], 3)}
+
+
+class Estadisticas:
+    """Ventana móvil de las últimas muestras por nombre de URL, segura entre hilos."""
+
+    MAXIMO_REPETIDAS = 10
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._muestras = defaultdict(lambda: deque(maxlen=ventana()))
+        self._totales = Counter()
+        self._repetidas = defaultdict(Counter)
+
+    def agregar(self, nombre, wall_ms, perfil, bytes_respuesta):
+        muestra = (wall_ms, perfil.sql_ms, perfil.consultas, perfil.duplicadas(), bytes_respuesta)
+        repetidas = perfil.repetidas()
+        with self._lock:
+            self._muestras[nombre].append(muestra)
+            self._totales[nombre] += 1
+            for sql, n in repetidas.items():
+                self._repetidas[nombre][sql] = max(self._repetidas[nombre][sql], n)
+            # solo se conservan las sentencias más repetidas
+            if len(self._repetidas[nombre]) > 2 * self.MAXIMO_REPETIDAS:
+                self._repetidas[nombre] = Counter(dict(self._repetidas[nombre].most_common(self.MAXIMO_REPETIDAS)))
+
+    def reporte(self):
+        with self._lock:
+            copia = {nombre: list(muestras) for nombre, muestras in self._muestras.items()}
+            totales = dict(self._totales)
+            repetidas = {nombre: c.most_common(self.MAXIMO_REPETIDAS) for nombre, c in self._repetidas.items()}
+        resultado = {}
+        for nombre, muestras in sorted(copia.items()):
+            wall, sql, consultas, duplicadas, tamanos = zip(*muestras)
+            resultado[nombre] = {
+                'muestreadas': totales[nombre],
+                'en_ventana': len(muestras),
+                'wall_ms': _percentiles(wall),
+                'sql_ms': _percentiles(sql),
+                'consultas': _percentiles(consultas),
+                'duplicadas': _percentiles(duplicadas),
+                'bytes': _percentiles([t for t in tamanos if t is not None]),
+                'sentencias_repetidas': [
+                    {'sql': s[:300], 'max_por_peticion': n} for s, n in repetidas.get(nombre, [])
+                ],
+            }
+        return resultado
+
+    def limpiar(self):
+        with self._lock:
+            self._muestras.clear()
+            self._totales.clear()
+            self._repetidas.clear()
+
+
+estadisticas = Estadisticas()
+
+
+def _ve_server_timing(request):
+    """Server-Timing expone tiempos internos: solo con DEBUG o para staff (sesión de Django
+    con is_staff, o token de Cognito del grupo ADMIN ya verificado por require_auth)."""
+    if settings.DEBUG:
+        return True
+    if 'ADMIN' in getattr(request, 'cognito_claims', {}).get('cognito:groups', []):
+        return True
+    usuario = getattr(request, 'user', None)
+    return usuario is not None and usuario.is_staff
+
+
+def _nombre_endpoint(request, response):
+    match = getattr(request, 'resolver_match', None)
+    if match is not None:
+        return match.view_name
+    return '<404>' if response.status_code == 404 else '<sin ruta>'
+
+
+class ProfilingMiddleware:
+    """
+    Mide una fracción (PROFILING_SAMPLE_RATE) de las peticiones: número de consultas SQL,
+    tiempo SQL, consultas duplicadas, tamaño de la respuesta y tiempo total, agregados por
+    nombre de URL en core.middleware.estadisticas. Con PROFILING_SERVER_TIMING agrega el
+    header Server-Timing a las respuestas muestreadas de staff, o a todas con DEBUG.
+
+    Con PROFILING_ENABLED = False Django lo descarta al arrancar (costo cero); las
+    peticiones no muestreadas solo pagan un random() y una ContextVar por consulta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'PROFILING_SERVER_TIMING', True)
+        connection_created.connect(_instalar, dispatch_uid='core.middleware.profiling')
+        for connection in connections.all(initialized_only=True):
+            _instalar(connection)
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        if random.random() >= sample_rate():
+            return self.get_response(request)
+        perfil = Perfil()
+        token = _perfil_actual.set(perfil)
+        try:
+            response = self.get_response(request)
+        finally:
+            _perfil_actual.reset(token)
+        return self._cerrar(request, response, perfil)
+
+    async def __acall__(self, request):
+        if random.random() >= sample_rate():
+            return await self.get_response(request)
+        perfil = Perfil()
+        token = _perfil_actual.set(perfil)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _perfil_actual.reset(token)
+        return self._cerrar(request, response, perfil)
+
+    def _cerrar(self, request, response, perfil):
+        wall_ms = (time.perf_counter() - perfil.inicio) * 1000
+        # en streaming el cuerpo aún no se generó: el tamaño queda sin medir
+        tamano = None if response.streaming else len(response.content)
+        estadisticas.agregar(_nombre_endpoint(request, response), wall_ms, perfil, tamano)
+        if self.server_timing and _ve_server_timing(request):
+            response['Server-Timing'] = (
+                f'db;dur={perfil.sql_ms:.1f};desc="{perfil.consultas} queries", '
+                f'app;dur={wall_ms - perfil.sql_ms:.1f}, total;dur={wall_ms:.1f}'
+            )
+        return response
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+def poblar_resumenes(apps, schema_editor):
+    """Construye los resúmenes desde el inventario existente; desde aquí los mantiene InventarioService."""
+    Inventario = apps.get_model("core", "Inventario")
+    momento = timezone.now()
+    for modelo, campo in (
+        (apps.get_model("core", "ResumenStockBodega"), "bodega_id"),
+        (apps.get_model("core", "ResumenStockProducto"), "producto_id"),
+    ):
+        filas = (
+            Inventario.objects.filter(**{f"{campo}__isnull": False})
+            .values(campo)
+            .annotate(
+                total_disponible=Sum("cantidad_disponible"),
+                total_reservado=Sum("cantidad_reservada"),
+                registros=Count("id"),
+                stockouts=Count("id", filter=Q(cantidad_disponible=0)),
+            )
+            .order_by()
+        )
+        modelo.objects.bulk_create(
+            [
+                modelo(
+                    **{campo: f[campo]},
+                    total_disponible=f["total_disponible"] or 0,
+                    total_reservado=f["total_reservado"] or 0,
+                    registros=f["registros"],
+                    stockouts=f["stockouts"],
+                    ultima_actualizacion=momento,
+                )
+                for f in filas
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ResumenStockBodega",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total_disponible", models.BigIntegerField(default=0)),
+                ("total_reservado", models.BigIntegerField(default=0)),
+                ("registros", models.IntegerField(default=0)),
+                ("stockouts", models.IntegerField(default=0)),
+                ("ultima_actualizacion", models.DateTimeField(blank=True, null=True)),
+                (
+                    "bodega",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumen_stock",
+                        to="core.bodega",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ResumenStockProducto",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("total_disponible", models.BigIntegerField(default=0)),
+                ("total_reservado", models.BigIntegerField(default=0)),
+                ("registros", models.IntegerField(default=0)),
+                ("stockouts", models.IntegerField(default=0)),
+                ("ultima_actualizacion", models.DateTimeField(blank=True, null=True)),
+                (
+                    "producto",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumen_stock",
+                        to="core.producto",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:52
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def verificar_duplicados(apps, schema_editor):
+    """Falla con un mensaje claro si hay inventario repetido antes de crear la restricción única."""
+    Inventario = apps.get_model("core", "Inventario")
+    duplicados = list(
+        Inventario.objects.filter(ubicacion__isnull=False)
+        .values("bodega_id", "producto_id", "ubicacion_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by()[:20]
+    )
+    if duplicados:
+        raise RuntimeError(
+            "Hay registros de Inventario repetidos por (bodega, producto, ubicacion); "
+            f"consolídelos antes de migrar. Ejemplos: {duplicados}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_resumen_stock"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="producto",
+            name="codigo",
+            field=models.CharField(db_index=True, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name="producto",
+            name="codigo_barras",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name="tarealogistica",
+            name="estado",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name="inventario",
+            index=models.Index(
+                fields=["producto", "bodega"], name="inventario_producto_bodega_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventario",
+            index=models.Index(
+                fields=["cantidad_disponible"], name="inventario_disponible_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventario",
+            index=models.Index(
+                condition=models.Q(("cantidad_disponible__lt", 10)),
+                fields=["id"],
+                name="inventario_bajo_stock_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="inventario",
+            index=models.Index(
+                fields=["ultima_actualizacion"], name="inventario_actualizacion_idx"
+            ),
+        ),
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="inventario",
+            constraint=models.UniqueConstraint(
+                fields=("bodega", "producto", "ubicacion"),
+                name="inventario_bodega_producto_ubicacion_uniq",
+            ),
+        ),
+    ]
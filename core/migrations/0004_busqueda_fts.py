@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# Índices de texto (SQLite FTS5, tokenizer trigram) sobre productos y bodegas.
+# Son tablas de contenido externo: los triggers las mantienen sincronizadas con
+# cualquier escritura (servicios, admin, cargas masivas).
+INDICES = [
+    ("core_producto_busqueda", "core_producto", ("codigo", "codigo_barras")),
+    ("core_bodega_busqueda", "core_bodega", ("nombre",)),
+]
+
+
+def _sql_crear(indice, tabla, columnas):
+    cols = ", ".join(columnas)
+    nuevas = ", ".join(f"new.{c}" for c in columnas)
+    viejas = ", ".join(f"old.{c}" for c in columnas)
+    return [
+        f"CREATE VIRTUAL TABLE {indice} USING fts5({cols}, content='{tabla}', "
+        f"content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {indice}_ai AFTER INSERT ON {tabla} BEGIN "
+        f"INSERT INTO {indice}(rowid, {cols}) VALUES (new.id, {nuevas}); END",
+        f"CREATE TRIGGER {indice}_ad AFTER DELETE ON {tabla} BEGIN "
+        f"INSERT INTO {indice}({indice}, rowid, {cols}) VALUES ('delete', old.id, {viejas}); END",
+        f"CREATE TRIGGER {indice}_au AFTER UPDATE ON {tabla} BEGIN "
+        f"INSERT INTO {indice}({indice}, rowid, {cols}) VALUES ('delete', old.id, {viejas}); "
+        f"INSERT INTO {indice}(rowid, {cols}) VALUES (new.id, {nuevas}); END",
+        f"INSERT INTO {indice}({indice}) VALUES ('rebuild')",
+    ]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return  # otros motores usan la búsqueda por icontains
+    for indice, tabla, columnas in INDICES:
+        for sql in _sql_crear(indice, tabla, columnas):
+            schema_editor.execute(sql)
+
+
+def borrar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for indice, _, _ in INDICES:
+        for sufijo in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {indice}_{sufijo}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {indice}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_indices_inventario"),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, borrar_indices),
+    ]
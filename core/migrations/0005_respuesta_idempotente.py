@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_busqueda_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RespuestaIdempotente",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("endpoint", models.CharField(max_length=100)),
+                ("clave", models.CharField(max_length=255)),
+                ("huella", models.CharField(max_length=64)),
+                ("estado", models.CharField(default="EN_PROCESO", max_length=20)),
+                (
+                    "status_code",
+                    models.PositiveSmallIntegerField(blank=True, null=True),
+                ),
+                ("content_type", models.CharField(blank=True, max_length=100)),
+                ("contenido", models.BinaryField(blank=True, null=True)),
+                ("creada", models.DateTimeField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["creada"], name="respuesta_idempotente_ttl_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("endpoint", "clave"),
+                        name="respuesta_idempotente_clave_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_respuesta_idempotente"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="direccion",
+            name="latitud",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="direccion",
+            name="longitud",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0006_direccion_coordenadas"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="inventario",
+            name="inventario_producto_bodega_idx",
+        ),
+        migrations.AddIndex(
+            model_name="inventario",
+            index=models.Index(
+                fields=["producto", "bodega", "cantidad_disponible"],
+                name="inventario_stock_producto_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 16:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0007_indice_stock_producto"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="pedido",
+            name="estado_actual",
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name="pedido",
+            name="fecha_estado",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="pedido",
+            index=models.Index(
+                fields=["estado_actual", "id"], name="pedido_estado_idx"
+            ),
+        ),
+    ]
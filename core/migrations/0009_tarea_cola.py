@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def poblar_cola(apps, schema_editor):
+    """nivel_prioridad desde prioridad y bodega desde la del trabajador asignado a la tarea."""
+    TareaLogistica = apps.get_model("core", "TareaLogistica")
+    for prioridad, nivel in (("ALTA", 0), ("MEDIA", 1), ("BAJA", 2)):
+        TareaLogistica.objects.filter(prioridad=prioridad).update(nivel_prioridad=nivel)
+
+    def bodega_de(modelo, campo):
+        return Subquery(apps.get_model("core", modelo).objects
+                        .filter(pk=OuterRef(campo)).values("bodega_asignada_id")[:1])
+
+    TareaLogistica.objects.filter(bodega__isnull=True).update(bodega_id=Coalesce(
+        bodega_de("Alistador", "alistador_id"),
+        bodega_de("Verificador", "verificador_id"),
+        bodega_de("Empacador", "empacador_id"),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0008_pedido_estado_actual"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tarealogistica",
+            name="bodega",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="tareas",
+                to="core.bodega",
+            ),
+        ),
+        migrations.AddField(
+            model_name="tarealogistica",
+            name="nivel_prioridad",
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="tarealogistica",
+            name="reclamos",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="tarealogistica",
+            name="vence_reclamo",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(poblar_cola, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="tarealogistica",
+            index=models.Index(
+                condition=models.Q(("estado", "PENDIENTE")),
+                fields=["bodega", "tipo", "nivel_prioridad", "id"],
+                name="tarea_cola_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tarealogistica",
+            index=models.Index(
+                condition=models.Q(("estado", "EN_PROCESO")),
+                fields=["bodega", "tipo", "vence_reclamo"],
+                name="tarea_reclamo_idx",
+            ),
+        ),
+    ]
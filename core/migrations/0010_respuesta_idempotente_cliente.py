@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0009_tarea_cola"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="respuestaidempotente",
+            name="respuesta_idempotente_clave_uniq",
+        ),
+        migrations.AddField(
+            model_name="respuestaidempotente",
+            name="cliente",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name="respuestaidempotente",
+            constraint=models.UniqueConstraint(
+                fields=("endpoint", "cliente", "clave"),
+                name="respuesta_idempotente_clave_uniq",
+            ),
+        ),
+    ]
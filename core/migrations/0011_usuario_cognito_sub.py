@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0010_respuesta_idempotente_cliente"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="administrador",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="alistador",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="contador",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="empacador",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="facturador",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="liderlogistica",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="vendedor",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="verificador",
+            name="cognito_sub",
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
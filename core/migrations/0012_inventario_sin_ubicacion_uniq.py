@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 17:27
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def verificar_duplicados(apps, schema_editor):
+    """Falla con un mensaje claro si hay inventario sin ubicación repetido antes de crear
+    la restricción única (como la 0003 para las filas con ubicación)."""
+    Inventario = apps.get_model("core", "Inventario")
+    duplicados = list(
+        Inventario.objects.filter(ubicacion__isnull=True, producto__isnull=False)
+        .values("bodega_id", "producto_id")
+        .annotate(n=Count("id"))
+        .filter(n__gt=1)
+        .order_by()[:20]
+    )
+    if duplicados:
+        raise RuntimeError(
+            "Hay registros de Inventario sin ubicación repetidos por (bodega, producto); "
+            "consolídelos en una sola fila por par (sumando cantidad_disponible y "
+            "cantidad_reservada y borrando el resto), ejecute reconstruir_resumen_stock y "
+            f"vuelva a migrar. Ejemplos: {duplicados}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_usuario_cognito_sub"),
+    ]
+
+    operations = [
+        migrations.RunPython(verificar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="inventario",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("ubicacion__isnull", True)),
+                fields=("bodega", "producto"),
+                name="inventario_bodega_producto_sin_ubicacion_uniq",
+            ),
+        ),
+    ]
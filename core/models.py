@@ -7,6 +7,8 @@ from django.db import models
 
 class Usuario(models.Model):
     nombre = models.CharField(max_length=100)
+    # `sub` del usuario en Cognito: las vistas autenticadas identifican así al trabajador
+    cognito_sub = models.CharField(max_length=64, unique=True, null=True, blank=True)
 
     class Meta:
         abstract = True
@@ -67,6 +69,8 @@ class Direccion(models.Model):
     referencias = models.TextField(blank=True, null=True)
     contacto_nombre = models.CharField(max_length=100)
     tel = models.CharField(max_length=20)
+    latitud = models.FloatField(null=True, blank=True)
+    longitud = models.FloatField(null=True, blank=True)
 
 
 # ============================================================
@@ -100,11 +104,11 @@ class CreditoCliente(models.Model):
 # ============================================================
 
 class Producto(models.Model):
-    codigo_barras = models.CharField(max_length=100)
+    codigo_barras = models.CharField(max_length=100, db_index=True)
     tipo = models.CharField(max_length=100)
     peso = models.FloatField()
     volumen = models.FloatField()
-    codigo = models.CharField(max_length=50)
+    codigo = models.CharField(max_length=50, db_index=True)
 
 
 # ============================================================
@@ -117,6 +121,9 @@ class Pedido(models.Model):
     direccion = models.ForeignKey(Direccion, on_delete=models.SET_NULL, null=True)
     condicion_pago = models.ForeignKey(CondicionPago, null=True, on_delete=models.SET_NULL)
     orden_compra = models.ForeignKey(OrdenCompraCliente, null=True, blank=True, on_delete=models.SET_NULL)
+    # último EstadoPedido del historial, mantenido por pedido_service.cambiar_estado
+    estado_actual = models.CharField(max_length=100, null=True, blank=True)
+    fecha_estado = models.DateTimeField(null=True, blank=True)
 
     # clean many-to-many to easily get only the list of products
     productos = models.ManyToManyField(
@@ -125,6 +132,12 @@ class Pedido(models.Model):
         related_name='pedidos'
     )
 
+    class Meta:
+        indexes = [
+            # pedidos en un estado, paginados por id (core.pagination): solo recorre esas filas
+            models.Index(fields=['estado_actual', 'id'], name='pedido_estado_idx'),
+        ]
+
 class ProductoPedido(models.Model):
     pedido = models.ForeignKey(
         Pedido,
@@ -215,6 +228,25 @@ class Inventario(models.Model):
     cantidad_reservada = models.IntegerField()
     ultima_actualizacion = models.DateTimeField()
 
+    class Meta:
+        constraints = [
+            # also serves the (bodega, producto) lookups of reservar / disponibilidad
+            models.UniqueConstraint(fields=['bodega', 'producto', 'ubicacion'],
+                                    name='inventario_bodega_producto_ubicacion_uniq'),
+            # NULL != NULL en el índice anterior: sin ubicación hacen falta uno propio
+            models.UniqueConstraint(fields=['bodega', 'producto'], condition=models.Q(ubicacion__isnull=True),
+                                    name='inventario_bodega_producto_sin_ubicacion_uniq'),
+        ]
+        indexes = [
+            # covers the stock reads of localizador/asignacion_service (SQLite adds the rowid)
+            models.Index(fields=['producto', 'bodega', 'cantidad_disponible'], name='inventario_stock_producto_idx'),
+            models.Index(fields=['cantidad_disponible'], name='inventario_disponible_idx'),
+            # bajo stock con el umbral por defecto (10), paginado por id: recorre solo esas filas
+            models.Index(fields=['id'], condition=models.Q(cantidad_disponible__lt=10),
+                         name='inventario_bajo_stock_idx'),
+            models.Index(fields=['ultima_actualizacion'], name='inventario_actualizacion_idx'),
+        ]
+
 
 # ============================================================
 #                          EVIDENCIA
@@ -239,7 +271,7 @@ class Evidencia(models.Model):
 
 class TareaLogistica(models.Model):
     tipo = models.CharField(max_length=100)
-    estado = models.CharField(max_length=100)
+    estado = models.CharField(max_length=100, db_index=True)
     prioridad = models.CharField(max_length=50)
     fecha_asignacion = models.DateTimeField()
     fecha_fin = models.DateTimeField(null=True, blank=True)
@@ -249,4 +281,70 @@ class TareaLogistica(models.Model):
     verificador = models.ForeignKey(Verificador, null=True, blank=True, on_delete=models.SET_NULL)
     empacador = models.ForeignKey(Empacador, null=True, blank=True, on_delete=models.SET_NULL)
     lider_logistica = models.ForeignKey(LiderLogistica, null=True, blank=True, on_delete=models.SET_NULL)
-    administrador = models.ForeignKey(Administrador, null=True, blank=True, on_delete=models.SET_NULL)
\ No newline at end of file
+    administrador = models.ForeignKey(Administrador, null=True, blank=True, on_delete=models.SET_NULL)
+
+    # cola de trabajo por bodega (core.services.tareas_service): sale por nivel_prioridad
+    # (0 ALTA, 1 MEDIA, 2 BAJA) y luego por id; vence_reclamo es el fin del lease del
+    # trabajador que la tiene EN_PROCESO
+    bodega = models.ForeignKey(Bodega, null=True, blank=True, on_delete=models.SET_NULL, related_name='tareas')
+    nivel_prioridad = models.PositiveSmallIntegerField(default=1)
+    vence_reclamo = models.DateTimeField(null=True, blank=True)
+    reclamos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # siguiente tarea pendiente de una bodega y tipo: la primera entrada del índice
+            models.Index(fields=['bodega', 'tipo', 'nivel_prioridad', 'id'],
+                         condition=models.Q(estado='PENDIENTE'), name='tarea_cola_idx'),
+            # leases vencidos que vuelven a la cola
+            models.Index(fields=['bodega', 'tipo', 'vence_reclamo'],
+                         condition=models.Q(estado='EN_PROCESO'), name='tarea_reclamo_idx'),
+        ]
+
+# ============================================================
+#          RESUMEN DE STOCK (mantenido por InventarioService)
+# ============================================================
+
+class ResumenStockBodega(models.Model):
+    bodega = models.OneToOneField(Bodega, on_delete=models.CASCADE, related_name='resumen_stock')
+    total_disponible = models.BigIntegerField(default=0)
+    total_reservado = models.BigIntegerField(default=0)
+    registros = models.IntegerField(default=0)
+    stockouts = models.IntegerField(default=0)
+    ultima_actualizacion = models.DateTimeField(null=True, blank=True)
+
+
+class ResumenStockProducto(models.Model):
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='resumen_stock')
+    total_disponible = models.BigIntegerField(default=0)
+    total_reservado = models.BigIntegerField(default=0)
+    registros = models.IntegerField(default=0)
+    stockouts = models.IntegerField(default=0)
+    ultima_actualizacion = models.DateTimeField(null=True, blank=True)
+
+
+# ============================================================
+#        IDEMPOTENCIA (respuestas por Idempotency-Key)
+# ============================================================
+
+class RespuestaIdempotente(models.Model):
+    EN_PROCESO = 'EN_PROCESO'
+    COMPLETADA = 'COMPLETADA'
+
+    endpoint = models.CharField(max_length=100)
+    cliente = models.CharField(max_length=64, blank=True)  # sub del token o IP
+    clave = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64)  # sha256 de los parámetros de la petición
+    estado = models.CharField(max_length=20, default=EN_PROCESO)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    contenido = models.BinaryField(null=True, blank=True)
+    creada = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'cliente', 'clave'], name='respuesta_idempotente_clave_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['creada'], name='respuesta_idempotente_ttl_idx'),
+        ]
@@ -0,0 +1,120 @@
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+LIMITE_DEFECTO = 100
+LIMITE_MAXIMO = 1000
+CHUNK_SIZE = 2000
+NDJSON = 'application/x-ndjson'
+
+
+def entero(request, nombre, defecto=None, minimo=1, maximo=None, requerido=False):
+    """Parámetro entero de la query string (`defecto` si falta, o error si es `requerido`);
+    ValueError si no es un entero o queda fuera de [minimo, maximo]."""
+    valor = request.GET.get(nombre)
+    if valor in (None, ''):
+        if requerido:
+            raise ValueError(f"{nombre} is required")
+        return defecto
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} must be an integer")
+    if valor < minimo:
+        raise ValueError(f"{nombre} must be >= {minimo}")
+    if maximo is not None and valor > maximo:
+        raise ValueError(f"{nombre} must be <= {maximo}")
+    return valor
+
+
+def quiere_ndjson(request):
+    return request.GET.get('formato') == 'ndjson' or NDJSON in request.META.get('HTTP_ACCEPT', '')
+
+
+def _parametros(request):
+    """(cursor, ndjson, limite) de la query string; ValueError si son inválidos."""
+    cursor = entero(request, 'cursor', None, 0)
+    ndjson = quiere_ndjson(request)
+    limite = entero(request, 'limit', None if ndjson else LIMITE_DEFECTO, 1)
+    if not ndjson:
+        limite = min(limite, LIMITE_MAXIMO)
+    return cursor, ndjson, limite
+
+
+def _filas(qs, campos, cursor):
+    qs = qs.order_by('id')
+    if cursor is not None:
+        qs = qs.filter(id__gt=cursor)
+    return qs.values(*campos)
+
+
+def _pagina(request, filas, limite, serializar):
+    """Respuesta JSON con `filas` (hasta limite + 1 leídas) y el cursor siguiente."""
+    siguiente = filas[limite - 1]['id'] if len(filas) > limite else None
+    response = JsonResponse([serializar(f) for f in filas[:limite]], safe=False)
+    if siguiente is not None:
+        parametros = request.GET.copy()
+        parametros['cursor'] = siguiente
+        parametros['limit'] = limite
+        response['X-Next-Cursor'] = str(siguiente)
+        response['Link'] = f'<{request.path}?{parametros.urlencode()}>; rel="next"'
+    return response
+
+
+def _linea(fila, serializar):
+    return json.dumps(serializar(fila), cls=DjangoJSONEncoder) + '\n'
+
+
+def paginar(request, qs, campos, serializar):
+    """
+    Keyset (id) pagination for list endpoints.
+
+    JSON mode (default): returns up to ?limit= rows (default 100, max 1000) with id greater
+    than ?cursor=, as a JSON array. When more rows exist the next cursor is sent in the
+    X-Next-Cursor header and as a Link rel="next" URL.
+    NDJSON mode (?formato=ndjson or Accept: application/x-ndjson): streams every row after
+    ?cursor= (up to ?limit= if given) one JSON object per line, reading the queryset with
+    .values().iterator() so memory stays flat for full exports.
+
+    `campos` are the .values() fields (must include 'id'); `serializar` maps a values()
+    row to the output dict.
+    """
+    try:
+        cursor, ndjson, limite = _parametros(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    filas = _filas(qs, campos, cursor)
+    if ndjson:
+        if limite is not None:
+            filas = filas[:limite]
+
+        def lineas():
+            for fila in filas.iterator(chunk_size=CHUNK_SIZE):
+                yield _linea(fila, serializar)
+
+        return StreamingHttpResponse(lineas(), content_type=NDJSON)
+
+    return _pagina(request, list(filas[:limite + 1]), limite, serializar)
+
+
+async def apaginar(request, qs, campos, serializar):
+    """paginar() para vistas async: mismo contrato, leyendo con el ORM async
+    (el modo NDJSON transmite desde .aiterator())."""
+    try:
+        cursor, ndjson, limite = _parametros(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    filas = _filas(qs, campos, cursor)
+    if ndjson:
+        if limite is not None:
+            filas = filas[:limite]
+
+        async def lineas():
+            async for fila in filas.aiterator(chunk_size=CHUNK_SIZE):
+                yield _linea(fila, serializar)
+
+        return StreamingHttpResponse(lineas(), content_type=NDJSON)
+
+    return _pagina(request, [f async for f in filas[:limite + 1]], limite, serializar)
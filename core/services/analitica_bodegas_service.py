@@ -0,0 +1,74 @@
+import math
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import ExpressionWrapper, F, FloatField
+from django.db.models.functions import Cast
+from ..models import Bodega, Inventario
+
+# Percentiles de la proporción disponible que se reportan además de la mediana
+PERCENTILES = (10, 25, 75, 90)
+
+# Filas leídas por viaje a la base de datos al recorrer el inventario
+TAMANO_LOTE = 10_000
+
+
+def proporcion_disponible():
+    """disponible / (disponible + reservado) de un registro, calculada en la base de datos."""
+    return ExpressionWrapper(
+        Cast('cantidad_disponible', FloatField()) / (F('cantidad_disponible') + F('cantidad_reservada')),
+        output_field=FloatField(),
+    )
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) de una lista ordenada, con interpolación lineal entre los dos
+    valores vecinos (el método por defecto de numpy.percentile)."""
+    posicion = (len(ordenados) - 1) * p / 100
+    inferior = math.floor(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+def _resumen(proporciones, percentiles):
+    return {
+        'registros': len(proporciones),
+        'promedio': math.fsum(proporciones) / len(proporciones),
+        'mediana': percentil(proporciones, 50),
+        'percentiles': {f'p{p}': percentil(proporciones, p) for p in percentiles},
+    }
+
+
+def proporciones_por_bodega(bodega_id=None, percentiles=PERCENTILES):
+    """{bodega_id: {registros, promedio, mediana, percentiles}} de la proporción disponible
+    de los registros con reservas (sin reservas la proporción siempre es 1).
+
+    Una sola consulta: la base calcula la proporción y entrega las filas ya ordenadas por
+    bodega y proporción, que se recorren por lotes; en memoria queda una bodega a la vez.
+    """
+    filas = Inventario.objects.exclude(cantidad_reservada=0)
+    if bodega_id:
+        filas = filas.filter(bodega_id=bodega_id)
+    proporcion = proporcion_disponible()
+    filas = (filas.order_by('bodega_id', proporcion)
+             .values_list('bodega_id', proporcion)
+             .iterator(chunk_size=TAMANO_LOTE))
+    return {
+        bodega: _resumen([valor for _, valor in grupo], percentiles)
+        for bodega, grupo in groupby(filas, key=itemgetter(0))
+    }
+
+
+def estadisticas_por_bodega(bodega_id=None, percentiles=PERCENTILES):
+    """proporciones_por_bodega() con los datos de cada bodega para el mapa (nombre,
+    dirección, coordenadas; None si la bodega no tiene coordenadas). Las bodegas sin
+    registros con reservas no aparecen."""
+    estadisticas = proporciones_por_bodega(bodega_id, percentiles)
+    bodegas = Bodega.objects.all()
+    if bodega_id:
+        bodegas = bodegas.filter(id=bodega_id)
+    for id_, nombre, direccion, latitud, longitud in bodegas.values_list(
+            'id', 'nombre', 'direccion', 'latitud', 'longitud'):
+        if id_ in estadisticas:
+            estadisticas[id_].update(nombre=nombre, direccion=direccion, latitud=latitud, longitud=longitud)
+    return estadisticas
@@ -0,0 +1,254 @@
+from collections import defaultdict
+from itertools import combinations
+
+from django.db.models import Sum
+
+from ..models import Bodega, Inventario
+from . import localizador_service
+from .inventario_service import InventarioService, StockInsuficiente
+
+# Veces que se recalcula la asignación si otra reserva se llevó el stock entre la
+# lectura y el bloqueo de las filas
+INTENTOS_RESERVA = 3
+
+SIN_DISTANCIA = float('inf')
+
+# resolver() prueba todos los subconjuntos de bodegas candidatas mientras
+# 2^bodegas x líneas no pase de esto (unos 0.1 s en el peor caso)
+EXACTO_PRESUPUESTO = 100_000
+
+
+def pedidas_de_pedido(pedido):
+    """{producto_id: cantidad} de las líneas del pedido (productos repetidos se suman)."""
+    return dict(pedido.items.values('producto_id').annotate(total=Sum('cantidad'))
+                .order_by('producto_id').values_list('producto_id', 'total'))
+
+
+def stock_candidato(producto_ids):
+    """{producto_id: {bodega_id: disponible}} de todas las bodegas con stock de los productos,
+    en una consulta. Como reservar, en cada bodega cuenta su primer registro.
+
+    Tuplas (values_list) y no instancias: con cientos de líneas son decenas de miles de
+    filas. Sin ORDER BY, así se lee solo el índice producto/bodega/disponible; el primer
+    registro de cada par se elige por id aquí.
+    """
+    stock = defaultdict(dict)
+    if not producto_ids:
+        return stock
+    filas = (Inventario.objects.filter(producto_id__in=producto_ids).order_by()
+             .values_list('id', 'producto_id', 'bodega_id', 'cantidad_disponible'))
+    primeros = {}
+    for fila_id, producto_id, bodega_id, disponible in filas:
+        previo = primeros.get((producto_id, bodega_id))
+        if previo is None or fila_id < previo[0]:
+            primeros[(producto_id, bodega_id)] = (fila_id, disponible)
+    for (producto_id, bodega_id), (_, disponible) in primeros.items():
+        if disponible > 0:
+            stock[producto_id][bodega_id] = disponible
+    return stock
+
+
+def _cubiertas(elegidas, cubre, objetivo):
+    resultado = set()
+    for bodega_id in elegidas:
+        resultado |= cubre[bodega_id]
+    return resultado & objetivo
+
+
+def _mejorar(elegidas, cubre, objetivo, distancia):
+    """Búsqueda local sobre el cubrimiento voraz, hasta que nada mejora: quitar una bodega
+    cuyas líneas ya cubren las demás, reemplazar dos bodegas por una que cubra lo que solo
+    ellas cubren, o cambiar una por otra más cercana que cubra lo que solo ella cubre."""
+    por_linea = defaultdict(list)  # producto_id -> bodegas que lo cubren, de la más cercana
+    for bodega_id in sorted(cubre, key=lambda b: (distancia(b), b)):
+        for producto_id in cubre[bodega_id]:
+            por_linea[producto_id].append(bodega_id)
+
+    def reemplazo(faltan, hasta=None):
+        # la primera bodega no elegida, por distancia, que cubre todas las líneas: basta
+        # recorrer las que cubren la línea con menos bodegas
+        if not faltan:
+            return None
+        escasa = min(faltan, key=lambda p: (len(por_linea[p]), p))
+        for c in por_linea[escasa]:
+            if hasta is not None and (distancia(c), c) >= hasta:
+                return None
+            if c not in elegidas and faltan <= cubre[c]:
+                return c
+        return None
+
+    while True:
+        sobrante = next((b for b in sorted(elegidas, key=lambda b: (-distancia(b), -b))
+                         if _cubiertas(elegidas - {b}, cubre, objetivo) == objetivo), None)
+        if sobrante is not None:
+            elegidas.discard(sobrante)
+            continue
+
+        ordenadas = sorted(elegidas)
+        fusion = next(((a, b, c) for i, a in enumerate(ordenadas) for b in ordenadas[i + 1:]
+                       for c in [reemplazo(objetivo - _cubiertas(elegidas - {a, b}, cubre, objetivo))]
+                       if c is not None), None)
+        if fusion is not None:
+            a, b, c = fusion
+            elegidas -= {a, b}
+            elegidas.add(c)
+            continue
+
+        cambio = next(((b, c) for b in sorted(elegidas, key=lambda b: (-distancia(b), -b))
+                       for c in [reemplazo(objetivo - _cubiertas(elegidas - {b}, cubre, objetivo),
+                                           hasta=(distancia(b), b))]
+                       if c is not None), None)
+        if cambio is None:
+            return elegidas
+        b, c = cambio
+        elegidas.discard(b)
+        elegidas.add(c)
+
+
+def _exacto(pedidas, stock, bodegas, distancia):
+    """Las bodegas del menor subconjunto de `bodegas` con stock para todas las líneas
+    (partiéndolas si hace falta), el más cercano en empate; por fuerza bruta, de a tamaños
+    crecientes."""
+    lineas = [(cantidad, [stock[producto_id].get(b, 0) for b in bodegas])
+              for producto_id, cantidad in pedidas.items()]
+    for tamano in range(1, len(bodegas) + 1):
+        mejor = min(((sum(distancia(bodegas[i]) for i in indices), indices)
+                     for indices in combinations(range(len(bodegas)), tamano)
+                     if all(sum(por_bodega[i] for i in indices) >= cantidad for cantidad, por_bodega in lineas)),
+                    default=None)
+        if mejor is not None:
+            return {bodegas[i] for i in mejor[1]}
+    return set()
+
+
+def _partir(producto_ids, pedidas, stock, envios, distancia, bodegas=None):
+    """Reparte cada línea entre las bodegas (todas las que tienen stock, o solo `bodegas`),
+    empezando por las que ya envían algo y luego por las de más stock. Devuelve lo que
+    no se pudo asignar."""
+    faltantes = {}
+    for producto_id in sorted(producto_ids, key=lambda p: (-pedidas[p], p)):
+        restante = pedidas[producto_id]
+        disponibles = stock.get(producto_id, {})
+        if bodegas is not None:
+            disponibles = {b: d for b, d in disponibles.items() if b in bodegas}
+        for bodega_id in sorted(disponibles, key=lambda b: (b not in envios, -disponibles[b], distancia(b), b)):
+            tomado = min(restante, disponibles[bodega_id])
+            envios[bodega_id][producto_id] = tomado
+            restante -= tomado
+            if not restante:
+                break
+        if restante:
+            faltantes[producto_id] = restante
+    return faltantes
+
+
+def resolver(pedidas, stock, distancias=None):
+    """Reparte las líneas ({producto_id: cantidad}) entre bodegas con el stock dado
+    ({producto_id: {bodega_id: disponible}}), minimizando primero la cantidad de envíos
+    y después la distancia (`distancias`: {bodega_id: km}; sin ella solo cuentan los envíos).
+
+    En instancias chicas (EXACTO_PRESUPUESTO) el óptimo se busca por fuerza bruta
+    (_exacto). Con más, las líneas que alguna bodega cubre entera se asignan con un
+    cubrimiento voraz (la bodega que cubre más líneas pendientes, la más cercana en
+    empate) mejorado por búsqueda local, y las demás se parten. Devuelve ({bodega_id:
+    {producto_id: cantidad}}, {producto_id: cantidad que no se pudo asignar}).
+    """
+    distancias = distancias or {}
+
+    def distancia(bodega_id):
+        return distancias.get(bodega_id, SIN_DISTANCIA)
+
+    cubre = defaultdict(set)
+    for producto_id, cantidad in pedidas.items():
+        for bodega_id, disponible in stock.get(producto_id, {}).items():
+            if disponible >= cantidad:
+                cubre[bodega_id].add(producto_id)
+
+    candidatas = sorted({b for producto_id in pedidas for b in stock.get(producto_id, {})})
+    exacto = 2 ** len(candidatas) * len(pedidas) <= EXACTO_PRESUPUESTO
+    if exacto:
+        # las líneas sin stock suficiente ni sumando todas las bodegas no entran a la búsqueda
+        alcanzan = {p: c for p, c in pedidas.items() if sum(stock.get(p, {}).values()) >= c}
+        elegidas = _exacto(alcanzan, stock, candidatas, distancia)
+        objetivo = {p for p in alcanzan if any(p in cubre[b] for b in elegidas)}
+    else:
+        objetivo = set().union(*cubre.values())
+        elegidas = set()
+        pendientes = set(objetivo)
+        while pendientes:
+            mejor = min(cubre, key=lambda b: (-len(cubre[b] & pendientes), distancia(b), b))
+            elegidas.add(mejor)
+            pendientes -= cubre[mejor]
+        elegidas = _mejorar(elegidas, cubre, objetivo, distancia)
+
+    envios = defaultdict(dict)
+    for producto_id in objetivo:
+        bodega_id = min((b for b in elegidas if producto_id in cubre[b]), key=lambda b: (distancia(b), b))
+        envios[bodega_id][producto_id] = pedidas[producto_id]
+    asignadas = set(objetivo)
+    if exacto:
+        # las elegidas alcanzan para partir las demás líneas que tienen stock
+        _partir(set(alcanzan) - objetivo, pedidas, stock, envios, distancia, bodegas=elegidas)
+        asignadas |= set(alcanzan)
+    faltantes = _partir(set(pedidas) - asignadas, pedidas, stock, envios, distancia)
+    return dict(envios), faltantes
+
+
+def asignar(pedidas, latitud=None, longitud=None):
+    """Plan de envíos para las líneas {producto_id: cantidad} hacia el punto dado:
+    {envios: [{bodega_id, nombre, distancia_km, lineas: [{producto_id, cantidad}]}],
+    faltantes: [{producto_id, cantidad}], total_envios, distancia_total_km}.
+    """
+    stock = stock_candidato(list(pedidas))
+    distancias = None
+    if latitud is not None and longitud is not None:
+        bodega_ids = {b for por_bodega in stock.values() for b in por_bodega}
+        distancias = localizador_service.indice().distancias_km(latitud, longitud, bodega_ids)
+    envios, faltantes = resolver(pedidas, stock, distancias)
+    distancias = distancias or {}
+
+    nombres = dict(Bodega.objects.filter(id__in=list(envios)).values_list('id', 'nombre'))
+    lista = [{
+        'bodega_id': bodega_id,
+        'nombre': nombres.get(bodega_id),
+        'distancia_km': round(distancias[bodega_id], 3) if bodega_id in distancias else None,
+        'lineas': [{'producto_id': p, 'cantidad': c} for p, c in sorted(lineas.items())],
+    } for bodega_id, lineas in envios.items()]
+    lista.sort(key=lambda e: (e['distancia_km'] is None, e['distancia_km'] or 0, e['bodega_id']))
+    return {
+        'envios': lista,
+        'faltantes': [{'producto_id': p, 'cantidad': c} for p, c in sorted(faltantes.items())],
+        'total_envios': len(lista),
+        'distancia_total_km': round(sum(distancias.get(e['bodega_id'], 0) for e in lista), 3),
+    }
+
+
+def lineas_de_reserva(plan):
+    """Líneas del plan en el formato de InventarioService.reservar_lote."""
+    return [{'producto_id': linea['producto_id'], 'bodega_id': envio['bodega_id'], 'cantidad': linea['cantidad']}
+            for envio in plan['envios'] for linea in envio['lineas']]
+
+
+def asignar_pedido(pedido, latitud=None, longitud=None, reservar=False):
+    """asignar() para las líneas de un Pedido, hacia su dirección de entrega si tiene
+    coordenadas (o el punto dado). Con `reservar`, reserva el plan completo en una sola
+    transacción (reservar_lote): si a otra reserva le tocó el stock entre la lectura y el
+    bloqueo se recalcula el plan; si hay faltantes no se reserva nada. El plan lleva
+    `reservado` indicando si quedó reservado.
+    """
+    if latitud is None and pedido.direccion_id:
+        latitud, longitud = pedido.direccion.latitud, pedido.direccion.longitud
+    pedidas = pedidas_de_pedido(pedido)
+    for intento in range(1, INTENTOS_RESERVA + 1):
+        plan = asignar(pedidas, latitud, longitud)
+        plan['reservado'] = False
+        if not reservar or plan['faltantes'] or not plan['envios']:
+            return plan
+        try:
+            InventarioService.reservar_lote(lineas_de_reserva(plan))
+        except StockInsuficiente:
+            if intento == INTENTOS_RESERVA:
+                raise
+            continue
+        plan['reservado'] = True
+        return plan
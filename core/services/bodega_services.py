@@ -1,6 +1,7 @@
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import Avg
 from ..models import Bodega
+from . import analitica_bodegas_service
 
 # CREATE
 def crear_bodega(codigo, nombre, ciudad, direccion, capacidad):
@@ -46,37 +47,11 @@ def eliminar_bodega(bodega_id):
 def obtener_bodegas_por_ciudad(ciudad):
     return Bodega.objects.filter(ciudad=ciudad)
 
+# Promedio de disponible / (disponible + reservado) en los registros con reservas
+# (ver analitica_bodegas_service: una consulta en vez de una por bodega)
 def obtener_promedio_inventario(bodega_id):
-    bodega = obtener_bodega_por_id(bodega_id)
-    if not bodega:
-        return None
-    inventarios = bodega.inventarios.all()
-    total = 0
-    count = 0
-
-    for inv in inventarios:
-        if inv.cantidad_reservada and inv.cantidad_reservada != 0:
-            total += inv.cantidad_disponible / (inv.cantidad_reservada+ inv.cantidad_disponible)
-            count += 1
-
-    if count == 0:
-        return None 
-
-    return (total / count)
+    estadisticas = analitica_bodegas_service.proporciones_por_bodega(bodega_id).get(int(bodega_id))
+    return estadisticas['promedio'] if estadisticas else None
 
 def obtener_promedio_todas_bodegas():
-    bodegas = Bodega.objects.all()
-    res={}
-
-    for bodega in bodegas:
-        promedio = obtener_promedio_inventario(bodega.id)
-        if promedio is not None:
-            res[bodega.id] = {
-    "promedio": promedio,
-    "nombre": bodega.nombre,
-    "direccion": bodega.direccion,
-    "latitud": float(bodega.latitud),
-    "longitud": float(bodega.longitud),
-}
-            
-    return res
\ No newline at end of file
+    return analitica_bodegas_service.estadisticas_por_bodega()
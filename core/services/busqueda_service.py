@@ -0,0 +1,126 @@
+from django.db import connection
+from django.db.models import F, Q, Sum
+from ..models import Bodega, Producto, ResumenStockBodega, ResumenStockProducto
+
+# Índices FTS5 creados por la migración 0004 (solo SQLite)
+INDICE_PRODUCTOS = 'core_producto_busqueda'
+INDICE_BODEGAS = 'core_bodega_busqueda'
+
+# El tokenizer trigram necesita al menos 3 caracteres para usar el índice
+MINIMO_TRIGRAMA = 3
+
+# Con más coincidencias que esto el texto no es selectivo: se filtra por join
+MAXIMO_IDS = 500
+
+# Fracción del inventario a partir de la cual filtrar por el índice de la FK (y ordenar)
+# sale más caro que recorrer en orden de id hasta llenar la página
+SELECTIVIDAD_MAXIMA_INDICE = 0.05
+
+
+def _usa_fts(texto):
+    return connection.vendor == 'sqlite' and len(texto) >= MINIMO_TRIGRAMA
+
+
+def _frase(texto):
+    """Texto del usuario como frase FTS5: coincide como subcadena, sin operadores."""
+    return '"' + texto.replace('"', '""') + '"'
+
+
+def _like_prefijo(texto):
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+# Ids coincidentes (para filtrar Inventario por FK)
+
+def _ids(indice, texto):
+    """Hasta MAXIMO_IDS + 1 rowids del índice FTS que contienen `texto`."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {indice} WHERE {indice} MATCH %s LIMIT %s",
+            [_frase(texto), MAXIMO_IDS + 1],
+        )
+        ids = [fila[0] for fila in cursor.fetchall()]
+    return ids if len(ids) <= MAXIMO_IDS else None
+
+
+def ids_productos(texto):
+    """Ids de productos cuyo codigo o codigo_barras contiene `texto`, o None si no se
+    usa el índice o hay demasiados para que filtrar por id valga la pena."""
+    return _ids(INDICE_PRODUCTOS, texto) if _usa_fts(texto) else None
+
+
+def ids_bodegas(texto):
+    """Ids de bodegas cuyo nombre contiene `texto` (o None, como ids_productos)."""
+    return _ids(INDICE_BODEGAS, texto) if _usa_fts(texto) else None
+
+
+# Filtro de Inventario
+
+def _filtrar_por_ids(qs, campo, ids):
+    """Filtra por `campo` IN `ids`. Si según el resumen de stock esas claves cubren mucho
+    inventario, el filtro va sobre `campo + 0`: el motor no usa el índice de la FK y
+    recorre por id, cortando en cuanto completa la página en vez de leer y ordenar todo.
+    """
+    if not ids:
+        return qs.none()
+    resumen = ResumenStockBodega if campo == 'bodega_id' else ResumenStockProducto
+    total = ResumenStockBodega.objects.aggregate(n=Sum('registros'))['n']
+    coincidencias = resumen.objects.filter(**{f'{campo}__in': ids}).aggregate(n=Sum('registros'))['n']
+    if total and (coincidencias or 0) > total * SELECTIVIDAD_MAXIMA_INDICE:
+        sin_indice = f'{campo}_sin_indice'
+        return qs.alias(**{sin_indice: F(campo) + 0}).filter(**{f'{sin_indice}__in': ids})
+    return qs.filter(**{f'{campo}__in': ids})
+
+
+def filtrar_inventario(qs, producto_codigo=None, bodega_nombre=None):
+    """Inventario cuyo producto (codigo o codigo_barras) y/o bodega (nombre) contienen
+    el texto. Los textos poco selectivos o cortos se filtran por join (icontains), que
+    con el orden por id termina en cuanto llena la página."""
+    if producto_codigo:
+        ids = ids_productos(producto_codigo)
+        if ids is None:
+            qs = qs.filter(Q(producto__codigo__icontains=producto_codigo) |
+                           Q(producto__codigo_barras__icontains=producto_codigo))
+        else:
+            qs = _filtrar_por_ids(qs, 'producto_id', ids)
+
+    if bodega_nombre:
+        ids = ids_bodegas(bodega_nombre)
+        if ids is None:
+            qs = qs.filter(bodega__nombre__icontains=bodega_nombre)
+        else:
+            qs = _filtrar_por_ids(qs, 'bodega_id', ids)
+
+    return qs
+
+
+# Resultados ordenados por relevancia (autocompletado)
+
+def buscar_productos(texto, limite=10):
+    """Productos que contienen `texto` en codigo o codigo_barras: primero los que
+    empiezan por él, luego por bm25.
+    """
+    if not _usa_fts(texto):
+        prefijo = Q(codigo__istartswith=texto) | Q(codigo_barras__istartswith=texto)
+        return (list(Producto.objects.filter(prefijo).order_by('codigo')[:limite]) +
+                list(Producto.objects.filter(Q(codigo__icontains=texto) | Q(codigo_barras__icontains=texto))
+                     .exclude(prefijo).order_by('codigo')[:limite]))[:limite]
+    return list(Producto.objects.raw(
+        f"SELECT p.* FROM {INDICE_PRODUCTOS} f JOIN core_producto p ON p.id = f.rowid "
+        f"WHERE {INDICE_PRODUCTOS} MATCH %s "
+        "ORDER BY CASE WHEN p.codigo LIKE %s ESCAPE '\\' OR p.codigo_barras LIKE %s ESCAPE '\\' "
+        "THEN 0 ELSE 1 END, f.rank LIMIT %s",
+        [_frase(texto), _like_prefijo(texto), _like_prefijo(texto), limite],
+    ))
+
+
+def buscar_bodegas(texto, limite=10):
+    """Bodegas cuyo nombre contiene `texto`: primero las que empiezan por él, luego por bm25."""
+    if not _usa_fts(texto):
+        return list(Bodega.objects.filter(nombre__icontains=texto).order_by('nombre')[:limite])
+    return list(Bodega.objects.raw(
+        f"SELECT b.* FROM {INDICE_BODEGAS} f JOIN core_bodega b ON b.id = f.rowid "
+        f"WHERE {INDICE_BODEGAS} MATCH %s "
+        "ORDER BY CASE WHEN b.nombre LIKE %s ESCAPE '\\' THEN 0 ELSE 1 END, f.rank LIMIT %s",
+        [_frase(texto), _like_prefijo(texto), limite],
+    ))
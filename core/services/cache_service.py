@@ -0,0 +1,96 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.timezone import localdate
+
+PREFIJO = 'dashboard'
+
+# Espacios de versión: 'inventario' se versiona por bodega (y 'global'); el resto solo global
+INVENTARIO = 'inventario'
+PRODUCTOS = 'productos'
+TAREAS = 'tareas'
+BODEGAS = 'bodegas'  # datos de las bodegas (coordenadas): índice de localizador_service
+ESPACIOS_POR_BODEGA = {INVENTARIO}
+GLOBAL = 'global'
+
+# Espacios que no cambian con escrituras sino con el reloj: su "versión" es el periodo
+# actual. DIA para lo calculado respecto de hoy (el aging por días de antigüedad).
+DIA = 'dia'
+ESPACIOS_DE_TIEMPO = {DIA: lambda: localdate().isoformat()}
+
+
+def timeout_respuestas():
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+
+def _clave_version(espacio, alcance):
+    return f"{PREFIJO}:v:{espacio}:{alcance}"
+
+
+def _alcance(espacio, alcance):
+    return alcance if espacio in ESPACIOS_POR_BODEGA else GLOBAL
+
+
+# Versiones
+
+def versiones(espacios, alcance=GLOBAL):
+    """Versión actual de cada espacio para el alcance dado, en una sola lectura del cache.
+
+    Una versión ausente (nunca creada o expulsada del cache) se inicializa con el reloj
+    en nanosegundos, así nunca reaparece un número ya usado con respuestas viejas.
+    """
+    claves = [_clave_version(e, _alcance(e, alcance)) for e in espacios if e not in ESPACIOS_DE_TIEMPO]
+    actuales = cache.get_many(claves)
+    resultado = []
+    for espacio in espacios:
+        if espacio in ESPACIOS_DE_TIEMPO:
+            resultado.append(ESPACIOS_DE_TIEMPO[espacio]())
+            continue
+        clave = _clave_version(espacio, _alcance(espacio, alcance))
+        version = actuales.get(clave)
+        if version is None:
+            cache.add(clave, time.time_ns(), timeout=None)
+            version = cache.get(clave)
+        resultado.append(version)
+    return tuple(resultado)
+
+
+def _incrementar(clave):
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.add(clave, time.time_ns(), timeout=None)
+
+
+def incrementar(espacio, alcances=(GLOBAL,)):
+    """Invalida las respuestas cacheadas del espacio cuando la transacción actual confirma."""
+    claves = {_clave_version(espacio, _alcance(espacio, a)) for a in alcances}
+
+    def aplicar():
+        for clave in claves:
+            _incrementar(clave)
+
+    transaction.on_commit(aplicar)
+
+
+def invalidar_bodegas(bodega_ids):
+    """Cambió el inventario de estas bodegas: invalida su alcance y el global."""
+    incrementar(INVENTARIO, [str(b) for b in bodega_ids if b is not None] + [GLOBAL])
+
+
+# Respuestas
+
+def clave_respuesta(nombre, parametros, versiones_actuales):
+    consulta = '&'.join(f"{k}={v}" for k, valores in sorted(parametros.lists()) for v in valores)
+    base = f"{nombre}?{consulta}|{'.'.join(str(v) for v in versiones_actuales)}"
+    return f"{PREFIJO}:r:{hashlib.sha1(base.encode('utf-8')).hexdigest()}"
+
+
+def obtener_respuesta(clave):
+    return cache.get(clave)
+
+
+def guardar_respuesta(clave, contenido, content_type):
+    cache.set(clave, (contenido, content_type), timeout=timeout_respuestas())
@@ -1,14 +1,26 @@
 import hashlib
 import hmac
 import json
+from json.encoder import encode_basestring
 from django.conf import settings
 
+# Same output as json.dumps(..., sort_keys=True, separators=(',', ':'), ensure_ascii=False),
+# built once instead of on every call
+_ENCODER = json.JSONEncoder(sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+# json.loads fails on anything whose first non-blank character is not one of these
+_INICIO_JSON = frozenset('{["-0123456789tfnNI')
+_BLANCOS_JSON = ' \t\n\r'
+
 
 class ChecksService:
     """Service for verifying message integrity using hash"""
     
     # Secret key for HMAC - store this in environment variables in production!
     SECRET_KEY = settings.HASH_KEY
+
+    # (key, HMAC already keyed with it): the key schedule runs once per process
+    _hmac_base = None
     
     @staticmethod
     def generar_hash(mensaje):
@@ -19,9 +31,19 @@ class ChecksService:
     @staticmethod
     def generar_hash_hmac(mensaje):
         """Generate HMAC-SHA256 hex digest for a message using the configured secret key."""
-        canonical = ChecksService._canonicalize(mensaje)
-        key = (ChecksService.SECRET_KEY or "").encode('utf-8')
-        return hmac.new(key, canonical.encode('utf-8'), hashlib.sha256).hexdigest()
+        firma = ChecksService._hmac()
+        firma.update(ChecksService._canonicalize(mensaje).encode('utf-8'))
+        return firma.hexdigest()
+
+    @staticmethod
+    def _hmac():
+        """Fresh copy of the keyed HMAC (rebuilt only if SECRET_KEY changes)."""
+        base = ChecksService._hmac_base
+        if base is None or base[0] is not ChecksService.SECRET_KEY:
+            clave = ChecksService.SECRET_KEY
+            base = (clave, hmac.new((clave or "").encode('utf-8'), digestmod=hashlib.sha256))
+            ChecksService._hmac_base = base
+        return base[1].copy()
     
     @staticmethod
     def verificar_integridad(hash_recibido, mensaje):
@@ -38,6 +60,14 @@ class ChecksService:
         except Exception:
             return False
 
+    @staticmethod
+    def verificar_lote(pares):
+        """
+        Verify several (hash_recibido, mensaje) pairs, e.g. one per item of a
+        multi-item request. Returns a list of booleans in the same order.
+        """
+        return [ChecksService.verificar_integridad(hash_recibido, mensaje) for hash_recibido, mensaje in pares]
+
     @staticmethod
     def _canonicalize(mensaje):
         """
@@ -47,8 +77,17 @@ class ChecksService:
          - Otherwise -> plain string
         This must match the client's stable stringify (sorted keys, no spaces).
         """
+        # Form payloads (flat dict of strings/None) are serialized directly
+        if type(mensaje) is dict:
+            plano = ChecksService._dict_plano(mensaje)
+            if plano is not None:
+                return plano
+
         # If client sent a JSON string, try to parse it to normalize
         if isinstance(mensaje, str):
+            # strings that cannot be JSON skip the (failing) parse
+            if mensaje.lstrip(_BLANCOS_JSON)[:1] not in _INICIO_JSON:
+                return mensaje
             try:
                 parsed = json.loads(mensaje)
                 mensaje = parsed
@@ -58,6 +97,21 @@ class ChecksService:
 
         if isinstance(mensaje, (dict, list)):
             # separators=(',', ':') removes spaces -> deterministic compact form
-            return json.dumps(mensaje, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+            return _ENCODER.encode(mensaje)
         # fallback
-        return str(mensaje)
\ No newline at end of file
+        return str(mensaje)
+
+    @staticmethod
+    def _dict_plano(mensaje):
+        """Canonical JSON for a dict with str keys and str/None values, or None otherwise."""
+        partes = []
+        for clave, valor in sorted(mensaje.items()):
+            if type(clave) is not str:
+                return None
+            if type(valor) is str:
+                partes.append(encode_basestring(clave) + ':' + encode_basestring(valor))
+            elif valor is None:
+                partes.append(encode_basestring(clave) + ':null')
+            else:
+                return None
+        return '{' + ','.join(partes) + '}'
\ No newline at end of file
@@ -0,0 +1,261 @@
+from datetime import timedelta
+
+from django.db.models import Count, F, Q, Sum, Window
+from django.db.models.functions import Coalesce
+from django.utils.timezone import localtime
+from ..models import Bodega, Inventario, ResumenStockProducto, TareaLogistica
+
+
+# Alcance (global o por bodega)
+
+def inventario_por_alcance(bodega_id=None):
+    qs = Inventario.objects.all()
+    if bodega_id:
+        qs = qs.filter(bodega_id=bodega_id)
+    return qs
+
+
+# Totales por bodega (mapa, mix disponible/reservado)
+
+def totales_por_bodega(bodega_id=None):
+    """Bodegas anotadas con `disp`, `res` y `stockouts` leídos del resumen de stock (O(bodegas))."""
+    qs = Bodega.objects.annotate(
+        disp=Coalesce(F('resumen_stock__total_disponible'), 0),
+        res=Coalesce(F('resumen_stock__total_reservado'), 0),
+        stockouts=Coalesce(F('resumen_stock__stockouts'), 0),
+    )
+    if bodega_id:
+        qs = qs.filter(id=bodega_id)
+    return qs
+
+
+# KPIs
+
+AGREGADOS_INVENTARIO = dict(
+    sku_count=Count('producto', distinct=True),
+    stockout_skus=Count('id', filter=Q(cantidad_disponible=0)),
+    total_disponible=Coalesce(Sum('cantidad_disponible'), 0),
+    total_reservado=Coalesce(Sum('cantidad_reservada'), 0),
+)
+
+AGREGADOS_RESUMEN_GLOBAL = dict(
+    total_warehouses=Count('id'),
+    total_capacity=Sum('capacidad'),
+    stockout_skus=Coalesce(Sum('resumen_stock__stockouts'), 0),
+    total_disponible=Coalesce(Sum('resumen_stock__total_disponible'), 0),
+    total_reservado=Coalesce(Sum('resumen_stock__total_reservado'), 0),
+)
+
+
+def _skus_con_stock():
+    return ResumenStockProducto.objects.filter(registros__gt=0)
+
+
+def agregar_inventario(bodega_id=None):
+    """Todos los agregados de inventario del alcance en una sola consulta condicional."""
+    return inventario_por_alcance(bodega_id).aggregate(**AGREGADOS_INVENTARIO)
+
+
+def agregar_resumen_global():
+    """Los mismos agregados que agregar_inventario() para el alcance global, más el
+    total de bodegas y la capacidad, leídos de los resúmenes de stock (O(bodegas + productos)).
+    """
+    agg = Bodega.objects.aggregate(**AGREGADOS_RESUMEN_GLOBAL)
+    agg['sku_count'] = _skus_con_stock().count()
+    return agg
+
+
+def calcular_kpis(bodega=None):
+    """KPIs del dashboard. Con bodega: una consulta condicional sobre su inventario
+    (los SKUs distintos por bodega no están en el resumen). Global: desde los resúmenes.
+    """
+    if bodega:
+        return _kpis(agregar_inventario(bodega.id), bodega)
+    return _kpis(agregar_resumen_global())
+
+
+async def acalcular_kpis(bodega=None):
+    """calcular_kpis() con el ORM async."""
+    if bodega:
+        return _kpis(await inventario_por_alcance(bodega.id).aaggregate(**AGREGADOS_INVENTARIO), bodega)
+    agg = await Bodega.objects.aaggregate(**AGREGADOS_RESUMEN_GLOBAL)
+    agg['sku_count'] = await _skus_con_stock().acount()
+    return _kpis(agg)
+
+
+def _kpis(agg, bodega=None):
+    if bodega:
+        total_warehouses = 1
+        total_capacity = bodega.capacidad or 1
+    else:
+        total_warehouses = agg['total_warehouses']
+        total_capacity = agg['total_capacity'] or 1
+
+    ocupado = agg['total_disponible'] + agg['total_reservado']
+    return {
+        "total_warehouses": total_warehouses,
+        "overall_occupancy_pct": round((ocupado / float(total_capacity)) * 100, 2),
+        "sku_count": agg['sku_count'],
+        "stockout_skus": agg['stockout_skus'],
+        "total_disponible": agg['total_disponible'],
+        "total_reservado": agg['total_reservado'],
+    }
+
+
+# Aging
+
+AGING_LIMITES = (30, 60, 90)
+AGING_MAX_BUCKETS = 12
+
+
+def parsear_limites_aging(valor):
+    """Convierte "30,60,90" en (30, 60, 90). Lanza ValueError si no son enteros
+    positivos estrictamente crecientes.
+    """
+    if not valor:
+        return AGING_LIMITES
+    try:
+        limites = tuple(int(x) for x in valor.split(','))
+    except ValueError:
+        raise ValueError("Los límites deben ser enteros separados por comas")
+    if len(limites) > AGING_MAX_BUCKETS:
+        raise ValueError(f"Máximo {AGING_MAX_BUCKETS} límites")
+    if limites[0] <= 0 or any(a >= b for a, b in zip(limites, limites[1:])):
+        raise ValueError("Los límites deben ser enteros positivos y crecientes")
+    return limites
+
+
+def etiquetas_aging(limites=AGING_LIMITES):
+    etiquetas, desde = [], 0
+    for limite in limites:
+        etiquetas.append(f"{desde}-{limite}")
+        desde = limite + 1
+    etiquetas.append(f">{limites[-1]}")
+    return etiquetas
+
+
+def calcular_aging(bodega_id=None, limites=AGING_LIMITES):
+    """Histograma de unidades disponibles por antigüedad de `ultima_actualizacion`,
+    calculado en la base de datos con una suma condicional por bucket.
+    """
+    agg = inventario_por_alcance(bodega_id).aggregate(**_agregados_aging(limites))
+    return _buckets_aging(agg, limites)
+
+
+async def acalcular_aging(bodega_id=None, limites=AGING_LIMITES):
+    agg = await inventario_por_alcance(bodega_id).aaggregate(**_agregados_aging(limites))
+    return _buckets_aging(agg, limites)
+
+
+def _agregados_aging(limites):
+    # antigüedad en días de calendario (desde la medianoche local de hoy): el resultado
+    # solo cambia con escrituras o de un día a otro, como su clave de cache (DIA)
+    medianoche = localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    agregados = {}
+    anterior = None
+    for i, limite in enumerate(limites):
+        # (hoy - fecha).days <= limite  <=>  fecha >= medianoche - limite días
+        corte = medianoche - timedelta(days=limite)
+        filtro = Q(ultima_actualizacion__gte=corte)
+        if anterior is not None:
+            filtro &= Q(ultima_actualizacion__lt=anterior)
+        agregados[f"b{i}"] = Coalesce(Sum('cantidad_disponible', filter=filtro), 0)
+        anterior = corte
+    agregados["resto"] = Coalesce(Sum('cantidad_disponible', filter=Q(ultima_actualizacion__lt=anterior)), 0)
+    return agregados
+
+
+def _buckets_aging(agg, limites):
+    return [agg[f"b{i}"] for i in range(len(limites))] + [agg["resto"]]
+
+
+# Top SKUs y tareas por estado
+
+def top_skus(bodega_id=None, limite=5):
+    """Productos con más unidades disponibles en el alcance: filas {nombre, total}."""
+    return (inventario_por_alcance(bodega_id)
+            .values(nombre=F('producto__codigo'))
+            .annotate(total=Sum('cantidad_disponible'))
+            .order_by('-total')[:limite])
+
+
+def tareas_por_estado(bodega_id=None):
+    """Tareas logísticas por estado: filas {estado, total}. Con bodega, las de su cola y
+    las de cualquier usuario asignado a ella."""
+    qs_tasks = TareaLogistica.objects.all()
+    if bodega_id:
+        qs_tasks = qs_tasks.filter(
+            Q(bodega_id=bodega_id) |
+            Q(alistador__bodega_asignada_id=bodega_id) |
+            Q(verificador__bodega_asignada_id=bodega_id) |
+            Q(empacador__bodega_asignada_id=bodega_id) |
+            Q(administrador__bodega_asignada_id=bodega_id)
+        )
+    return (qs_tasks
+            .values('estado')
+            .annotate(total=Count('id', distinct=True))
+            .order_by())
+
+
+# Dashboard completo (/api/dashboard/)
+
+def ranking_skus(bodega_id=None, limite=5):
+    """Las filas de top_skus() con `skus`: cuántos productos tienen inventario en el
+    alcance, contados sobre el mismo agrupamiento (COUNT(*) OVER ()). Se agrupa por
+    producto (no por código, que puede repetirse) y sin las filas sin producto, así que
+    `skus` es el Count('producto', distinct=True) de calcular_kpis(). Global, desde el
+    resumen por producto en vez de agrupar todo el inventario.
+    """
+    if bodega_id:
+        qs = (inventario_por_alcance(bodega_id)
+              .filter(producto__isnull=False)
+              .values('producto', nombre=F('producto__codigo'))
+              .annotate(total=Sum('cantidad_disponible')))
+    else:
+        qs = _skus_con_stock().values(nombre=F('producto__codigo'), total=F('total_disponible'))
+    return qs.annotate(skus=Window(Count('*'))).order_by('-total')[:limite]
+
+
+def armar_dashboard(bodegas, aging, ranking, tareas, limites=AGING_LIMITES, filtrada=False):
+    """Las secciones de /api/dashboard/ a partir de cuatro resultados: `bodegas` de
+    totales_por_bodega() (mix y, sumadas, los KPIs de stock), `aging` de calcular_aging(),
+    `ranking` de ranking_skus() (top SKUs y cantidad de SKUs) y `tareas` de
+    tareas_por_estado(). Con `filtrada`, `bodegas` trae solo la bodega del filtro.
+    """
+    bodega = bodegas[0] if filtrada else None
+    kpis = _kpis({
+        'total_warehouses': len(bodegas),
+        'total_capacity': sum(b.capacidad or 0 for b in bodegas),
+        'total_disponible': sum(b.disp for b in bodegas),
+        'total_reservado': sum(b.res for b in bodegas),
+        'stockout_skus': sum(b.stockouts for b in bodegas),
+        'sku_count': ranking[0]['skus'] if ranking else 0,
+    }, bodega)
+    return {
+        "kpis": {
+            "total_warehouses": kpis["total_warehouses"],
+            "overall_occupancy_pct": kpis["overall_occupancy_pct"],
+            "sku_count": kpis["sku_count"],
+            "stockout_skus": kpis["stockout_skus"],
+            "filtered_bodega_id": bodega.id if bodega else None,
+            "filtered_bodega_nombre": bodega.nombre if bodega else None,
+        },
+        "mix": {
+            "labels": [b.nombre for b in bodegas],
+            "disponible": [b.disp for b in bodegas],
+            "reservado": [b.res for b in bodegas],
+        },
+        "aging": {"labels": etiquetas_aging(limites), "data": aging},
+        "top_skus": {"labels": [x['nombre'] for x in ranking], "data": [x['total'] for x in ranking]},
+        "tareas": {"labels": [x['estado'] for x in tareas], "data": [x['total'] for x in tareas]},
+    }
+
+
+def datos_dashboard(bodega_id=None, limites=AGING_LIMITES):
+    """Todas las secciones del dashboard con cuatro consultas y un único recorrido del
+    inventario (el del aging). None si `bodega_id` no existe."""
+    bodegas = list(totales_por_bodega(bodega_id))
+    if bodega_id and not bodegas:
+        return None
+    return armar_dashboard(bodegas, calcular_aging(bodega_id, limites), list(ranking_skus(bodega_id)),
+                           list(tareas_por_estado(bodega_id)), limites, filtrada=bool(bodega_id))
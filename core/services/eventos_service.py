@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+import json
+import threading
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Tipos de evento del flujo /api/eventos/stock/
+STOCK = 'stock'
+RESYNC = 'resync'  # se descartaron eventos de un cliente lento: debe releer los totales
+
+# Campos de los deltas de stock, en el orden de resumen_stock_service.CAMPOS
+CAMPOS = ('disponible', 'reservado', 'registros', 'stockouts')
+
+
+def latido():
+    """Segundos sin eventos tras los que se envía un comentario para mantener viva la conexión."""
+    return getattr(settings, 'STOCK_EVENTS_HEARTBEAT', 15)
+
+
+def publicar_deltas(por_bodega):
+    """Publica un evento por bodega con sus deltas ({bodega_id: (disp, res, registros,
+    stockouts)}, como los de resumen_stock_service.deltas) cuando la transacción actual
+    confirma; si se revierte no se publica nada.
+    """
+    eventos = [
+        {'bodega_id': bodega_id, **dict(zip(CAMPOS, delta))}
+        for bodega_id, delta in por_bodega.items()
+        if bodega_id is not None and any(delta)
+    ]
+    if eventos:
+        transaction.on_commit(lambda: broker().publicar(eventos))
+
+
+def formatear(evento_id, tipo, datos):
+    """Un evento en formato text/event-stream."""
+    return f"id: {evento_id}\nevent: {tipo}\ndata: {json.dumps(datos, separators=(',', ':'))}\n\n"
+
+
+# Broker en memoria
+
+class Suscripcion:
+    """Eventos pendientes de un cliente del flujo. Vive en el event loop del cliente:
+    se crea, se le entregan eventos y se lee desde ese loop.
+    """
+
+    def __init__(self, bodega_id=None, maximo=1000):
+        self.bodega_id = bodega_id
+        self.maximo = maximo
+        self.loop = asyncio.get_running_loop()
+        self._pendientes = deque()
+        self._hay = asyncio.Event()
+        self._descartado = None  # id del último evento descartado
+
+    def entregar(self, lote):
+        """Encola los eventos (id, tipo, datos) del lote que son de su bodega."""
+        if self.bodega_id is not None:
+            lote = [e for e in lote if e[2]['bodega_id'] == self.bodega_id]
+            if not lote:
+                return
+        if len(self._pendientes) + len(lote) > self.maximo:
+            # cliente que no lee al ritmo de los cambios: en vez de acumular sin límite
+            # se descarta lo pendiente y se le avisa que relea los totales
+            self._pendientes.clear()
+            self._descartado = lote[-1][0]
+        else:
+            self._pendientes.extend(lote)
+        self._hay.set()
+
+    async def recibir(self, espera):
+        """Eventos (id, tipo, datos) pendientes, esperando hasta `espera` segundos a que
+        llegue alguno; [] si no llegó ninguno."""
+        try:
+            await asyncio.wait_for(self._hay.wait(), espera)
+        except asyncio.TimeoutError:
+            return []
+        self._hay.clear()
+        eventos = []
+        if self._descartado is not None:
+            eventos.append((self._descartado, RESYNC, {}))
+            self._descartado = None
+        eventos.extend(self._pendientes)
+        self._pendientes.clear()
+        return eventos
+
+
+class MemoriaEventos:
+    """Broker dentro del proceso: los clientes conectados a un proceso reciben los cambios
+    hechos por ese mismo proceso. Con varios workers, o si las escrituras no las atiende el
+    servidor ASGI que sirve el flujo, se reemplaza (STOCK_EVENTS_BROKER) por uno externo con
+    la misma interfaz: publicar(eventos), suscribir(bodega_id) y cancelar(suscripcion).
+    """
+
+    def __init__(self, maximo=None):
+        self.maximo = maximo or getattr(settings, 'STOCK_EVENTS_QUEUE', 1000)
+        self._por_loop = {}  # event loop -> suscripciones que se leen en él
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publicar(self, eventos):
+        """Reparte los eventos a todas las suscripciones. Se llama desde cualquier hilo:
+        despierta una vez a cada event loop (uno por servidor ASGI, no uno por cliente),
+        que entrega el lote a sus suscripciones."""
+        with self._lock:
+            lote = [(next(self._ids), STOCK, datos) for datos in eventos]
+            destinos = [(loop, list(suscripciones)) for loop, suscripciones in self._por_loop.items()]
+        for loop, suscripciones in destinos:
+            try:
+                loop.call_soon_threadsafe(_repartir, suscripciones, lote)
+            except RuntimeError:
+                pass  # el loop ya cerró; sus suscripciones se cancelan al terminar cada flujo
+
+    def suscribir(self, bodega_id=None):
+        """Nueva suscripción a los eventos de una bodega (o de todas). Llamar desde el
+        event loop que la va a leer."""
+        suscripcion = Suscripcion(bodega_id, self.maximo)
+        with self._lock:
+            self._por_loop.setdefault(suscripcion.loop, set()).add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            suscripciones = self._por_loop.get(suscripcion.loop, set())
+            suscripciones.discard(suscripcion)
+            if not suscripciones:
+                self._por_loop.pop(suscripcion.loop, None)
+
+    def suscriptores(self):
+        with self._lock:
+            return sum(len(s) for s in self._por_loop.values())
+
+
+def _repartir(suscripciones, lote):
+    for suscripcion in suscripciones:
+        suscripcion.entregar(lote)
+
+
+@lru_cache(maxsize=None)
+def _broker(ruta):
+    return import_string(ruta)()
+
+
+def broker():
+    """Broker configurado en STOCK_EVENTS_BROKER (ruta a la clase)."""
+    return _broker(getattr(settings, 'STOCK_EVENTS_BROKER', 'core.services.eventos_service.MemoriaEventos'))
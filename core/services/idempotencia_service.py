@@ -0,0 +1,115 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.timezone import now
+from ..models import RespuestaIdempotente
+
+LARGO_MAXIMO_CLAVE = 255
+
+# Veces que iniciar() vuelve a intentar cuando la fila de la clave desaparece entre el
+# INSERT rechazado y la lectura (descartar() o limpiar() concurrentes)
+INTENTOS_INICIO = 3
+
+# Resultados de iniciar()
+NUEVA = 'nueva'
+EN_PROCESO = 'en_proceso'
+OTRA_PETICION = 'otra_peticion'
+REPETIDA = 'repetida'
+
+
+def ttl():
+    """Cuánto se guarda la respuesta de una clave (IDEMPOTENCY_TTL, segundos)."""
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_TTL', 24 * 3600))
+
+
+def abandono():
+    """Tras cuánto una petición EN_PROCESO se da por abandonada (el proceso murió) y otra
+    con la misma clave puede tomar su lugar."""
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_IN_PROGRESS_TIMEOUT', 60))
+
+
+def cliente(request):
+    """A quién pertenecen las claves de la petición: el `sub` del token verificado por
+    require_auth o, en los endpoints sin él, la dirección del cliente. Dos clientes que
+    usen la misma Idempotency-Key no comparten respuestas."""
+    claims = getattr(request, 'cognito_claims', {})
+    return (claims.get('sub') or request.META.get('REMOTE_ADDR') or '')[:64]
+
+
+def huella(request):
+    """sha256 del método, la ruta y todos los parámetros de la petición, incluidos el
+    hash, nonce y timestamp de la firma: solo se devuelve la respuesta guardada a una
+    repetición exacta de la petición que la produjo (cuya firma ya se verificó, porque
+    solo se guardan respuestas 2xx). Un reintento con otra firma recibe OTRA_PETICION."""
+    partes = [request.method, request.path]
+    for origen in (request.GET, request.POST):
+        partes.extend(f"{k}={v}" for k, valores in sorted(origen.lists()) for v in valores)
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()
+
+
+def iniciar(endpoint, cliente_peticion, clave, huella_peticion):
+    """Reserva la clave del cliente para esta petición. Devuelve (resultado, registro):
+
+    - NUEVA: la petición debe procesarse (y luego completar() o descartar()).
+    - REPETIDA: misma clave y parámetros ya completada; el registro trae la respuesta.
+    - EN_PROCESO: otra petición con la clave todavía se está procesando (registro None
+      si la fila apareció y desapareció INTENTOS_INICIO veces seguidas).
+    - OTRA_PETICION: la clave ya se usó con otros parámetros.
+    """
+    filtro = {'endpoint': endpoint, 'cliente': cliente_peticion, 'clave': clave}
+    for _ in range(INTENTOS_INICIO):
+        momento = now()
+        try:
+            with transaction.atomic():
+                return NUEVA, RespuestaIdempotente.objects.create(
+                    **filtro, huella=huella_peticion, creada=momento)
+        except IntegrityError:
+            pass
+        registro = RespuestaIdempotente.objects.filter(**filtro).first()
+        if registro is not None:
+            break
+        # la borró descartar() o la limpieza entre el INSERT y esta lectura
+    else:
+        return EN_PROCESO, None
+
+    # vencida, o en proceso hace demasiado: se toma con un UPDATE condicional (gana uno)
+    if registro.creada < momento - ttl() or (
+            registro.estado == RespuestaIdempotente.EN_PROCESO and registro.creada < momento - abandono()):
+        tomada = RespuestaIdempotente.objects.filter(id=registro.id, creada=registro.creada).update(
+            huella=huella_peticion, estado=RespuestaIdempotente.EN_PROCESO, status_code=None,
+            content_type='', contenido=None, creada=momento)
+        if tomada:
+            registro.refresh_from_db()
+            return NUEVA, registro
+        return EN_PROCESO, registro
+
+    if registro.huella != huella_peticion:
+        return OTRA_PETICION, registro
+    if registro.estado == RespuestaIdempotente.EN_PROCESO:
+        return EN_PROCESO, registro
+    return REPETIDA, registro
+
+
+# Ambas filtran por `creada`: si la clave se dio por abandonada y la tomó otra petición,
+# la original ya no la modifica
+
+def completar(registro, response):
+    RespuestaIdempotente.objects.filter(id=registro.id, creada=registro.creada).update(
+        estado=RespuestaIdempotente.COMPLETADA,
+        status_code=response.status_code,
+        content_type=response['Content-Type'],
+        contenido=response.content,
+    )
+
+
+def descartar(registro):
+    """Libera la clave para que el cliente pueda reintentar (respuesta de error)."""
+    RespuestaIdempotente.objects.filter(id=registro.id, creada=registro.creada).delete()
+
+
+def limpiar(antes_de=None):
+    """Borra las respuestas con más de ttl(). Devuelve cuántas borró."""
+    antes_de = antes_de or now() - ttl()
+    return RespuestaIdempotente.objects.filter(creada__lt=antes_de).delete()[0]
@@ -0,0 +1,221 @@
+import csv
+import json
+import time
+from functools import reduce
+from itertools import islice
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+from ..models import Bodega, Inventario, Producto, Ubicacion
+from . import actualizacion_service, cache_service, eventos_service, resumen_stock_service
+
+TAMANO_LOTE = 5000
+FORMATOS = ('csv', 'ndjson')
+# Errores que se devuelven con detalle; el resto solo se cuentan
+MAXIMO_ERRORES_DETALLE = 100
+
+CAMPOS_ACTUALIZADOS = ['cantidad_disponible', 'cantidad_reservada', 'ultima_actualizacion']
+
+
+class ErrorFila(ValueError):
+    pass
+
+
+# Lectura en streaming (una fila a la vez, sin cargar el archivo)
+
+def leer_csv(lineas):
+    """Filas de un CSV con encabezado: producto, bodega, ubicacion (opcional),
+    cantidad_disponible, cantidad_reservada (opcional)."""
+    yield from csv.DictReader(lineas)
+
+
+def leer_ndjson(lineas):
+    """Filas de un NDJSON (un objeto por línea, mismas claves que el CSV)."""
+    for linea in lineas:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            fila = json.loads(linea)
+        except ValueError:
+            fila = None
+        # una línea inválida no corta la importación: se reporta como error de esa fila
+        yield fila if isinstance(fila, dict) else {'__invalida__': linea[:80]}
+
+
+def leer(lineas, formato):
+    if formato not in FORMATOS:
+        raise ValueError(f"formato debe ser uno de {FORMATOS}")
+    return leer_csv(lineas) if formato == 'csv' else leer_ndjson(lineas)
+
+
+# Resolución de códigos (mapas construidos una vez por importación)
+
+def _mapa(valores):
+    """{codigo: id} quedándose con el menor id si el código se repite."""
+    mapa = {}
+    for codigo, pk in valores:
+        mapa.setdefault(str(codigo).strip(), pk)
+    return mapa
+
+
+def construir_mapas():
+    """Mapas código -> id de productos (codigo y codigo_barras), bodegas y ubicaciones."""
+    productos = _mapa(Producto.objects.order_by('id').values_list('codigo', 'id'))
+    por_barras = _mapa(Producto.objects.order_by('id').values_list('codigo_barras', 'id'))
+    for codigo, pk in por_barras.items():
+        productos.setdefault(codigo, pk)
+    return {
+        'producto': productos,
+        'bodega': _mapa(Bodega.objects.order_by('id').values_list('codigo', 'id')),
+        'ubicacion': _mapa(Ubicacion.objects.order_by('id').values_list('codigo', 'id')),
+    }
+
+
+def _cantidad(fila, campo, defecto=None):
+    valor = fila.get(campo)
+    if valor in (None, ''):
+        if defecto is None:
+            raise ErrorFila(f"falta {campo}")
+        return defecto
+    # int() truncaría 2.7 (NDJSON) y aceptaría true: solo enteros, o reales sin decimales
+    if isinstance(valor, bool) or (isinstance(valor, float) and not valor.is_integer()):
+        raise ErrorFila(f"{campo} debe ser entero")
+    try:
+        valor = int(valor)
+    except (TypeError, ValueError, OverflowError):
+        raise ErrorFila(f"{campo} debe ser entero")
+    if valor < 0:
+        raise ErrorFila(f"{campo} no puede ser negativo")
+    return valor
+
+
+def _codigo(fila, campo, mapas, opcional=False):
+    codigo = fila.get(campo)
+    codigo = '' if codigo is None else str(codigo).strip()
+    if not codigo:
+        if opcional:
+            return None
+        raise ErrorFila(f"falta {campo}")
+    try:
+        return mapas[campo][codigo]
+    except KeyError:
+        raise ErrorFila(f"{campo} desconocido: {codigo}")
+
+
+def resolver(fila, mapas):
+    """(bodega_id, producto_id, ubicacion_id), (disponible, reservado) de una fila."""
+    if '__invalida__' in fila:
+        raise ErrorFila("JSON inválido")
+    clave = (
+        _codigo(fila, 'bodega', mapas),
+        _codigo(fila, 'producto', mapas),
+        _codigo(fila, 'ubicacion', mapas, opcional=True),
+    )
+    return clave, (_cantidad(fila, 'cantidad_disponible'), _cantidad(fila, 'cantidad_reservada', 0))
+
+
+# Escritura por lotes
+
+def _existentes(claves):
+    """{(bodega, producto, ubicacion): (id, disponible, reservado)} de las claves del lote,
+    bloqueadas hasta el fin de la transacción. Una condición por bodega (usa el índice único)."""
+    por_bodega = {}
+    for bodega_id, producto_id, _ in claves:
+        por_bodega.setdefault(bodega_id, set()).add(producto_id)
+    condicion = reduce(or_, (Q(bodega_id=b, producto_id__in=ps) for b, ps in por_bodega.items()))
+    filas = (Inventario.objects.select_for_update()
+             .filter(condicion)
+             .order_by('id')
+             .values_list('id', 'bodega_id', 'producto_id', 'ubicacion_id',
+                          'cantidad_disponible', 'cantidad_reservada'))
+    existentes = {}
+    for pk, b, p, u, disp, res in filas:
+        existentes.setdefault((b, p, u), (pk, disp, res))
+    return existentes
+
+
+def escribir_lote(lote, momento=None):
+    """Upsert de un lote {(bodega, producto, ubicacion): (disponible, reservado)} en una
+    transacción, actualizando los resúmenes de stock. Devuelve (creadas, actualizadas).
+
+    Con ubicación, el upsert es un único INSERT ... ON CONFLICT sobre la restricción única.
+    Sin ubicación la única que aplica es la condicional, que bulk_create no puede usar
+    como destino del ON CONFLICT, así que esas filas se separan en un UPDATE por id
+    (actualizacion_service.actualizar_por_clave) y un bulk_create de las nuevas.
+    """
+    if not lote:
+        return 0, 0
+    momento = momento or now()
+    with transaction.atomic():
+        existentes = _existentes(lote)
+        con_ubicacion, actualizar, crear, cambios = [], [], [], []
+        for (bodega_id, producto_id, ubicacion_id), (disp, res) in lote.items():
+            actual = existentes.get((bodega_id, producto_id, ubicacion_id))
+            if ubicacion_id is None and actual:
+                actualizar.append((disp, res, momento, actual[0]))
+            else:
+                fila = Inventario(
+                    bodega_id=bodega_id, producto_id=producto_id, ubicacion_id=ubicacion_id,
+                    cantidad_disponible=disp, cantidad_reservada=res, ultima_actualizacion=momento,
+                )
+                (con_ubicacion if ubicacion_id is not None else crear).append(fila)
+            cambios.append((bodega_id, producto_id, actual[1:] if actual else None, (disp, res)))
+
+        if con_ubicacion:
+            Inventario.objects.bulk_create(
+                con_ubicacion,
+                update_conflicts=True,
+                unique_fields=['bodega', 'producto', 'ubicacion'],
+                update_fields=CAMPOS_ACTUALIZADOS,
+            )
+        actualizacion_service.actualizar_por_clave(Inventario, CAMPOS_ACTUALIZADOS, actualizar)
+        if crear:
+            Inventario.objects.bulk_create(crear)
+
+        deltas = resumen_stock_service.aplicar_cambios(cambios)
+        cache_service.invalidar_bodegas({c[0] for c in cambios})
+        eventos_service.publicar_deltas(deltas['bodega_id'])
+    actualizadas = sum(1 for c in cambios if c[2] is not None)
+    return len(cambios) - actualizadas, actualizadas
+
+
+def importar(filas, tamano_lote=TAMANO_LOTE, mapas=None):
+    """Importa un iterable de filas (dicts) por lotes; cada lote es una transacción.
+
+    Las filas con errores se saltan y se reportan. Si una clave se repite dentro de un
+    lote gana la última. Devuelve el reporte con el throughput en filas/segundo.
+    """
+    if tamano_lote < 1:
+        raise ValueError("tamano_lote debe ser >= 1")
+    inicio = time.perf_counter()
+    mapas = mapas or construir_mapas()
+    reporte = {'filas': 0, 'creadas': 0, 'actualizadas': 0, 'errores': 0, 'detalle_errores': [], 'lotes': 0}
+
+    numeradas = enumerate(filas, start=1)
+    while True:
+        bloque = list(islice(numeradas, tamano_lote))
+        if not bloque:
+            break
+        lote = {}
+        for numero, fila in bloque:
+            try:
+                clave, cantidades = resolver(fila, mapas)
+            except ErrorFila as e:
+                reporte['errores'] += 1
+                if len(reporte['detalle_errores']) < MAXIMO_ERRORES_DETALLE:
+                    reporte['detalle_errores'].append({'fila': numero, 'error': str(e)})
+                continue
+            lote[clave] = cantidades
+        creadas, actualizadas = escribir_lote(lote)
+        reporte['filas'] += len(bloque)
+        reporte['creadas'] += creadas
+        reporte['actualizadas'] += actualizadas
+        reporte['lotes'] += 1
+
+    segundos = time.perf_counter() - inicio
+    reporte['segundos'] = round(segundos, 3)
+    reporte['filas_por_segundo'] = round(reporte['filas'] / segundos) if segundos else reporte['filas']
+    return reporte
@@ -1,11 +1,36 @@
-from django.shortcuts import get_object_or_404
-from django.db.models import Q, Sum
-from core.models import Inventario, Producto, Bodega, Ubicacion
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from core.models import Inventario, Producto, Bodega, Ubicacion, Pedido, ResumenStockBodega
+from core.services import (actualizacion_service, busqueda_service, cache_service, eventos_service,
+                           resumen_stock_service)
 from django.utils.timezone import now
 
+# Campos que escribe una reserva en lote, en el orden de sus filas de actualización
+CAMPOS_STOCK = ('cantidad_disponible', 'cantidad_reservada', 'ultima_actualizacion')
+
+
+class StockInsuficiente(Exception):
+    """Raised when a guarded stock movement cannot be applied to the row"""
+
+
 class InventarioService:
     """Service for managing Inventario CRUD operations"""
     
+    @staticmethod
+    def registrar_cambios(cambios):
+        """
+        Propagate committed-together Inventario changes to the derived stock data.
+        Each change is (bodega_id, producto_id, antes, despues) with (disponible, reservado)
+        tuples, or None for created/deleted rows. Call inside the writing transaction.
+        Once it commits, the per-bodega deltas go out on the stock event stream.
+        Writes through save()/delete() get here from core.signals; update() and
+        bulk writes must call it themselves.
+        """
+        deltas = resumen_stock_service.aplicar_cambios(cambios)
+        cache_service.invalidar_bodegas({bodega_id for bodega_id, _, _, _ in cambios})
+        eventos_service.publicar_deltas(deltas['bodega_id'])
+    
     @staticmethod
     def crear_inventario(producto_id, bodega_id, ubicacion_id=None, cantidad_disponible=0, cantidad_reservada=0):
         """Create a new inventory record"""
@@ -16,14 +41,15 @@ class InventarioService:
             if ubicacion_id:
                 ubicacion = get_object_or_404(Ubicacion, id=ubicacion_id)
             
-            inventario = Inventario.objects.create(
-                producto=producto,
-                bodega=bodega,
-                ubicacion=ubicacion,
-                cantidad_disponible=cantidad_disponible,
-                cantidad_reservada=cantidad_reservada,
-                ultima_actualizacion=now()
-            )
+            with transaction.atomic():
+                inventario = Inventario.objects.create(
+                    producto=producto,
+                    bodega=bodega,
+                    ubicacion=ubicacion,
+                    cantidad_disponible=cantidad_disponible,
+                    cantidad_reservada=cantidad_reservada,
+                    ultima_actualizacion=now()
+                )
             return inventario
         except Exception as e:
             raise Exception(f"Error creating inventory: {str(e)}")
@@ -68,63 +94,179 @@ class InventarioService:
     @staticmethod
     def actualizar_inventario(inventario_id, **kwargs):
         """Update inventory with given fields"""
-        inventario = get_object_or_404(Inventario, id=inventario_id)
         allowed_fields = ['cantidad_disponible', 'cantidad_reservada', 'ubicacion_id']
         
-        for key, value in kwargs.items():
-            if key in allowed_fields and value is not None:
-                setattr(inventario, key, value)
-        
-        inventario.ultima_actualizacion = now()
-        inventario.save()
+        with transaction.atomic():
+            inventario = get_object_or_404(Inventario.objects.select_for_update(), id=inventario_id)
+            
+            for key, value in kwargs.items():
+                if key in allowed_fields and value is not None:
+                    setattr(inventario, key, value)
+            
+            inventario.ultima_actualizacion = now()
+            inventario.save()
         return inventario
     
+    @staticmethod
+    def _mover_stock(inventario_id, cantidad, campo_guarda, delta_disponible=0, delta_reservado=0):
+        """
+        Apply a stock movement as a single conditional UPDATE.
+        The row is only touched while `campo_guarda >= cantidad`, so the check and
+        the mutation happen atomically in the database and concurrent workers can
+        never drive a quantity below zero.
+        Returns (applied, inventario) with the row as it is after the movement.
+        """
+        if cantidad <= 0:
+            raise ValueError("Quantity must be greater than 0")
+        with transaction.atomic():
+            filas = Inventario.objects.filter(
+                id=inventario_id,
+                **{f'{campo_guarda}__gte': cantidad}
+            ).update(
+                cantidad_disponible=F('cantidad_disponible') + delta_disponible,
+                cantidad_reservada=F('cantidad_reservada') + delta_reservado,
+                ultima_actualizacion=now()
+            )
+            inventario = get_object_or_404(Inventario, id=inventario_id)
+            if filas == 1:
+                despues = (inventario.cantidad_disponible, inventario.cantidad_reservada)
+                antes = (despues[0] - delta_disponible, despues[1] - delta_reservado)
+                InventarioService.registrar_cambios([
+                    (inventario.bodega_id, inventario.producto_id, antes, despues)
+                ])
+        return filas == 1, inventario
+    
     @staticmethod
     def reservar_producto(inventario_id, cantidad):
         """Reserve product quantity"""
-        inventario = get_object_or_404(Inventario, id=inventario_id)
+        reservado, inventario = InventarioService._mover_stock(
+            inventario_id, cantidad, 'cantidad_disponible',
+            delta_disponible=-cantidad, delta_reservado=cantidad
+        )
         
-        if inventario.cantidad_disponible < cantidad:
-            raise Exception(f"Insufficient stock. Available: {inventario.cantidad_disponible}, Requested: {cantidad}")
+        if not reservado:
+            raise StockInsuficiente(f"Insufficient stock. Available: {inventario.cantidad_disponible}, Requested: {cantidad}")
         
-        inventario.cantidad_disponible -= cantidad
-        inventario.cantidad_reservada += cantidad
-        inventario.ultima_actualizacion = now()
-        inventario.save()
         return inventario
     
     @staticmethod
     def liberar_reserva(inventario_id, cantidad):
         """Release reserved quantity back to available"""
-        inventario = get_object_or_404(Inventario, id=inventario_id)
+        liberado, inventario = InventarioService._mover_stock(
+            inventario_id, cantidad, 'cantidad_reservada',
+            delta_disponible=cantidad, delta_reservado=-cantidad
+        )
         
-        if inventario.cantidad_reservada < cantidad:
-            raise Exception(f"Cannot release more than reserved. Reserved: {inventario.cantidad_reservada}")
+        if not liberado:
+            raise StockInsuficiente(f"Cannot release more than reserved. Reserved: {inventario.cantidad_reservada}")
         
-        inventario.cantidad_disponible += cantidad
-        inventario.cantidad_reservada -= cantidad
-        inventario.ultima_actualizacion = now()
-        inventario.save()
         return inventario
     
     @staticmethod
     def confirmar_reserva(inventario_id, cantidad):
         """Confirm a reservation (consume reserved stock)"""
-        inventario = get_object_or_404(Inventario, id=inventario_id)
+        confirmado, inventario = InventarioService._mover_stock(
+            inventario_id, cantidad, 'cantidad_reservada',
+            delta_reservado=-cantidad
+        )
         
-        if inventario.cantidad_reservada < cantidad:
-            raise Exception(f"Cannot confirm more than reserved. Reserved: {inventario.cantidad_reservada}")
+        if not confirmado:
+            raise StockInsuficiente(f"Cannot confirm more than reserved. Reserved: {inventario.cantidad_reservada}")
         
-        inventario.cantidad_reservada -= cantidad
-        inventario.ultima_actualizacion = now()
-        inventario.save()
         return inventario
     
+    @staticmethod
+    def lineas_de_pedido(pedido, bodega_id):
+        """Turn the ProductoPedido lines of a Pedido into reservation lines for one bodega"""
+        items = (pedido.items
+                 .values('producto_id')
+                 .annotate(cantidad=Sum('cantidad'))
+                 .order_by('producto_id'))
+        return [{
+            'producto_id': item['producto_id'],
+            'bodega_id': bodega_id,
+            'cantidad': item['cantidad'],
+        } for item in items]
+    
+    @staticmethod
+    def reservar_lote(lineas, bodega_id=None):
+        """
+        Reserve several lines all-or-nothing in a single transaction.
+        `lineas` is a Pedido or an iterable of dicts with producto_id, cantidad and
+        optionally bodega_id (defaults to `bodega_id`). Repeated producto/bodega pairs
+        are merged. The Inventario rows are locked in id order so concurrent batches
+        cannot deadlock, checked in memory and written back in one executemany UPDATE
+        (actualizacion_service.actualizar_por_clave).
+        Like reservar, each pair uses its first Inventario row.
+        Returns the updated Inventario rows in id order.
+        """
+        if isinstance(lineas, Pedido):
+            lineas = InventarioService.lineas_de_pedido(lineas, bodega_id)
+        
+        pedidas = {}
+        for linea in lineas:
+            clave = (int(linea['producto_id']), int(linea.get('bodega_id') or bodega_id))
+            cantidad = int(linea['cantidad'])
+            if cantidad <= 0:
+                raise ValueError("Quantity must be greater than 0")
+            pedidas[clave] = pedidas.get(clave, 0) + cantidad
+        
+        if not pedidas:
+            raise ValueError("No lines to reserve")
+        
+        # one term per bodega: an OR per pair takes longer to build than to run on large orders
+        por_bodega = {}
+        for producto_id, linea_bodega_id in pedidas:
+            por_bodega.setdefault(linea_bodega_id, []).append(producto_id)
+        filtro = Q()
+        for linea_bodega_id, producto_ids in por_bodega.items():
+            filtro |= Q(bodega_id=linea_bodega_id, producto_id__in=producto_ids)
+        
+        with transaction.atomic():
+            inventarios = {}
+            for inventario in Inventario.objects.select_for_update().filter(filtro).order_by('id'):
+                inventarios.setdefault((inventario.producto_id, inventario.bodega_id), inventario)
+            
+            faltantes = [clave for clave in pedidas if clave not in inventarios]
+            if faltantes:
+                raise Inventario.DoesNotExist(f"Inventory not found for (producto_id, bodega_id): {faltantes}")
+            
+            insuficientes = [
+                f"producto {producto_id} / bodega {linea_bodega_id}: "
+                f"Available: {inventarios[(producto_id, linea_bodega_id)].cantidad_disponible}, Requested: {cantidad}"
+                for (producto_id, linea_bodega_id), cantidad in pedidas.items()
+                if inventarios[(producto_id, linea_bodega_id)].cantidad_disponible < cantidad
+            ]
+            if insuficientes:
+                raise StockInsuficiente("Insufficient stock. " + "; ".join(insuficientes))
+            
+            momento = now()
+            cambios = []
+            for clave, cantidad in pedidas.items():
+                inventario = inventarios[clave]
+                cambios.append((
+                    inventario.bodega_id, inventario.producto_id,
+                    (inventario.cantidad_disponible, inventario.cantidad_reservada),
+                    (inventario.cantidad_disponible - cantidad, inventario.cantidad_reservada + cantidad)
+                ))
+                inventario.cantidad_disponible -= cantidad
+                inventario.cantidad_reservada += cantidad
+                inventario.ultima_actualizacion = momento
+            
+            reservados = sorted((inventarios[clave] for clave in pedidas), key=lambda inv: inv.id)
+            actualizacion_service.actualizar_por_clave(
+                Inventario, CAMPOS_STOCK,
+                [(inv.cantidad_disponible, inv.cantidad_reservada, momento, inv.id) for inv in reservados],
+            )
+            InventarioService.registrar_cambios(cambios)
+        return reservados
+    
     @staticmethod
     def eliminar_inventario(inventario_id):
         """Delete an inventory record"""
-        inventario = get_object_or_404(Inventario, id=inventario_id)
-        inventario.delete()
+        with transaction.atomic():
+            inventario = get_object_or_404(Inventario.objects.select_for_update(), id=inventario_id)
+            inventario.delete()
         return True
     
     @staticmethod
@@ -151,31 +293,72 @@ class InventarioService:
         return Inventario.objects.filter(bodega_id=bodega_id).count()
     
     @staticmethod
-    def obtener_total_stock(bodega_id=None):
-        """Get total stock (available + reserved) optionally filtered by bodega"""
-        qs = Inventario.objects.all()
+    def _resumen_stock(bodega_id=None):
+        qs = ResumenStockBodega.objects.all()
         if bodega_id:
             qs = qs.filter(bodega_id=bodega_id)
-        
-        agg = qs.aggregate(
-            total_disponible=Sum('cantidad_disponible'),
-            total_reservado=Sum('cantidad_reservada')
-        )
+        return qs
+
+    @staticmethod
+    def _total_stock(agg):
         return {
             'disponible': agg['total_disponible'] or 0,
             'reservado': agg['total_reservado'] or 0,
             'total': (agg['total_disponible'] or 0) + (agg['total_reservado'] or 0)
         }
+
+    @staticmethod
+    def obtener_total_stock(bodega_id=None):
+        """Get total stock (available + reserved) optionally filtered by bodega.
+        Read from the per-bodega stock summary, so the cost does not depend on inventory size."""
+        agg = InventarioService._resumen_stock(bodega_id).aggregate(
+            total_disponible=Sum('total_disponible'),
+            total_reservado=Sum('total_reservado')
+        )
+        return InventarioService._total_stock(agg)
     
     @staticmethod
     def buscar_inventario(producto_codigo=None, bodega_nombre=None):
-        """Search inventory by product code and/or bodega name"""
-        qs = Inventario.objects.all()
-        
-        if producto_codigo:
-            qs = qs.filter(producto__codigo__icontains=producto_codigo)
-        
-        if bodega_nombre:
-            qs = qs.filter(bodega__nombre__icontains=bodega_nombre)
+        """
+        Search inventory by product code/barcode and/or bodega name (substring match).
+        Selective text is resolved against the producto/bodega search index first, so
+        the inventory rows are then filtered through their foreign keys.
+        """
+        qs = busqueda_service.filtrar_inventario(
+            Inventario.objects.all(), producto_codigo, bodega_nombre)
         
-        return qs.select_related('producto', 'bodega', 'ubicacion')
\ No newline at end of file
+        return qs.select_related('producto', 'bodega', 'ubicacion')
+
+    # Async versions of the read methods (used by core.views.async_views)
+
+    @staticmethod
+    async def aobtener_inventario(inventario_id):
+        return await aget_object_or_404(Inventario, id=inventario_id)
+
+    @staticmethod
+    async def aobtener_disponibilidad_producto(producto_id):
+        agg = await Inventario.objects.filter(producto_id=producto_id).aaggregate(
+            total_disponible=Sum('cantidad_disponible')
+        )
+        return agg['total_disponible'] or 0
+
+    @staticmethod
+    async def aobtener_disponibilidad_producto_bodega(producto_id, bodega_id):
+        inventario = await Inventario.objects.filter(producto_id=producto_id, bodega_id=bodega_id).afirst()
+        return inventario.cantidad_disponible if inventario else 0
+
+    @staticmethod
+    async def acontar_inventarios():
+        return await Inventario.objects.acount()
+
+    @staticmethod
+    async def acontar_inventarios_por_bodega(bodega_id):
+        return await Inventario.objects.filter(bodega_id=bodega_id).acount()
+
+    @staticmethod
+    async def aobtener_total_stock(bodega_id=None):
+        agg = await InventarioService._resumen_stock(bodega_id).aaggregate(
+            total_disponible=Sum('total_disponible'),
+            total_reservado=Sum('total_reservado')
+        )
+        return InventarioService._total_stock(agg)
\ No newline at end of file
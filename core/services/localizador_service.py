@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import math
+import threading
+
+from django.db import connection
+
+from ..models import Bodega, Inventario
+from . import cache_service
+
+RADIO_TIERRA_KM = 6371.0088
+
+# Puntos por hoja del k-d tree
+TAMANO_HOJA = 8
+
+# Bodegas más cercanas cuyo stock se consulta en el primer viaje a la base (por cada una
+# pedida); el lote se duplica mientras no alcancen. Pasado el máximo se lee el stock del
+# producto en todas las bodegas de una vez.
+CANDIDATOS_POR_RESULTADO = 4
+MAXIMO_CANDIDATOS = 512
+
+# Tope de k en /api/bodegas/cercanas/
+MAXIMO_RESULTADOS = 50
+
+
+def vector(latitud, longitud):
+    """Punto de la esfera unitaria: la distancia en línea recta (cuerda) entre dos de estos
+    vectores crece con la distancia sobre la superficie, así el árbol trabaja en 3D sin
+    deformar distancias cerca de los polos ni del antimeridiano."""
+    lat, lon = math.radians(latitud), math.radians(longitud)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def km(cuerda2):
+    """Distancia sobre la superficie (km) correspondiente a una cuerda al cuadrado."""
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(cuerda2) / 2))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2
+         + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _distancia2(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class _Nodo:
+    __slots__ = ('minimo', 'maximo', 'hijos', 'puntos')
+
+    def __init__(self, puntos):
+        coordenadas = [p[1] for p in puntos]
+        self.minimo = tuple(map(min, zip(*coordenadas)))
+        self.maximo = tuple(map(max, zip(*coordenadas)))
+        self.hijos = None
+        self.puntos = puntos
+
+    def distancia2(self, q):
+        """Cuerda al cuadrado desde q hasta la caja del nodo (0 si q está dentro)."""
+        total = 0.0
+        for valor, bajo, alto in zip(q, self.minimo, self.maximo):
+            if valor < bajo:
+                total += (bajo - valor) ** 2
+            elif valor > alto:
+                total += (valor - alto) ** 2
+        return total
+
+
+class IndiceBodegas:
+    """k-d tree de las bodegas con coordenadas, construido una vez por proceso."""
+
+    def __init__(self, bodegas):
+        """`bodegas`: iterable de (id, nombre, latitud, longitud)."""
+        self.nombres = {}
+        self.vectores = {}
+        for bodega_id, nombre, latitud, longitud in bodegas:
+            if latitud is None or longitud is None:
+                continue
+            self.nombres[bodega_id] = nombre
+            self.vectores[bodega_id] = vector(latitud, longitud)
+        puntos = list(self.vectores.items())
+        self.raiz = self._construir(puntos) if puntos else None
+
+    def __len__(self):
+        return len(self.nombres)
+
+    def distancias_km(self, latitud, longitud, bodega_ids):
+        """{bodega_id: km} desde el punto; las bodegas sin coordenadas no aparecen."""
+        q = vector(latitud, longitud)
+        return {b: km(_distancia2(q, self.vectores[b])) for b in bodega_ids if b in self.vectores}
+
+    def _construir(self, puntos):
+        nodo = _Nodo(puntos)
+        if len(puntos) > TAMANO_HOJA:
+            # se corta por la mediana del eje más extendido de la caja
+            eje = max(range(3), key=lambda i: nodo.maximo[i] - nodo.minimo[i])
+            puntos = sorted(puntos, key=lambda p: p[1][eje])
+            mitad = len(puntos) // 2
+            nodo.hijos = (self._construir(puntos[:mitad]), self._construir(puntos[mitad:]))
+            nodo.puntos = None
+        return nodo
+
+    def recorrer(self, latitud, longitud):
+        """(bodega_id, cuerda al cuadrado) de todas las bodegas, de la más cercana a la más
+        lejana (a igual distancia, por id), generadas a medida que se piden: obtener las
+        primeras k solo visita las ramas que pueden contenerlas."""
+        if self.raiz is None:
+            return
+        q = vector(latitud, longitud)
+        orden = itertools.count()
+        # a igual distancia los nodos salen antes que los puntos, y los puntos por id
+        pendientes = [(0.0, 0, next(orden), self.raiz)]
+        while pendientes:
+            distancia, es_punto, desempate, item = heapq.heappop(pendientes)
+            if es_punto:
+                yield desempate, distancia
+            elif item.hijos:
+                for hijo in item.hijos:
+                    heapq.heappush(pendientes, (hijo.distancia2(q), 0, next(orden), hijo))
+            else:
+                for bodega_id, punto in item.puntos:
+                    heapq.heappush(pendientes, (_distancia2(q, punto), 1, bodega_id, None))
+
+
+_indice = None
+_version = None
+_lock = threading.Lock()
+
+
+def indice():
+    """Índice vigente; se reconstruye cuando cambia la versión del espacio BODEGAS del cache
+    (la incrementan las señales de Bodega y poblacionDB), así todos los procesos lo descartan."""
+    global _indice, _version
+    version = cache_service.versiones([cache_service.BODEGAS])
+    if version != _version:
+        with _lock:
+            if version != _version:
+                _indice = IndiceBodegas(Bodega.objects.values_list('id', 'nombre', 'latitud', 'longitud'))
+                _version = version
+    return _indice
+
+
+def disponibles(producto_id, bodega_ids=None):
+    """{bodega_id: cantidad_disponible} del producto; como reservar, en cada bodega cuenta
+    su primer registro de inventario.
+
+    SQL directo: es la consulta de cada búsqueda y armarla con el ORM cuesta más de diez
+    veces lo que tarda en ejecutarse (usa el índice producto/bodega).
+    """
+    sql = (f"SELECT bodega_id, cantidad_disponible FROM {connection.ops.quote_name(Inventario._meta.db_table)} "
+           f"WHERE producto_id = %s")
+    parametros = [producto_id]
+    if bodega_ids is not None:
+        sql += f" AND bodega_id IN ({', '.join(['%s'] * len(bodega_ids))})"
+        parametros.extend(bodega_ids)
+    resultado = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql + " ORDER BY id", parametros)
+        for bodega_id, disponible in cursor.fetchall():
+            resultado.setdefault(bodega_id, disponible)
+    return resultado
+
+
+def bodegas_cercanas(latitud, longitud, producto_id, cantidad=1, k=3):
+    """Las k bodegas más cercanas al punto con al menos `cantidad` disponible del producto:
+    lista de {bodega_id, nombre, distancia_km, disponible}, de la más cercana a la más lejana.
+
+    Recorre el índice en orden de distancia y consulta el stock de las candidatas por
+    lotes (un viaje a la base en el caso común); si el producto escasea cerca, lee su
+    stock en todas las bodegas una sola vez y sigue el recorrido con ese dato.
+    """
+    if k <= 0:
+        return []
+    actual = indice()
+    nombres = actual.nombres
+    recorrido = actual.recorrer(latitud, longitud)
+    resultado = []
+    lote = k * CANDIDATOS_POR_RESULTADO
+    consultadas = 0
+    stock = None
+    while len(resultado) < k:
+        if stock is None and consultadas >= MAXIMO_CANDIDATOS:
+            stock = disponibles(producto_id)
+        if stock is None:
+            candidatas = list(itertools.islice(recorrido, lote))
+            if not candidatas:
+                break
+            por_bodega = disponibles(producto_id, [bodega_id for bodega_id, _ in candidatas])
+            consultadas += len(candidatas)
+            lote *= 2
+        else:
+            # el resto del recorrido, solo hasta completar las k
+            candidatas, por_bodega = recorrido, stock
+        for bodega_id, cuerda2 in candidatas:
+            disponible = por_bodega.get(bodega_id)
+            if disponible is not None and disponible >= cantidad:
+                resultado.append({
+                    'bodega_id': bodega_id,
+                    'nombre': nombres[bodega_id],
+                    'distancia_km': round(km(cuerda2), 3),
+                    'disponible': disponible,
+                })
+                if len(resultado) == k:
+                    break
+        if stock is not None:
+            break
+    return resultado
@@ -0,0 +1,146 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+PREFIJO = 'nonce'
+
+# Marca de una petición con ese nonce que todavía se está procesando
+EN_PROCESO = 'en_proceso'
+# reservar() sin lugar para un nonce nuevo (MemoriaNonces con REPLAY_MAX_NONCES vigentes)
+LLENO = 'lleno'
+
+LARGO_MINIMO_NONCE = 8
+LARGO_MAXIMO_NONCE = 128
+
+
+def ventana():
+    """Segundos de diferencia aceptados entre el timestamp firmado y el reloj del servidor."""
+    return getattr(settings, 'REPLAY_WINDOW', 300)
+
+
+def requerido():
+    return getattr(settings, 'REPLAY_NONCE_REQUIRED', False)
+
+
+def ttl():
+    # Un nonce aceptado en t trae un timestamp de a lo sumo t + ventana, que deja de ser
+    # válido en t + 2 * ventana: recordarlo ese tiempo basta para rechazar cualquier repetición
+    return 2 * ventana()
+
+
+def campos(request):
+    """nonce y timestamp de la petición (cuerpo o query string, como el hash)."""
+    return {
+        campo: request.POST.get(campo) or request.GET.get(campo)
+        for campo in ('nonce', 'timestamp')
+    }
+
+
+def campos_firmados(request):
+    """Campos a agregar al mensaje que cubre el HMAC: solo los que vienen en la petición,
+    para que los clientes sin nonce (si no es obligatorio) sigan firmando lo mismo."""
+    return {campo: valor for campo, valor in campos(request).items() if valor}
+
+
+def validar(nonce, timestamp, ahora=None):
+    """Mensaje de error, o None si el nonce y el timestamp son aceptables."""
+    if not nonce or not timestamp:
+        return 'Missing nonce or timestamp'
+    if not LARGO_MINIMO_NONCE <= len(nonce) <= LARGO_MAXIMO_NONCE:
+        return f'nonce must be {LARGO_MINIMO_NONCE}-{LARGO_MAXIMO_NONCE} characters'
+    try:
+        timestamp = float(timestamp)
+    except ValueError:
+        return 'timestamp must be Unix seconds'
+    ahora = time.time() if ahora is None else ahora
+    if not math.isfinite(timestamp) or abs(ahora - timestamp) > ventana():
+        return 'timestamp outside the accepted window'
+    return None
+
+
+def clave(alcance, nonce):
+    return f"{PREFIJO}:{alcance}:{nonce}"
+
+
+# Almacenes de nonces
+
+class MemoriaNonces:
+    """Nonces vistos por este proceso. Como todas las entradas viven lo mismo (ttl()),
+    el orden de inserción es el de expiración y purgar es sacar del frente: O(1) amortizado.
+    Con `maximo` entradas vigentes los nonces nuevos se rechazan (LLENO) hasta que expire
+    alguna: descartar una vigente permitiría repetir esa petición.
+    """
+
+    def __init__(self, maximo=None):
+        self.maximo = maximo or getattr(settings, 'REPLAY_MAX_NONCES', 100_000)
+        self._entradas = OrderedDict()   # clave -> [expira, valor]
+        self._lock = threading.Lock()
+
+    def _purgar(self, ahora):
+        while self._entradas:
+            expira = next(iter(self._entradas.values()))[0]
+            if expira > ahora:
+                break
+            self._entradas.popitem(last=False)
+
+    def reservar(self, clave, segundos):
+        """Registra la clave como EN_PROCESO y devuelve None; si ya existía devuelve su valor,
+        y LLENO si no cabe."""
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] > ahora:
+                return entrada[1]
+            self._entradas.pop(clave, None)
+            self._purgar(ahora)
+            if len(self._entradas) >= self.maximo:
+                return LLENO
+            self._entradas[clave] = [ahora + segundos, EN_PROCESO]
+            return None
+
+    def guardar(self, clave, valor, segundos):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                entrada[1] = valor
+
+    def liberar(self, clave):
+        with self._lock:
+            self._entradas.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+class CacheNonces:
+    """Nonces en el cache de Django, compartidos entre procesos si el backend lo es
+    (Redis, Memcached). cache.add es atómico: solo una petición registra cada nonce."""
+
+    def reservar(self, clave, segundos):
+        if cache.add(clave, EN_PROCESO, timeout=segundos):
+            return None
+        # si expiró entre add y get se trata como en proceso: el cliente reintenta
+        return cache.get(clave, EN_PROCESO)
+
+    def guardar(self, clave, valor, segundos):
+        cache.set(clave, valor, timeout=segundos)
+
+    def liberar(self, clave):
+        cache.delete(clave)
+
+
+@lru_cache(maxsize=None)
+def _almacen(ruta):
+    return import_string(ruta)()
+
+
+def almacen():
+    """Almacén configurado en REPLAY_NONCE_STORE (ruta a la clase)."""
+    return _almacen(getattr(settings, 'REPLAY_NONCE_STORE', 'core.services.nonce_service.MemoriaNonces'))
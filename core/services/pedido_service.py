@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.utils.timezone import now
+
+from ..models import EstadoPedido, Pedido
+
+CREADO = 'CREADO'
+ALISTAMIENTO = 'ALISTAMIENTO'
+EMPACADO = 'EMPACADO'
+DESPACHADO = 'DESPACHADO'
+ENTREGADO = 'ENTREGADO'
+CANCELADO = 'CANCELADO'
+
+# Estados a los que se puede pasar desde cada uno (None: pedido sin historial)
+TRANSICIONES = {
+    None: {CREADO},
+    CREADO: {ALISTAMIENTO, CANCELADO},
+    ALISTAMIENTO: {EMPACADO, CANCELADO},
+    EMPACADO: {DESPACHADO, CANCELADO},
+    DESPACHADO: {ENTREGADO},
+    ENTREGADO: set(),
+    CANCELADO: set(),
+}
+ESTADOS = [CREADO, ALISTAMIENTO, EMPACADO, DESPACHADO, ENTREGADO, CANCELADO]
+
+# Pedidos por UPDATE al reconstruir estado_actual desde el historial
+LOTE_BACKFILL = 5000
+
+
+class TransicionInvalida(Exception):
+    """El pedido no puede pasar de su estado actual al pedido"""
+
+
+def cambiar_estado(pedido_id, estado, asignado='sistema', observacion=None, momento=None):
+    """Agrega `estado` al historial del pedido y actualiza estado_actual/fecha_estado en la
+    misma transacción, si el grafo TRANSICIONES lo permite desde el estado actual (la fila
+    del pedido se bloquea, así dos cambios simultáneos no saltan el grafo).
+    Devuelve el EstadoPedido creado; Pedido.DoesNotExist o TransicionInvalida si no.
+    """
+    if estado not in ESTADOS:
+        raise TransicionInvalida(f"Estado desconocido: {estado}")
+    momento = momento or now()
+    with transaction.atomic():
+        filas = list(Pedido.objects.select_for_update().filter(id=pedido_id).values_list('estado_actual', flat=True))
+        if not filas:
+            raise Pedido.DoesNotExist(f"Pedido {pedido_id} no existe")
+        actual = filas[0]
+        if estado not in TRANSICIONES.get(actual, set()):
+            raise TransicionInvalida(f"No se puede pasar de {actual or 'sin estado'} a {estado}")
+        registro = EstadoPedido.objects.create(pedido_id=pedido_id, nombre=estado, fecha_hora=momento,
+                                               asignado=asignado, observacion=observacion)
+        Pedido.objects.filter(id=pedido_id).update(estado_actual=estado, fecha_estado=momento)
+    return registro
+
+
+def pedidos_en_estado(estado=None):
+    """Pedidos (todos, o los de un estado) para paginar por id: con estado usa el índice
+    (estado_actual, id) en vez de buscar el último registro del historial de cada pedido."""
+    pedidos = Pedido.objects.all()
+    if estado:
+        pedidos = pedidos.filter(estado_actual=estado)
+    return pedidos
+
+
+def conteo_por_estado():
+    """{estado: cantidad de pedidos}; los pedidos sin historial cuentan en None."""
+    return dict(Pedido.objects.order_by().values('estado_actual')
+                .annotate(total=Count('id')).values_list('estado_actual', 'total'))
+
+
+def reconstruir_estados(desde_id=0, solo_faltantes=False):
+    """Recalcula estado_actual/fecha_estado desde el último registro del historial de cada
+    pedido (por fecha_hora, luego id), con un UPDATE por lote de LOTE_BACKFILL ids para
+    no retener el bloqueo de escritura mucho tiempo. Devuelve los pedidos actualizados.
+    """
+    ultimo = EstadoPedido.objects.filter(pedido_id=OuterRef('pk')).order_by('-fecha_hora', '-id')
+    pedidos = Pedido.objects.filter(id__gt=desde_id)
+    if solo_faltantes:
+        pedidos = pedidos.filter(estado_actual__isnull=True)
+    actualizados = 0
+    inicio = desde_id
+    while True:
+        ids = list(pedidos.filter(id__gt=inicio).order_by('id').values_list('id', flat=True)[:LOTE_BACKFILL])
+        if not ids:
+            return actualizados
+        with transaction.atomic():
+            actualizados += Pedido.objects.filter(id__in=ids).update(
+                estado_actual=Subquery(ultimo.values('nombre')[:1]),
+                fecha_estado=Subquery(ultimo.values('fecha_hora')[:1]),
+            )
+        inicio = ids[-1]
+
+
+def diferencias():
+    """[(pedido_id, esperado, actual)] de los pedidos cuyo estado_actual no es el último
+    registro de su historial (None si no tiene)."""
+    ultimo = EstadoPedido.objects.filter(pedido_id=OuterRef('pk')).order_by('-fecha_hora', '-id')
+    filas = (Pedido.objects.annotate(ultimo_estado=Subquery(ultimo.values('nombre')[:1]))
+             .order_by('id').values_list('id', 'ultimo_estado', 'estado_actual'))
+    return [(pedido_id, esperado, actual) for pedido_id, esperado, actual in filas.iterator() if esperado != actual]
@@ -0,0 +1,154 @@
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import now
+from ..models import Inventario, ResumenStockBodega, ResumenStockProducto
+from . import actualizacion_service
+
+# Totales que se mantienen en ambas tablas de resumen, en este orden en los deltas
+CAMPOS = ('total_disponible', 'total_reservado', 'registros', 'stockouts')
+
+RESUMENES = (
+    (ResumenStockBodega, 'bodega_id'),
+    (ResumenStockProducto, 'producto_id'),
+)
+
+
+# Mantenimiento incremental
+
+def _sumar(modelo, campo, deltas, momento):
+    """Suma `deltas` ({id: (disp, res, registros, stockouts)}) a las filas de resumen
+    con un UPDATE aditivo por fila, todos en un executemany (actualizar_por_clave). Las
+    filas que aún no existen se crean en cero antes, así el UPDATE siempre es aditivo
+    aunque otro proceso las cree a la vez.
+    """
+    deltas = {k: v for k, v in deltas.items() if k is not None and any(v)}
+    if not deltas:
+        return
+
+    ids = list(deltas)
+    existentes = set(modelo.objects.filter(**{f'{campo}__in': ids}).values_list(campo, flat=True))
+    faltantes = [k for k in ids if k not in existentes]
+    if faltantes:
+        modelo.objects.bulk_create(
+            [modelo(**{campo: k}, ultima_actualizacion=momento) for k in faltantes],
+            ignore_conflicts=True,
+        )
+
+    actualizacion_service.actualizar_por_clave(
+        modelo, (*CAMPOS, 'ultima_actualizacion'), [(*v, momento, k) for k, v in deltas.items()],
+        clave=campo, aditivos=CAMPOS)
+
+
+def deltas(cambios):
+    """Suma de los cambios de Inventario por resumen: {campo: {id: (disp, res, registros, stockouts)}}.
+
+    Cada cambio es (bodega_id, producto_id, antes, despues) donde `antes` y `despues`
+    son tuplas (disponible, reservado), o None para altas y bajas de registros.
+    """
+    por_clave = {campo: {} for _, campo in RESUMENES}
+    for bodega_id, producto_id, antes, despues in cambios:
+        disp_antes, res_antes = antes or (0, 0)
+        disp_despues, res_despues = despues or (0, 0)
+        stock_antes = 1 if antes is not None and disp_antes == 0 else 0
+        stock_despues = 1 if despues is not None and disp_despues == 0 else 0
+        delta = (
+            disp_despues - disp_antes,
+            res_despues - res_antes,
+            (despues is not None) - (antes is not None),
+            stock_despues - stock_antes,
+        )
+        for campo, clave in (('bodega_id', bodega_id), ('producto_id', producto_id)):
+            actual = por_clave[campo].get(clave, (0, 0, 0, 0))
+            por_clave[campo][clave] = tuple(a + d for a, d in zip(actual, delta))
+    return por_clave
+
+
+def aplicar_cambios(cambios):
+    """Aplica una lista de cambios de Inventario a ambos resúmenes. Devuelve los deltas
+    aplicados (ver deltas())."""
+    por_clave = deltas(cambios)
+    momento = now()
+    for modelo, campo in RESUMENES:
+        _sumar(modelo, campo, por_clave[campo], momento)
+    return por_clave
+
+
+def registrar_cambio(bodega_id, producto_id, antes, despues):
+    aplicar_cambios([(bodega_id, producto_id, antes, despues)])
+
+
+def descontar_bodega(bodega_id):
+    """Resta del resumen por producto todo el inventario de una bodega (antes de borrarla;
+    su propio resumen se elimina en cascada).
+    """
+    filas = (Inventario.objects
+             .filter(bodega_id=bodega_id, producto__isnull=False)
+             .values('producto_id')
+             .annotate(**_agregados()))
+    deltas = {
+        f['producto_id']: tuple(-f[nombre] for nombre in CAMPOS)
+        for f in filas
+    }
+    _sumar(ResumenStockProducto, 'producto_id', deltas, now())
+
+
+# Recalculo completo
+
+def _agregados():
+    return {
+        'total_disponible': Sum('cantidad_disponible'),
+        'total_reservado': Sum('cantidad_reservada'),
+        'registros': Count('id'),
+        'stockouts': Count('id', filter=Q(cantidad_disponible=0)),
+    }
+
+
+def calcular_desde_inventario():
+    """Recalcula ambos resúmenes desde Inventario: {campo: {id: (disp, res, registros, stockouts)}}."""
+    resultado = {}
+    for _, campo in RESUMENES:
+        filas = (Inventario.objects
+                 .filter(**{f'{campo}__isnull': False})
+                 .values(campo)
+                 .annotate(**_agregados())
+                 .order_by())
+        resultado[campo] = {f[campo]: tuple(f[nombre] or 0 for nombre in CAMPOS) for f in filas}
+    return resultado
+
+
+def leer_resumenes():
+    resultado = {}
+    for modelo, campo in RESUMENES:
+        filas = modelo.objects.values_list(campo, *CAMPOS)
+        resultado[campo] = {f[0]: tuple(f[1:]) for f in filas if any(f[1:])}
+    return resultado
+
+
+def diferencias():
+    """Lista de (campo, id, esperado, actual) donde el resumen no coincide con Inventario."""
+    esperado = calcular_desde_inventario()
+    actual = leer_resumenes()
+    diffs = []
+    for _, campo in RESUMENES:
+        for clave in sorted(set(esperado[campo]) | set(actual[campo])):
+            e = esperado[campo].get(clave, (0, 0, 0, 0))
+            a = actual[campo].get(clave, (0, 0, 0, 0))
+            if e != a:
+                diffs.append((campo, clave, e, a))
+    return diffs
+
+
+def reconstruir():
+    """Reemplaza ambos resúmenes por un recálculo completo. Devuelve filas escritas por tabla."""
+    momento = now()
+    escritas = {}
+    with transaction.atomic():
+        calculado = calcular_desde_inventario()
+        for modelo, campo in RESUMENES:
+            modelo.objects.all().delete()
+            modelo.objects.bulk_create([
+                modelo(**{campo: clave}, ultima_actualizacion=momento, **dict(zip(CAMPOS, valores)))
+                for clave, valores in calculado[campo].items()
+            ], batch_size=1000)
+            escritas[modelo.__name__] = len(calculado[campo])
+    return escritas
@@ -0,0 +1,186 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+from ..models import Alistador, Empacador, TareaLogistica, Verificador
+from . import cache_service
+
+PENDIENTE = 'PENDIENTE'
+EN_PROCESO = 'EN_PROCESO'
+COMPLETADA = 'COMPLETADA'
+CANCELADA = 'CANCELADA'
+
+# prioridad -> nivel_prioridad: la cola de cada bodega sale por nivel y luego por id (FIFO)
+NIVELES = {'ALTA': 0, 'MEDIA': 1, 'BAJA': 2}
+
+# Rol del trabajador -> (modelo, tipo de tarea que atiende, campo de la tarea donde queda)
+ROLES = {
+    'alistador': (Alistador, 'ALISTAMIENTO', 'alistador_id'),
+    'verificador': (Verificador, 'VERIFICACION', 'verificador_id'),
+    'empacador': (Empacador, 'EMPAQUE', 'empacador_id'),
+}
+
+# Sin SKIP LOCKED: candidatas que se intentan por reclamo. Cada intento fallido es una
+# tarea que otro trabajador tomó entre la lectura y el UPDATE, así que agotarlos
+# requiere ese mismo número de reclamos simultáneos ganados por otros.
+INTENTOS_RECLAMO = 8
+
+
+class ReclamoInvalido(Exception):
+    """La tarea no está EN_PROCESO a nombre de ese trabajador"""
+
+
+def duracion_reclamo():
+    return timedelta(seconds=getattr(settings, 'TAREAS_LEASE_SEGUNDOS', 300))
+
+
+def _rol(rol):
+    if rol not in ROLES:
+        raise ValueError(f"rol debe ser uno de: {', '.join(ROLES)}")
+    return ROLES[rol]
+
+
+def trabajador_de(rol, cognito_sub):
+    """(id, bodega asignada o None) del trabajador de ese rol con el `sub` de Cognito;
+    DoesNotExist si no hay ninguno."""
+    modelo = _rol(rol)[0]
+    if not cognito_sub:
+        raise modelo.DoesNotExist
+    return modelo.objects.values_list('id', 'bodega_asignada_id').get(cognito_sub=cognito_sub)
+
+
+def encolar(bodega_id, tipo, prioridad='MEDIA', pedido_id=None, momento=None):
+    """Crea una tarea PENDIENTE en la cola de la bodega."""
+    if prioridad not in NIVELES:
+        raise ValueError(f"prioridad debe ser una de: {', '.join(NIVELES)}")
+    return TareaLogistica.objects.create(
+        bodega_id=bodega_id, tipo=tipo, estado=PENDIENTE, prioridad=prioridad,
+        nivel_prioridad=NIVELES[prioridad], fecha_asignacion=momento or now(), pedido_id=pedido_id)
+
+
+def cola(bodega_id, tipo):
+    """Tareas pendientes de la bodega y tipo en el orden en que se reclaman (el índice
+    parcial tarea_cola_idx las da ya ordenadas: la siguiente es su primera entrada)."""
+    return (TareaLogistica.objects.filter(bodega_id=bodega_id, tipo=tipo, estado=PENDIENTE)
+            .order_by('nivel_prioridad', 'id'))
+
+
+def _tabla():
+    return connection.ops.quote_name(TareaLogistica._meta.db_table)
+
+
+def _fecha(momento):
+    return connection.ops.adapt_datetimefield_value(momento)
+
+
+def liberar_vencidas(bodega_id=None, rol=None, momento=None):
+    """Devuelve a la cola las tareas EN_PROCESO cuyo lease venció (de la bodega y rol
+    dados, o de todos), quitando al trabajador que las abandonó. Devuelve cuántas.
+
+    SQL directo, como el reclamo: corre antes de cada uno (casi siempre sin filas que
+    cambiar) y armar el UPDATE con el ORM costaba más que ejecutarlo.
+    """
+    momento = momento or now()
+    liberadas = 0
+    with connection.cursor() as cursor:
+        for nombre, (_, tipo, campo) in ROLES.items():
+            if rol is not None and nombre != rol:
+                continue
+            sql = (f"UPDATE {_tabla()} SET estado = %s, vence_reclamo = NULL, {campo} = NULL "
+                   f"WHERE tipo = %s AND estado = %s AND vence_reclamo < %s")
+            parametros = [PENDIENTE, tipo, EN_PROCESO, _fecha(momento)]
+            if bodega_id is not None:
+                sql += " AND bodega_id = %s"
+                parametros.append(bodega_id)
+            cursor.execute(sql, parametros)
+            liberadas += cursor.rowcount
+    if liberadas:
+        cache_service.incrementar(cache_service.TAREAS)
+    return liberadas
+
+
+def _reclamar_condicional(bodega_id, tipo, campo, trabajador_id, momento):
+    # lee la primera candidata y la toma solo si sigue PENDIENTE: de dos trabajadores que
+    # leyeron la misma solo uno cambia la fila. El lease se calcula después de la
+    # lectura, ya con el lock de escritura en SQLite: calculado antes de esperar el lock
+    # podría llegar vencido a la fila y la tarea volvería a la cola mientras se trabaja.
+    siguiente = (f"SELECT id FROM {_tabla()} WHERE bodega_id = %s AND tipo = %s AND estado = %s "
+                 f"ORDER BY nivel_prioridad, id LIMIT 1")
+    tomar = (f"UPDATE {_tabla()} SET estado = %s, {campo} = %s, fecha_asignacion = %s, "
+             f"vence_reclamo = %s, reclamos = reclamos + 1 WHERE id = %s AND estado = %s")
+    with connection.cursor() as cursor:
+        for _ in range(INTENTOS_RECLAMO):
+            cursor.execute(siguiente, [bodega_id, tipo, PENDIENTE])
+            fila = cursor.fetchone()
+            if fila is None:
+                return None
+            desde = momento or now()
+            cursor.execute(tomar, [EN_PROCESO, trabajador_id, _fecha(desde),
+                                   _fecha(desde + duracion_reclamo()), fila[0], PENDIENTE])
+            if cursor.rowcount == 1:
+                return fila[0]
+    return None
+
+
+def reclamar(bodega_id, rol, trabajador_id, momento=None):
+    """Asigna al trabajador la siguiente tarea pendiente de su tipo en la bodega (la de
+    mayor prioridad, la más antigua en empate) con un lease de TAREAS_LEASE_SEGUNDOS.
+    Antes devuelve a la cola las de esa bodega y tipo con el lease vencido.
+
+    Con SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL, MySQL 8, Oracle) cada trabajador
+    salta las filas que otro está tomando; sin él (SQLite) se usa un UPDATE condicional
+    sobre el estado. En ambos casos una tarea nunca queda con dos trabajadores.
+    Devuelve la TareaLogistica reclamada, o None si no hay pendientes.
+    """
+    _, tipo, campo = _rol(rol)
+    # en SQLite (transaction_mode IMMEDIATE) la transacción empieza tomando el lock de
+    # escritura: los reclamos se serializan y ninguno reintenta
+    with transaction.atomic():
+        liberar_vencidas(bodega_id, rol, momento)
+        if connection.features.has_select_for_update_skip_locked:
+            tarea_id = (cola(bodega_id, tipo).select_for_update(skip_locked=True)
+                        .values_list('id', flat=True).first())
+            if tarea_id is not None:
+                desde = momento or now()
+                TareaLogistica.objects.filter(id=tarea_id).update(**{
+                    'estado': EN_PROCESO, 'fecha_asignacion': desde, 'vence_reclamo': desde + duracion_reclamo(),
+                    'reclamos': F('reclamos') + 1, campo: trabajador_id,
+                })
+        else:
+            tarea_id = _reclamar_condicional(bodega_id, tipo, campo, trabajador_id, momento)
+        if tarea_id is None:
+            return None
+        cache_service.incrementar(cache_service.TAREAS)  # ni update() ni el SQL directo disparan las señales
+        # leída dentro de la transacción: es el reclamo concedido, aunque el lease venza
+        # y otro la reclame antes de que el trabajador la reciba
+        return TareaLogistica.objects.get(id=tarea_id)
+
+
+def _del_trabajador(tarea_id, rol, trabajador_id, cambios):
+    # mientras nadie más la reclame, un lease vencido todavía se puede renovar o cerrar
+    campo = _rol(rol)[2]
+    if not TareaLogistica.objects.filter(id=tarea_id, estado=EN_PROCESO, **{campo: trabajador_id}).update(**cambios):
+        raise ReclamoInvalido(f"La tarea {tarea_id} no está en proceso por ese {rol}")
+    cache_service.incrementar(cache_service.TAREAS)
+
+
+def renovar(tarea_id, rol, trabajador_id, momento=None):
+    """Extiende el lease de una tarea del trabajador; devuelve el nuevo vencimiento."""
+    vence = (momento or now()) + duracion_reclamo()
+    _del_trabajador(tarea_id, rol, trabajador_id, {'vence_reclamo': vence})
+    return vence
+
+
+def completar(tarea_id, rol, trabajador_id, momento=None):
+    """Cierra una tarea del trabajador (COMPLETADA, con fecha_fin)."""
+    _del_trabajador(tarea_id, rol, trabajador_id,
+                    {'estado': COMPLETADA, 'fecha_fin': momento or now(), 'vence_reclamo': None})
+
+
+def soltar(tarea_id, rol, trabajador_id):
+    """Devuelve a la cola una tarea del trabajador antes de que venza su lease."""
+    campo = _rol(rol)[2]
+    _del_trabajador(tarea_id, rol, trabajador_id, {'estado': PENDIENTE, 'vence_reclamo': None, campo: None})
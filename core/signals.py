@@ -0,0 +1,62 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.models import Bodega, Inventario, Producto, TareaLogistica
+from core.services import cache_service, resumen_stock_service
+from core.services.inventario_service import InventarioService
+
+
+# Escrituras de Inventario con save()/delete() (InventarioService, admin, scripts):
+# aplican sus deltas al resumen de stock, invalidan el cache del dashboard y publican
+# el evento. Las que usan update() o bulk_create llaman a registrar_cambios ellas mismas.
+
+def _stock(inventario):
+    return inventario.cantidad_disponible, inventario.cantidad_reservada
+
+
+@receiver(pre_save, sender=Inventario)
+def leer_inventario_anterior(sender, instance, **kwargs):
+    # la fila como está en la base, no como se cargó: lo que el resumen ya cuenta
+    instance._inventario_anterior = None if instance.pk is None else (
+        Inventario.objects.filter(pk=instance.pk)
+        .values_list('bodega_id', 'producto_id', 'cantidad_disponible', 'cantidad_reservada').first())
+
+
+@receiver(post_save, sender=Inventario)
+def registrar_inventario_guardado(sender, instance, **kwargs):
+    cambios = [(instance.bodega_id, instance.producto_id, None, _stock(instance))]
+    anterior = instance.__dict__.pop('_inventario_anterior', None)
+    if anterior is not None:
+        # baja de la fila anterior y alta de la nueva: vale también si cambió de bodega
+        cambios.append((anterior[0], anterior[1], anterior[2:], None))
+    InventarioService.registrar_cambios(cambios)
+
+
+@receiver(post_delete, sender=Inventario)
+def registrar_inventario_borrado(sender, instance, origin=None, **kwargs):
+    # borrado en cascada de una bodega: descontar_bodega ya lo restó del resumen por
+    # producto y el de la bodega se borra con ella
+    if isinstance(origin, Bodega) or getattr(origin, 'model', None) is Bodega:
+        return
+    InventarioService.registrar_cambios([(instance.bodega_id, instance.producto_id, _stock(instance), None)])
+
+
+@receiver(pre_delete, sender=Bodega)
+def descontar_inventario_de_bodega(sender, instance, **kwargs):
+    resumen_stock_service.descontar_bodega(instance.id)
+
+
+@receiver([post_save, post_delete], sender=Bodega)
+def invalidar_por_bodega(sender, instance, **kwargs):
+    cache_service.invalidar_bodegas([instance.id])
+    cache_service.incrementar(cache_service.BODEGAS)
+
+
+@receiver([post_save, post_delete], sender=Producto)
+def invalidar_por_producto(sender, instance, **kwargs):
+    cache_service.incrementar(cache_service.PRODUCTOS)
+
+
+@receiver([post_save, post_delete], sender=TareaLogistica)
+def invalidar_por_tarea(sender, instance, **kwargs):
+    cache_service.incrementar(cache_service.TAREAS)
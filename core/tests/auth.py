@@ -0,0 +1,48 @@
+import time
+import uuid
+from functools import lru_cache
+
+from jose import jwt
+
+from core import auth_cognito
+from core.management.commands._bench import llave_local
+from core.services.checks_service import ChecksService
+
+KID = 'tests'
+
+
+def firmado(datos):
+    """Los datos con nonce, timestamp y el hash HMAC que esperan las vistas de inventario."""
+    datos = {**datos, 'nonce': uuid.uuid4().hex, 'timestamp': str(int(time.time()))}
+    return {**datos, 'hash': ChecksService.generar_hash_hmac(datos)}
+
+
+@lru_cache(maxsize=None)
+def _llave():
+    return llave_local(KID)
+
+
+class TokensDePrueba:
+    """Mixin: verifica los tokens contra una llave local en vez de la JWKS de Cognito."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        publica = _llave()[1]
+        auth_cognito.configurar_fuente_jwks(lambda: {'keys': [publica]})
+
+    @classmethod
+    def tearDownClass(cls):
+        auth_cognito.configurar_fuente_jwks(auth_cognito.fetch_jwks)
+        super().tearDownClass()
+
+    @staticmethod
+    def token(sub, grupos=()):
+        ahora = int(time.time())
+        return jwt.encode({
+            'sub': sub, 'aud': auth_cognito.COGNITO_APP_CLIENT_ID, 'iss': auth_cognito.ISSUER,
+            'iat': ahora, 'exp': ahora + 3600, 'cognito:groups': list(grupos),
+        }, _llave()[0], algorithm='RS256', headers={'kid': KID})
+
+    def autorizacion(self, sub, grupos=()):
+        return {'HTTP_AUTHORIZATION': f'Bearer {self.token(sub, grupos)}'}
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto, ResumenStockBodega
+from core.services.actualizacion_service import actualizar_por_clave
+
+
+class ActualizarPorClaveTests(TestCase):
+    def setUp(self):
+        self.bodegas = [Bodega.objects.create(codigo=f'B{i}', nombre=f'B{i}', ciudad='-', direccion='-',
+                                              capacidad=100) for i in range(2)]
+        producto = Producto.objects.create(codigo_barras='770', tipo='caja', peso=1, volumen=1, codigo='P1')
+        self.filas = [Inventario.objects.create(producto=producto, bodega=b, cantidad_disponible=10,
+                                                cantidad_reservada=0, ultima_actualizacion=now() - timedelta(days=3))
+                      for b in self.bodegas]
+
+    def test_reemplaza_valores_por_id(self):
+        momento = now()
+        with self.assertNumQueries(1):
+            actualizar_por_clave(Inventario, ('cantidad_disponible', 'cantidad_reservada', 'ultima_actualizacion'),
+                                 [(7, 3, momento, self.filas[0].id)])
+        primera, segunda = Inventario.objects.order_by('id')
+        self.assertEqual((primera.cantidad_disponible, primera.cantidad_reservada), (7, 3))
+        self.assertEqual(primera.ultima_actualizacion, momento)
+        self.assertEqual((segunda.cantidad_disponible, segunda.cantidad_reservada), (10, 0))
+
+    def test_aditivos_por_otra_clave(self):
+        ResumenStockBodega.objects.update(total_disponible=5, registros=0)  # creadas por las señales
+        actualizar_por_clave(ResumenStockBodega, ('total_disponible', 'registros'),
+                             [(2, 1, self.bodegas[0].id), (-5, 0, self.bodegas[1].id)],
+                             clave='bodega_id', aditivos=('total_disponible', 'registros'))
+        totales = dict(ResumenStockBodega.objects.values_list('bodega_id', 'total_disponible'))
+        self.assertEqual(totales, {self.bodegas[0].id: 7, self.bodegas[1].id: 0})
+        self.assertEqual(ResumenStockBodega.objects.get(bodega=self.bodegas[0]).registros, 1)
+
+    def test_sin_filas_no_consulta(self):
+        with self.assertNumQueries(0):
+            actualizar_por_clave(Inventario, ('cantidad_disponible',), [])
@@ -0,0 +1,95 @@
+import random
+import statistics
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import analitica_bodegas_service as analitica
+
+
+class PercentilTests(SimpleTestCase):
+    def test_interpolacion_lineal(self):
+        valores = [1, 2, 3, 4]
+        for p, esperado in ((0, 1), (25, 1.75), (50, 2.5), (90, 3.7), (100, 4)):
+            with self.subTest(p=p):
+                self.assertAlmostEqual(analitica.percentil(valores, p), esperado)
+        self.assertEqual(analitica.percentil([0.3], 90), 0.3)
+
+    def test_igual_a_quantiles_inclusive(self):
+        rnd = random.Random(5)
+        for n in (2, 3, 10, 101):
+            valores = sorted(rnd.random() for _ in range(n))
+            cuantiles = statistics.quantiles(valores, n=100, method='inclusive')
+            with self.subTest(n=n):
+                for p in range(1, 100):
+                    self.assertAlmostEqual(analitica.percentil(valores, p), cuantiles[p - 1], places=12)
+                self.assertAlmostEqual(analitica.percentil(valores, 50), statistics.median(valores), places=12)
+
+
+class ProporcionesPorBodegaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(11)
+        cls.bodegas = [Bodega.objects.create(codigo=f'B{i}', nombre=f'B{i}', ciudad='-', direccion='-', capacidad=10,
+                                             latitud=4.0 + i, longitud=-74.0) for i in range(4)]
+        productos = Producto.objects.bulk_create([Producto(codigo=f'P{i}', codigo_barras=f'770{i:04}', tipo='caja',
+                                                           peso=1, volumen=1) for i in range(25)])
+        cls.filas = []
+        for bodega in cls.bodegas[:3]:  # la última queda sin inventario
+            for producto in productos:
+                disponible = rnd.randint(0, 30)
+                # la primera bodega sin reservas: no aparece en el resultado
+                reservado = 0 if bodega is cls.bodegas[0] else rnd.choice([0, rnd.randint(1, 30)])
+                cls.filas.append((bodega.id, disponible, reservado))
+        Inventario.objects.bulk_create([Inventario(producto=p, bodega_id=b, cantidad_disponible=d, cantidad_reservada=r,
+                                                   ultima_actualizacion=now())
+                                        for (b, d, r), p in zip(cls.filas, productos * 3)])
+
+    def _referencia(self):
+        grupos = {}
+        for bodega_id, disponible, reservado in self.filas:
+            if reservado:
+                grupos.setdefault(bodega_id, []).append(disponible / (disponible + reservado))
+        referencia = {}
+        for bodega_id, proporciones in grupos.items():
+            cuantiles = statistics.quantiles(sorted(proporciones), n=100, method='inclusive')
+            referencia[bodega_id] = {
+                'registros': len(proporciones),
+                'promedio': statistics.fmean(proporciones),
+                'mediana': statistics.median(proporciones),
+                'percentiles': {f'p{p}': cuantiles[p - 1] for p in analitica.PERCENTILES},
+            }
+        return referencia
+
+    def _comparar(self, obtenido, esperado):
+        self.assertEqual(obtenido.keys(), esperado.keys())
+        for bodega_id, resumen in esperado.items():
+            with self.subTest(bodega_id=bodega_id):
+                self.assertEqual(obtenido[bodega_id]['registros'], resumen['registros'])
+                for campo in ('promedio', 'mediana'):
+                    self.assertAlmostEqual(obtenido[bodega_id][campo], resumen[campo], places=12)
+                self.assertEqual(obtenido[bodega_id]['percentiles'].keys(), resumen['percentiles'].keys())
+                for nombre, valor in resumen['percentiles'].items():
+                    self.assertAlmostEqual(obtenido[bodega_id]['percentiles'][nombre], valor, places=12)
+
+    def test_igual_a_la_referencia(self):
+        referencia = self._referencia()
+        self.assertEqual(set(referencia), {self.bodegas[1].id, self.bodegas[2].id})
+        with self.assertNumQueries(1):
+            self._comparar(analitica.proporciones_por_bodega(), referencia)
+        # lotes más chicos que una bodega: los grupos cruzan el límite de lote
+        with mock.patch.object(analitica, 'TAMANO_LOTE', 4):
+            self._comparar(analitica.proporciones_por_bodega(), referencia)
+        bodega = self.bodegas[2].id
+        self._comparar(analitica.proporciones_por_bodega(bodega), {bodega: referencia[bodega]})
+        self.assertEqual(analitica.proporciones_por_bodega(self.bodegas[0].id), {})
+
+    def test_estadisticas_con_datos_de_la_bodega(self):
+        estadisticas = analitica.estadisticas_por_bodega()
+        self.assertEqual(set(estadisticas), {self.bodegas[1].id, self.bodegas[2].id})
+        bodega = self.bodegas[1]
+        self.assertEqual({k: estadisticas[bodega.id][k] for k in ('nombre', 'direccion', 'latitud', 'longitud')},
+                         {'nombre': bodega.nombre, 'direccion': '-', 'latitud': bodega.latitud,
+                          'longitud': bodega.longitud})
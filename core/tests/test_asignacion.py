@@ -0,0 +1,96 @@
+import random
+from itertools import combinations
+
+from django.test import SimpleTestCase, TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import asignacion_service
+from core.services.inventario_service import InventarioService, StockInsuficiente
+
+
+def exhaustivo(pedidas, stock, distancias):
+    """(envíos, distancia total) del mejor subconjunto de bodegas, probando todos."""
+    bodegas = sorted({b for por_bodega in stock.values() for b in por_bodega})
+    for tamano in range(1, len(bodegas) + 1):
+        factibles = [sum(distancias[b] for b in elegidas) for elegidas in combinations(bodegas, tamano)
+                     if all(sum(stock[p].get(b, 0) for b in elegidas) >= c for p, c in pedidas.items())]
+        if factibles:
+            return tamano, min(factibles)
+    return 0, 0
+
+
+def instancia(rnd, alcanzan=True):
+    bodegas = range(rnd.randint(2, 6))
+    stock = {p: {b: rnd.randint(1, 12) for b in bodegas if rnd.random() < 0.6} for p in range(rnd.randint(1, 5))}
+    stock = {p: por_bodega for p, por_bodega in stock.items() if por_bodega}
+    pedidas = {p: rnd.randint(1, sum(por_bodega.values()) + (0 if alcanzan else 5)) for p, por_bodega in stock.items()}
+    distancias = {b: rnd.uniform(0, 100) for b in bodegas}
+    return pedidas, stock, distancias
+
+
+class ResolverTests(SimpleTestCase):
+    def verificar_plan(self, pedidas, stock, envios, faltantes):
+        for bodega_id, lineas in envios.items():
+            self.assertTrue(lineas)
+            for producto_id, cantidad in lineas.items():
+                self.assertLessEqual(cantidad, stock[producto_id][bodega_id])
+        for producto_id, cantidad in pedidas.items():
+            enviado = sum(lineas.get(producto_id, 0) for lineas in envios.values())
+            self.assertEqual(enviado + faltantes.get(producto_id, 0), cantidad)
+            self.assertEqual(faltantes.get(producto_id, 0), max(0, cantidad - sum(stock[producto_id].values())))
+
+    def test_optimo_contra_busqueda_exhaustiva(self):
+        rnd = random.Random(23)
+        for caso in range(500):
+            pedidas, stock, distancias = instancia(rnd)
+            if not pedidas:
+                continue
+            with self.subTest(caso=caso):
+                envios, faltantes = asignacion_service.resolver(pedidas, stock, distancias)
+                self.verificar_plan(pedidas, stock, envios, faltantes)
+                tamano, distancia = exhaustivo(pedidas, stock, distancias)
+                self.assertEqual(len(envios), tamano)
+                self.assertAlmostEqual(sum(distancias[b] for b in envios), distancia)
+
+    def test_faltantes(self):
+        rnd = random.Random(5)
+        for caso in range(200):
+            pedidas, stock, distancias = instancia(rnd, alcanzan=False)
+            with self.subTest(caso=caso):
+                self.verificar_plan(pedidas, stock, *asignacion_service.resolver(pedidas, stock, distancias))
+
+    def test_busqueda_local_en_instancias_grandes(self):
+        # por encima de EXACTO_PRESUPUESTO: cubrimiento voraz + búsqueda local, plan válido
+        rnd = random.Random(7)
+        stock = {p: {b: rnd.randint(0, 30) for b in range(40) if rnd.random() < 0.3} for p in range(60)}
+        pedidas = {p: rnd.randint(1, 20) for p in stock}
+        envios, faltantes = asignacion_service.resolver(pedidas, stock)
+        self.verificar_plan(pedidas, stock, envios, faltantes)
+
+
+class ReservarLoteTests(TestCase):
+    def setUp(self):
+        self.productos = [Producto.objects.create(codigo_barras=f'77{i}', tipo='caja', peso=1, volumen=1,
+                                                  codigo=f'P{i}') for i in range(2)]
+        self.bodega = Bodega.objects.create(codigo='B1', nombre='B1', ciudad='-', direccion='-', capacidad=100)
+        self.filas = [InventarioService.crear_inventario(p.id, self.bodega.id, None, 10, 1) for p in self.productos]
+
+    def test_reserva_todas_las_lineas(self):
+        antes = now()
+        InventarioService.reservar_lote([{'producto_id': self.productos[0].id, 'cantidad': 4},
+                                         {'producto_id': self.productos[1].id, 'cantidad': 10},
+                                         {'producto_id': self.productos[0].id, 'cantidad': 1}], self.bodega.id)
+        filas = list(Inventario.objects.order_by('id'))
+        self.assertEqual([(f.cantidad_disponible, f.cantidad_reservada) for f in filas], [(5, 6), (0, 11)])
+        self.assertTrue(all(f.ultima_actualizacion >= antes for f in filas))
+        resumen = self.bodega.resumen_stock
+        resumen.refresh_from_db()
+        self.assertEqual((resumen.total_disponible, resumen.total_reservado, resumen.stockouts), (5, 17, 1))
+
+    def test_nada_si_una_linea_no_alcanza(self):
+        with self.assertRaises(StockInsuficiente):
+            InventarioService.reservar_lote([{'producto_id': self.productos[0].id, 'cantidad': 4},
+                                             {'producto_id': self.productos[1].id, 'cantidad': 11}], self.bodega.id)
+        disponibles = Inventario.objects.order_by('id').values_list('cantidad_disponible', flat=True)
+        self.assertEqual(list(disponibles), [10, 10])
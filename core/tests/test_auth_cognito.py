@@ -0,0 +1,162 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError
+
+from core import auth_cognito
+from core.auth_cognito import JWKSCache, TokensVerificados
+from core.management.commands._bench import llave_local
+
+LLAVES = {kid: llave_local(kid) for kid in ('k1', 'k2')}
+
+
+class FuenteFalsa:
+    """Key set que el test rota a voluntad; cuenta las descargas."""
+
+    def __init__(self, *kids):
+        self.kids = list(kids)
+        self.descargas = 0
+        self.falla = False
+
+    def __call__(self):
+        self.descargas += 1
+        if self.falla:
+            raise OSError("JWKS no disponible")
+        return {'keys': [LLAVES[kid][1] for kid in self.kids]}
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def token(kid, exp):
+    return jwt.encode({'sub': 'u', 'aud': auth_cognito.COGNITO_APP_CLIENT_ID, 'iss': auth_cognito.ISSUER,
+                       'exp': exp}, LLAVES[kid][0], algorithm='RS256', headers={'kid': kid})
+
+
+class JWKSCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.fuente, self.reloj = FuenteFalsa('k1'), Reloj()
+        self.jwks = JWKSCache(self.fuente, ttl=3600, refresco_minimo=30, reloj=self.reloj)
+
+    def test_kid_desconocido_refresca_una_vez(self):
+        self.assertEqual(self.jwks.obtener('k1')['kid'], 'k1')
+        self.fuente.kids.append('k2')  # rotación en Cognito
+        self.reloj.ahora += 30
+        self.assertEqual(self.jwks.obtener('k2')['kid'], 'k2')
+        self.assertEqual(self.fuente.descargas, 2)
+
+    def test_kid_desconocido_no_refresca_antes_del_minimo(self):
+        self.jwks.obtener('k1')
+        for _ in range(5):
+            self.assertIsNone(self.jwks.obtener('falso'))
+        self.assertEqual(self.fuente.descargas, 1)
+        self.reloj.ahora += 30
+        self.assertIsNone(self.jwks.obtener('falso'))
+        self.assertEqual(self.fuente.descargas, 2)
+
+    def test_ttl(self):
+        self.jwks.obtener('k1')
+        self.fuente.kids = ['k2']
+        self.reloj.ahora += 3599
+        self.assertIsNotNone(self.jwks.obtener('k1'))
+        self.reloj.ahora += 1
+        self.assertIsNone(self.jwks.obtener('k1'))  # la llave retirada deja de valer al vencer
+        self.assertEqual(self.fuente.descargas, 2)
+
+    def test_fuente_caida(self):
+        self.fuente.falla = True
+        with self.assertRaises(OSError):
+            self.jwks.obtener('k1')  # sin llaves previas no hay con qué seguir
+        self.fuente.falla = False
+        self.jwks.obtener('k1')
+        self.fuente.falla = True
+        self.reloj.ahora += 3600
+        self.assertIsNotNone(self.jwks.obtener('k1'))  # sigue con las que tiene
+        descargas = self.fuente.descargas
+        self.reloj.ahora += 29
+        self.jwks.obtener('k1')
+        self.assertEqual(self.fuente.descargas, descargas)  # reintenta tras refresco_minimo
+        self.reloj.ahora += 1
+        self.jwks.obtener('k1')
+        self.assertEqual(self.fuente.descargas, descargas + 1)
+
+    def test_refresco_de_un_solo_vuelo(self):
+        liberar = threading.Event()
+
+        def lenta():
+            liberar.wait(5)
+            return self.fuente()
+
+        jwks = JWKSCache(lenta, ttl=3600, refresco_minimo=30, reloj=self.reloj)
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(jwks.obtener('k1'))) for _ in range(8)]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(0.05)
+        liberar.set()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(self.fuente.descargas, 1)
+        self.assertEqual([r['kid'] for r in resultados], ['k1'] * 8)
+
+
+class TokensVerificadosTests(SimpleTestCase):
+    def test_expira_con_exp_y_lru(self):
+        reloj = Reloj()
+        tokens = TokensVerificados(maximo=2, reloj=reloj)
+        for nombre, exp in (('a', 1010), ('b', 2000)):
+            tokens.guardar(nombre, {'sub': nombre, 'exp': exp})
+        tokens.guardar('sin-exp', {'sub': 'x'})  # sin exp no se recuerda
+        self.assertIsNone(tokens.obtener('sin-exp'))
+        self.assertEqual(tokens.obtener('a')['sub'], 'a')
+        reloj.ahora = 1010
+        self.assertIsNone(tokens.obtener('a'))
+        tokens.guardar('c', {'sub': 'c', 'exp': 3000})
+        tokens.guardar('d', {'sub': 'd', 'exp': 3000})
+        self.assertIsNone(tokens.obtener('b'))  # el menos usado sale primero
+        self.assertEqual(tokens.obtener('d')['sub'], 'd')
+
+
+class Futuro(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.now(tz) + timedelta(hours=1)
+
+
+class VerifyCognitoTokenTests(SimpleTestCase):
+    def setUp(self):
+        self.fuente = FuenteFalsa('k1')
+        auth_cognito.configurar_fuente_jwks(self.fuente)
+
+    def tearDown(self):
+        auth_cognito.configurar_fuente_jwks(auth_cognito.fetch_jwks)
+
+    def test_token_recordado_hasta_su_exp(self):
+        exp = int(time.time()) + 60
+        valido = token('k1', exp)
+        self.assertEqual(auth_cognito.verify_cognito_token(valido)['sub'], 'u')
+        with mock.patch.object(auth_cognito.jwt, 'decode') as decode:
+            auth_cognito.verify_cognito_token(valido)
+        decode.assert_not_called()
+
+        # pasado exp el token sigue en el LRU pero no se acepta: se verifica de nuevo y falla
+        with mock.patch.object(auth_cognito._tokens, 'reloj', lambda: exp + 1), \
+                mock.patch('jose.jwt.datetime', Futuro):
+            with self.assertRaises(ExpiredSignatureError):
+                auth_cognito.verify_cognito_token(valido)
+
+    def test_rotacion_de_llaves(self):
+        with self.assertRaises(ValueError):
+            auth_cognito.verify_cognito_token(token('k2', int(time.time()) + 60))
+        self.fuente.kids.append('k2')
+        auth_cognito.configurar_fuente_jwks(self.fuente, refresco_minimo=0)
+        self.assertEqual(auth_cognito.verify_cognito_token(token('k2', int(time.time()) + 60))['sub'], 'u')
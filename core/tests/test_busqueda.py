@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import busqueda_service
+
+
+class BusquedaFtsTests(TestCase):
+    """Textos de 3+ caracteres: pasan por los índices FTS5 de la migración 0004, que sus
+    triggers mantienen al insertar, actualizar y borrar."""
+
+    def setUp(self):
+        codigos = ['CAJA-ROJA', 'ROJO-01', 'TAPA-AZUL', 'BOLSA']
+        self.productos = {c: Producto.objects.create(codigo=c, codigo_barras=f'770{i:04}', tipo='caja', peso=1,
+                                                     volumen=1) for i, c in enumerate(codigos)}
+        self.bodegas = [Bodega.objects.create(codigo=f'B{i}', nombre=n, ciudad='-', direccion='-', capacidad=10)
+                        for i, n in enumerate(['Norte Bogotá', 'Sur Bogotá', 'Medellín'])]
+        for bodega in self.bodegas:
+            for producto in self.productos.values():
+                Inventario.objects.create(producto=producto, bodega=bodega, cantidad_disponible=1,
+                                          cantidad_reservada=0, ultima_actualizacion=now())
+
+    def _codigos(self, texto, limite=10):
+        return [p.codigo for p in busqueda_service.buscar_productos(texto, limite)]
+
+    def test_subcadena_con_prefijos_primero(self):
+        self.assertTrue(busqueda_service._usa_fts('roj'))
+        encontrados = self._codigos('roj')
+        self.assertEqual(encontrados[0], 'ROJO-01')  # empieza por el texto
+        self.assertEqual(sorted(encontrados), ['CAJA-ROJA', 'ROJO-01'])
+        self.assertEqual(self._codigos('7700002'), ['TAPA-AZUL'])  # por codigo_barras
+        self.assertEqual(self._codigos('"x'), [])  # comillas: frase literal, sin error de sintaxis
+        self.assertEqual(sorted(b.nombre for b in busqueda_service.buscar_bodegas('bogotá')),
+                         ['Norte Bogotá', 'Sur Bogotá'])
+
+    def test_el_indice_sigue_las_actualizaciones_y_borrados(self):
+        producto = self.productos['BOLSA']
+        producto.codigo = 'SACO-VERDE'
+        producto.save()
+        self.assertEqual(self._codigos('bolsa'), [])
+        self.assertEqual(self._codigos('verde'), ['SACO-VERDE'])
+
+        self.productos['TAPA-AZUL'].delete()
+        self.assertEqual(self._codigos('azul'), [])
+        self.assertIsNone(busqueda_service.ids_productos('ro'))  # corto: sin índice
+        self.assertEqual(busqueda_service.ids_productos('azul'), [])
+
+        bodega = self.bodegas[2]
+        bodega.nombre = 'Cali'
+        bodega.save()
+        self.assertEqual(busqueda_service.ids_bodegas('medell'), [])
+        self.assertEqual(busqueda_service.ids_bodegas('cali'), [bodega.id])
+
+    def test_demasiadas_coincidencias_filtran_por_join(self):
+        with mock.patch.object(busqueda_service, 'MAXIMO_IDS', 1):
+            self.assertIsNone(busqueda_service.ids_productos('roj'))
+            filas = busqueda_service.filtrar_inventario(Inventario.objects.all(), producto_codigo='roj')
+            self.assertEqual(filas.count(), 2 * len(self.bodegas))
+
+    def test_filtro_por_ids_segun_selectividad(self):
+        qs = Inventario.objects.order_by('id')
+        # una bodega de tres es un tercio del inventario: más que SELECTIVIDAD_MAXIMA_INDICE
+        amplio = busqueda_service.filtrar_inventario(qs, bodega_nombre='medellín')
+        self.assertIn('+ 0', str(amplio.query))
+        self.assertEqual({i.bodega_id for i in amplio}, {self.bodegas[2].id})
+        self.assertEqual(amplio.count(), len(self.productos))
+
+        with mock.patch.object(busqueda_service, 'SELECTIVIDAD_MAXIMA_INDICE', 0.5):
+            selectivo = busqueda_service.filtrar_inventario(qs, bodega_nombre='medellín')
+            self.assertNotIn('+ 0', str(selectivo.query))
+            self.assertEqual(list(selectivo), list(amplio))
+
+        ambos = busqueda_service.filtrar_inventario(qs, producto_codigo='caja-r', bodega_nombre='sur')
+        self.assertEqual([(i.producto.codigo, i.bodega.nombre) for i in ambos], [('CAJA-ROJA', 'Sur Bogotá')])
+
+    def test_vistas(self):
+        sugerencias = self.client.get('/inventario/sugerencias/', {'q': 'roj', 'limit': 1}).json()
+        self.assertEqual([p['codigo'] for p in sugerencias['productos']], ['ROJO-01'])
+        filas = self.client.get('/inventario/buscar/', {'producto_codigo': 'azul', 'bodega_nombre': 'norte'}).json()
+        self.assertEqual([(f['producto'], f['bodega']) for f in filas], [('TAPA-AZUL', 'Norte Bogotá')])
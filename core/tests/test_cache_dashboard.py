@@ -0,0 +1,97 @@
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import QueryDict
+from django.utils.timezone import now
+
+from core.models import Inventario, TareaLogistica
+from core.services import cache_service
+from core.services.inventario_service import InventarioService
+
+from .test_dashboard import DashboardTestCase
+
+
+class CacheDashboardTests(DashboardTestCase):
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.poblar(2)
+
+    def _get(self, ruta, etag=None, **parametros):
+        extra = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(ruta, parametros, **extra)
+
+    def _escribir(self, funcion, *args, **kwargs):
+        # las versiones suben al confirmar la transacción (cache_service.incrementar)
+        with self.captureOnCommitCallbacks(execute=True):
+            funcion(*args, **kwargs)
+
+    def test_segunda_peticion_sale_del_cache(self):
+        primera = self._get('/api/kpis/')
+        with self.assertNumQueries(0):
+            segunda = self._get('/api/kpis/')
+        self.assertEqual(segunda.content, primera.content)
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+
+    def test_escritura_de_inventario_invalida_al_confirmar(self):
+        antes = self._get('/api/mix-disponible-reservado/')
+        fila = Inventario.objects.filter(bodega=self.bodegas[1]).first()
+        with self.captureOnCommitCallbacks() as pendientes:
+            InventarioService.reservar_producto(fila.id, 5)
+        # sin confirmar, la versión no cambió: sigue la respuesta guardada
+        self.assertEqual(self._get('/api/mix-disponible-reservado/')['ETag'], antes['ETag'])
+        for callback in pendientes:
+            callback()
+        despues = self._get('/api/mix-disponible-reservado/')
+        self.assertNotEqual(despues['ETag'], antes['ETag'])
+        self.assertEqual(sum(despues.json()['reservado']), sum(antes.json()['reservado']) + 5)
+
+    def test_alcance_por_bodega(self):
+        b0, b1 = (str(b.id) for b in self.bodegas)
+        etags = {alcance: self._get('/api/kpis/', **({'bodega_id': alcance} if alcance else {}))['ETag']
+                 for alcance in (None, b0, b1)}
+        fila = Inventario.objects.filter(bodega=self.bodegas[0], cantidad_disponible__gt=0).first()
+        self._escribir(InventarioService.reservar_producto, fila.id, 1)
+        self.assertNotEqual(self._get('/api/kpis/')['ETag'], etags[None])
+        self.assertNotEqual(self._get('/api/kpis/', bodega_id=b0)['ETag'], etags[b0])
+        self.assertEqual(self._get('/api/kpis/', bodega_id=b1)['ETag'], etags[b1])
+
+    def test_escrituras_de_productos_y_tareas(self):
+        skus = self._get('/api/top-skus/')
+        producto = self.productos[-1]
+        producto.codigo = 'RENOMBRADO'
+        self._escribir(producto.save)
+        nuevo = self._get('/api/top-skus/')
+        self.assertNotEqual(nuevo['ETag'], skus['ETag'])
+        self.assertIn('RENOMBRADO', nuevo.json()['labels'])
+
+        tareas = self._get('/api/tareas-estado/')
+        self._escribir(TareaLogistica.objects.create, tipo='ALISTAMIENTO', estado='PENDIENTE',
+                       fecha_asignacion=now(), bodega=self.bodegas[0])
+        nuevo = self._get('/api/tareas-estado/')
+        self.assertNotEqual(nuevo['ETag'], tareas['ETag'])
+        self.assertEqual(sum(nuevo.json()['data']), sum(tareas.json()['data']) + 1)
+
+    def test_304_solo_mientras_la_respuesta_esta_guardada(self):
+        etag = self._get('/api/kpis/')['ETag']
+        with self.assertNumQueries(0):
+            response = self._get('/api/kpis/', etag=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self._get('/api/kpis/', etag='"otro"').status_code, 200)
+
+        # la respuesta expira (DASHBOARD_CACHE_TIMEOUT) sin que cambien las versiones
+        versiones = cache_service.versiones((cache_service.INVENTARIO,))
+        cache.delete(cache_service.clave_respuesta('kpis_api', QueryDict(), versiones))
+        response = self._get('/api/kpis/', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self._get('/api/kpis/', etag=etag).status_code, 304)
+
+    def test_aging_cambia_de_clave_con_el_dia(self):
+        etag = self._get('/api/aging/')['ETag']
+        self.assertEqual(self._get('/api/aging/', etag=etag).status_code, 304)
+        with mock.patch('core.services.cache_service.localdate', return_value=date(2099, 1, 1)):
+            response = self._get('/api/aging/', etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import dashboard_service
+from core.services.inventario_service import InventarioService
+
+
+class DashboardTestCase(TestCase):
+    """Bodegas con inventario creado por InventarioService (que mantiene los resúmenes)."""
+
+    def poblar(self, bodegas, productos=3):
+        self.productos = [Producto.objects.create(codigo_barras=f'77{i}', tipo='caja', peso=1, volumen=1,
+                                                  codigo=f'P{i}') for i in range(productos)]
+        self.bodegas = []
+        for i in range(bodegas):
+            bodega = Bodega.objects.create(codigo=f'B{i}', nombre=f'Bodega {i}', ciudad='-', direccion='-',
+                                           capacidad=1000, latitud=4.6 + i, longitud=-74.0)
+            for j, producto in enumerate(self.productos):
+                InventarioService.crear_inventario(producto.id, bodega.id, None, (i + j) * 10, j)
+            self.bodegas.append(bodega)
+
+
+class BodegasDataApiTests(DashboardTestCase):
+    def test_una_consulta_con_una_bodega(self):
+        self.poblar(1)
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/bodegas/').json()
+        self.assertEqual(data[str(self.bodegas[0].id)]['total_disponible'], 0 + 10 + 20)
+        self.assertEqual(data[str(self.bodegas[0].id)]['total_reservado'], 0 + 1 + 2)
+
+    def test_una_consulta_con_varias_bodegas(self):
+        self.poblar(6)
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/bodegas/').json()
+        self.assertEqual(len(data), 6)
+        ultima = data[str(self.bodegas[-1].id)]
+        self.assertEqual(ultima['total_disponible'], 50 + 60 + 70)
+        self.assertEqual(ultima['ocupacion_pct'], round((180 + 3) / 1000 * 100, 2))
+
+    def test_filtrada_por_bodega(self):
+        self.poblar(3)
+        with self.assertNumQueries(1):
+            data = self.client.get('/api/bodegas/', {'bodega_id': self.bodegas[1].id}).json()
+        self.assertEqual(list(data), [str(self.bodegas[1].id)])
+
+
+class KpisAgingTests(DashboardTestCase):
+    def setUp(self):
+        self.poblar(4)
+
+    def test_kpis_globales(self):
+        with self.assertNumQueries(2):  # agregados de los resúmenes por bodega + SKUs con stock
+            kpis = dashboard_service.calcular_kpis()
+        self.assertEqual(kpis['total_warehouses'], 4)
+        self.assertEqual(kpis['sku_count'], 3)
+        self.assertEqual(kpis['stockout_skus'], 1)  # producto 0 en la bodega 0
+        self.assertEqual(kpis['total_disponible'], sum((i + j) * 10 for i in range(4) for j in range(3)))
+
+    def test_kpis_por_bodega(self):
+        bodega = self.bodegas[0]
+        with self.assertNumQueries(1):
+            kpis = dashboard_service.calcular_kpis(bodega)
+        self.assertEqual((kpis['total_warehouses'], kpis['sku_count'], kpis['stockout_skus']), (1, 3, 1))
+        self.assertEqual(kpis['total_disponible'], 30)
+
+    def test_kpis_api_por_bodega(self):
+        with self.assertNumQueries(2):  # la bodega + sus agregados
+            data = self.client.get('/api/kpis/', {'bodega_id': self.bodegas[1].id}).json()
+        self.assertEqual(data['filtered_bodega_id'], self.bodegas[1].id)
+        self.assertEqual(data['stockout_skus'], 0)
+
+    def test_aging(self):
+        antiguo = Inventario.objects.filter(bodega=self.bodegas[1]).first()
+        Inventario.objects.filter(id=antiguo.id).update(ultima_actualizacion=now() - timedelta(days=45))
+        for bodega_id, esperado in ((None, [290, 10, 0, 0]), (self.bodegas[1].id, [50, 10, 0, 0])):
+            with self.assertNumQueries(1):
+                self.assertEqual(dashboard_service.calcular_aging(bodega_id), esperado)
+
+
+class DashboardSkusTests(DashboardTestCase):
+    def test_sku_count_igual_al_de_los_kpis(self):
+        self.poblar(2)
+        # la bodega 0 tiene dos productos con el mismo código; la 1, una fila sin producto
+        repetido = Producto.objects.create(codigo_barras='779', tipo='caja', peso=1, volumen=1,
+                                           codigo=self.productos[1].codigo)
+        InventarioService.crear_inventario(repetido.id, self.bodegas[0].id, None, 5, 0)
+        Inventario.objects.create(producto=None, bodega=self.bodegas[1], cantidad_disponible=7,
+                                  cantidad_reservada=0, ultima_actualizacion=now())
+        for bodega_id, skus in ((None, 4), (self.bodegas[0].id, 4), (self.bodegas[1].id, 3)):
+            with self.subTest(bodega_id=bodega_id):
+                esperado = dashboard_service.calcular_kpis(Bodega.objects.filter(id=bodega_id).first())
+                data = dashboard_service.datos_dashboard(bodega_id)
+                self.assertEqual(esperado['sku_count'], skus)
+                self.assertEqual(data['kpis']['sku_count'], skus)
@@ -0,0 +1,116 @@
+import asyncio
+from unittest import mock
+
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Bodega, Producto
+from core.services import eventos_service
+from core.services.eventos_service import RESYNC, STOCK, MemoriaEventos
+from core.services.inventario_service import InventarioService
+
+
+def correr(corrutina):
+    return asyncio.run(corrutina)
+
+
+async def pasar_turno():
+    # publicar() entrega con call_soon_threadsafe: deja correr el callback en el loop
+    await asyncio.sleep(0)
+
+
+class PublicarDeltasTests(TestCase):
+    def setUp(self):
+        self.memoria = MemoriaEventos()
+        parche = mock.patch.object(eventos_service, 'broker', lambda: self.memoria)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def _recibidos(self, callbacks):
+        """Ejecuta los on_commit capturados con un suscriptor conectado; devuelve lo que recibió."""
+        async def escuchar():
+            suscripcion = self.memoria.suscribir()
+            for callback in callbacks:
+                callback()
+            await pasar_turno()
+            return await suscripcion.recibir(0.01)
+        return correr(escuchar())
+
+    def test_publica_al_confirmar(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            eventos_service.publicar_deltas({1: (5, 2, 1, 0), 2: (0, 0, 0, 0), None: (1, 0, 0, 0)})
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self._recibidos(callbacks), [
+            (1, STOCK, {'bodega_id': 1, 'disponible': 5, 'reservado': 2, 'registros': 1, 'stockouts': 0}),
+        ])
+
+    def test_no_publica_si_se_revierte(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    eventos_service.publicar_deltas({1: (5, 0, 0, 0)})
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self._recibidos(callbacks), [])
+
+    def test_escritura_de_inventario(self):
+        bodega = Bodega.objects.create(codigo='B', nombre='B', ciudad='-', direccion='-', capacidad=10)
+        producto = Producto.objects.create(codigo='P', codigo_barras='770', tipo='caja', peso=1, volumen=1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            InventarioService.crear_inventario(producto.id, bodega.id, cantidad_disponible=0, cantidad_reservada=3)
+        datos = [d for _, tipo, d in self._recibidos(callbacks) if tipo == STOCK]
+        self.assertEqual(datos, [{'bodega_id': bodega.id, 'disponible': 0, 'reservado': 3, 'registros': 1,
+                                  'stockouts': 1}])
+
+
+class MemoriaEventosTests(SimpleTestCase):
+    def test_filtro_por_bodega(self):
+        async def escenario():
+            memoria = MemoriaEventos()
+            todas, una, otra = memoria.suscribir(), memoria.suscribir(1), memoria.suscribir(3)
+            memoria.publicar([{'bodega_id': 1, 'disponible': 1}, {'bodega_id': 2, 'disponible': 2}])
+            await pasar_turno()
+            return [await s.recibir(0.01) for s in (todas, una, otra)]
+
+        todas, una, otra = correr(escenario())
+        self.assertEqual([d['bodega_id'] for _, _, d in todas], [1, 2])
+        self.assertEqual(una, [(1, STOCK, {'bodega_id': 1, 'disponible': 1})])
+        self.assertEqual(otra, [])  # sin eventos de su bodega no se despierta
+
+    def test_desborde_pide_resync(self):
+        async def escenario():
+            memoria = MemoriaEventos(maximo=3)
+            suscripcion = memoria.suscribir()
+            for i in range(5):
+                memoria.publicar([{'bodega_id': 1, 'disponible': i}])
+                await pasar_turno()
+            primero = await suscripcion.recibir(0.01)
+            memoria.publicar([{'bodega_id': 1, 'disponible': 9}])
+            await pasar_turno()
+            return primero, await suscripcion.recibir(0.01)
+
+        primero, despues = correr(escenario())
+        # el 4.º no cabía: se descartan los pendientes y se avisa con el id del último perdido
+        self.assertEqual(primero, [(4, RESYNC, {}), (5, STOCK, {'bodega_id': 1, 'disponible': 4})])
+        self.assertEqual(despues, [(6, STOCK, {'bodega_id': 1, 'disponible': 9})])
+
+    def test_publicar_desde_otro_hilo_y_cancelar(self):
+        async def escenario():
+            memoria = MemoriaEventos()
+            suscripcion = memoria.suscribir(1)
+            await asyncio.to_thread(memoria.publicar, [{'bodega_id': 1}])
+            recibidos = await suscripcion.recibir(1)
+            memoria.cancelar(suscripcion)
+            memoria.publicar([{'bodega_id': 1}])
+            await pasar_turno()
+            return recibidos, memoria.suscriptores(), await suscripcion.recibir(0.01)
+
+        recibidos, suscriptores, tras_cancelar = correr(escenario())
+        self.assertEqual(recibidos, [(1, STOCK, {'bodega_id': 1})])
+        self.assertEqual((suscriptores, tras_cancelar), (0, []))
+
+    def test_formato_sse(self):
+        self.assertEqual(eventos_service.formatear(7, STOCK, {'bodega_id': 1, 'disponible': -2}),
+                         'id: 7\nevent: stock\ndata: {"bodega_id":1,"disponible":-2}\n\n')
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto, RespuestaIdempotente
+from core.services import idempotencia_service
+
+from .auth import firmado
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        producto = Producto.objects.create(codigo_barras='770', tipo='caja', peso=1, volumen=1, codigo='P1')
+        bodega = Bodega.objects.create(codigo='B1', nombre='Bodega 1', ciudad='Bogotá', direccion='-', capacidad=100)
+        self.inventario = Inventario.objects.create(producto=producto, bodega=bodega, cantidad_disponible=10,
+                                                    cantidad_reservada=0, ultima_actualizacion=now())
+        self.datos = {'bodega_id': str(bodega.id), 'cantidad': '2', 'producto_id': str(producto.id)}
+
+    def reservar(self, datos, clave='clave-1', ip='10.0.0.1'):
+        return self.client.post('/inventario/reservar/', datos, HTTP_IDEMPOTENCY_KEY=clave, REMOTE_ADDR=ip)
+
+    def disponible(self):
+        self.inventario.refresh_from_db()
+        return self.inventario.cantidad_disponible
+
+    def test_copia_exacta_recibe_la_respuesta_guardada(self):
+        datos = firmado(self.datos)
+        primera = self.reservar(datos)
+        repetida = self.reservar(datos)
+        self.assertEqual(primera.status_code, 200)
+        self.assertEqual(repetida.status_code, 200)
+        self.assertEqual(repetida['Idempotent-Replayed'], 'true')
+        self.assertEqual(repetida.content, primera.content)
+        self.assertEqual(self.disponible(), 8)
+
+    def test_firma_distinta_no_recibe_la_respuesta_guardada(self):
+        datos = firmado(self.datos)
+        self.assertEqual(self.reservar(datos).status_code, 200)
+        for otra in ({**datos, 'hash': '0' * 64}, firmado(self.datos)):
+            response = self.reservar(otra)
+            self.assertEqual(response.status_code, 422)
+            self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(self.disponible(), 8)
+
+    def test_firma_invalida_no_reserva_la_clave(self):
+        datos = firmado(self.datos)
+        self.assertEqual(self.reservar({**datos, 'hash': '0' * 64}).status_code, 403)
+        self.assertEqual(self.reservar(datos).status_code, 200)
+        self.assertEqual(self.disponible(), 8)
+
+    def test_claves_por_cliente(self):
+        self.assertEqual(self.reservar(firmado(self.datos), ip='10.0.0.1').status_code, 200)
+        response = self.reservar(firmado(self.datos), ip='10.0.0.2')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+        self.assertEqual(self.disponible(), 6)
+
+    def test_iniciar_deja_de_reintentar_si_la_fila_sigue_desapareciendo(self):
+        with mock.patch.object(RespuestaIdempotente.objects, 'create', side_effect=IntegrityError) as create:
+            resultado, registro = idempotencia_service.iniciar('vista', '10.0.0.1', 'clave-1', 'huella')
+        self.assertEqual((resultado, registro), (idempotencia_service.EN_PROCESO, None))
+        self.assertEqual(create.call_count, idempotencia_service.INTENTOS_INICIO)
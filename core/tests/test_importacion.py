@@ -0,0 +1,43 @@
+from django.test import TestCase
+
+from core.models import Bodega, Inventario, Producto, ResumenStockBodega
+from core.services import importacion_service
+from core.services.inventario_service import InventarioService
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(codigo_barras='770', tipo='caja', peso=1, volumen=1, codigo='P1')
+        self.bodega = Bodega.objects.create(codigo='B1', nombre='B1', ciudad='-', direccion='-', capacidad=100)
+
+    def importar(self, *lineas):
+        return importacion_service.importar(importacion_service.leer(lineas, 'ndjson'))
+
+    def test_cantidades_no_enteras_se_rechazan(self):
+        reporte = self.importar(
+            '{"producto": "P1", "bodega": "B1", "cantidad_disponible": 2.7}',
+            '{"producto": "P1", "bodega": "B1", "cantidad_disponible": true}',
+            '{"producto": "P1", "bodega": "B1", "cantidad_disponible": "2.5"}',
+            '{"producto": "P1", "bodega": "B1", "cantidad_disponible": 5, "cantidad_reservada": 1e400}',
+        )
+        self.assertEqual((reporte['errores'], reporte['creadas']), (4, 0))
+        self.assertTrue(all('debe ser entero' in e['error'] for e in reporte['detalle_errores']))
+        self.assertFalse(Inventario.objects.exists())
+
+    def test_enteros_en_cualquier_forma(self):
+        reporte = self.importar('{"producto": "P1", "bodega": "B1", "cantidad_disponible": "7", '
+                                '"cantidad_reservada": 2.0}')
+        self.assertEqual((reporte['errores'], reporte['creadas']), (0, 1))
+        fila = Inventario.objects.get()
+        self.assertEqual((fila.cantidad_disponible, fila.cantidad_reservada), (7, 2))
+
+    def test_actualiza_fila_sin_ubicacion_y_resumen(self):
+        InventarioService.crear_inventario(self.producto.id, self.bodega.id, None, 10, 0)
+        reporte = self.importar('{"producto": "P1", "bodega": "B1", "cantidad_disponible": 0, '
+                                '"cantidad_reservada": 4}')
+        self.assertEqual((reporte['creadas'], reporte['actualizadas']), (0, 1))
+        fila = Inventario.objects.get()
+        self.assertEqual((fila.cantidad_disponible, fila.cantidad_reservada), (0, 4))
+        resumen = ResumenStockBodega.objects.get(bodega=self.bodega)
+        self.assertEqual((resumen.total_disponible, resumen.total_reservado, resumen.registros,
+                          resumen.stockouts), (0, 4, 1, 1))
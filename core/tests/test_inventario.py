@@ -0,0 +1,96 @@
+import threading
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services.inventario_service import InventarioService, StockInsuficiente
+
+from .auth import firmado
+
+
+def inventario(disponible, reservada=0):
+    producto = Producto.objects.create(codigo_barras='770', tipo='caja', peso=1, volumen=1, codigo='P1')
+    bodega = Bodega.objects.create(codigo='B1', nombre='Bodega 1', ciudad='-', direccion='-', capacidad=100)
+    return Inventario.objects.create(producto=producto, bodega=bodega, cantidad_disponible=disponible,
+                                     cantidad_reservada=reservada, ultima_actualizacion=now())
+
+
+class ReservaConcurrenteTests(TransactionTestCase):
+    STOCK = 322
+    CANTIDAD = 3
+    HILOS = 16
+    INTENTOS = 20  # por hilo: 320 reservas pedidas para 107 posibles
+
+    def test_reservas_simultaneas_sobre_una_fila(self):
+        fila = inventario(self.STOCK)
+        exitos, rechazos, disponibles, errores = [], [], [], []
+        barrera = threading.Barrier(self.HILOS)
+
+        def reservar():
+            try:
+                barrera.wait()
+                for _ in range(self.INTENTOS):
+                    try:
+                        inv = InventarioService.reservar_producto(fila.id, self.CANTIDAD)
+                    except StockInsuficiente:
+                        rechazos.append(1)
+                    else:
+                        exitos.append(1)
+                        disponibles.append(inv.cantidad_disponible)
+            except Exception as e:  # noqa: BLE001 - se revisa en el hilo del test
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=reservar) for _ in range(self.HILOS)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(errores, [])
+        esperados = self.STOCK // self.CANTIDAD
+        self.assertEqual(len(exitos), esperados)
+        self.assertEqual(len(rechazos), self.HILOS * self.INTENTOS - esperados)
+        self.assertTrue(all(d >= 0 for d in disponibles))
+        fila.refresh_from_db()
+        self.assertEqual(fila.cantidad_disponible, self.STOCK - esperados * self.CANTIDAD)
+        self.assertEqual(fila.cantidad_reservada, esperados * self.CANTIDAD)
+
+
+class MovimientoReservaViewsTests(TestCase):
+    def test_mas_de_lo_reservado_es_conflicto(self):
+        fila = inventario(10, reservada=2)
+        for ruta in ('/inventario/liberar/', '/inventario/confirmar/'):
+            response = self.client.post(ruta, firmado({'inventario_id': str(fila.id), 'cantidad': '3'}))
+            self.assertEqual(response.status_code, 409)
+            self.assertFalse(response.json()['success'])
+        fila.refresh_from_db()
+        self.assertEqual((fila.cantidad_disponible, fila.cantidad_reservada), (10, 2))
+
+
+class ParametrosEnterosTests(TestCase):
+    RUTAS = ('/inventario/{}/', '/async/inventario/{}/')
+
+    def test_enteros_invalidos_son_400(self):
+        for vista, consulta in (('sugerencias', 'q=P&limit=abc'), ('sugerencias', 'q=P&limit=0'),
+                                ('bajo_stock', 'umbral=x'), ('bajo_stock', 'umbral=-1')):
+            for ruta in self.RUTAS:
+                with self.subTest(ruta=ruta.format(vista), consulta=consulta):
+                    response = self.client.get(f"{ruta.format(vista)}?{consulta}")
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('error', response.json())
+
+    def test_limite_se_acota_y_umbral_filtra(self):
+        inventario(5)
+        # la versión async de sugerencias consulta desde otros hilos, que no ven la
+        # transacción del test: el tope de limit se prueba en la síncrona
+        response = self.client.get('/inventario/sugerencias/?q=P1&limit=500')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['codigo'] for p in response.json()['productos']], ['P1'])
+        for ruta in self.RUTAS:
+            with self.subTest(ruta=ruta):
+                self.assertEqual(len(self.client.get(ruta.format('bajo_stock') + '?umbral=6').json()), 1)
+                self.assertEqual(self.client.get(ruta.format('bajo_stock') + '?umbral=5').json(), [])
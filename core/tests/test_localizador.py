@@ -0,0 +1,105 @@
+import random
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import localizador_service as ls
+
+
+def por_fuerza_bruta(puntos, latitud, longitud):
+    """(id, cuerda²) de todos los puntos con coordenadas, ordenados como recorrer()."""
+    q = ls.vector(latitud, longitud)
+    return sorted(((i, ls._distancia2(q, ls.vector(lat, lon))) for i, _, lat, lon in puntos if lat is not None),
+                  key=lambda x: (x[1], x[0]))
+
+
+class IndiceBodegasTests(SimpleTestCase):
+    def test_recorrido_igual_a_ordenar_todo(self):
+        rnd = random.Random(7)
+        puntos = [(i, f'B{i}', rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for i in range(300)]
+        puntos += [(300, 'polo', 90.0, 0.0), (301, 'antimeridiano', 0.0, 180.0), (302, 'gemela', 0.0, -180.0),
+                   (303, 'sin coordenadas', None, None), (304, 'repetida', *puntos[0][2:])]
+        indice = ls.IndiceBodegas(puntos)
+        self.assertEqual(len(indice), 304)
+        for latitud, longitud in [(4.6, -74.1), (89.9, 10), (0, 179.9), (-45, -60)] + \
+                [(rnd.uniform(-90, 90), rnd.uniform(-180, 180)) for _ in range(20)]:
+            with self.subTest(latitud=latitud, longitud=longitud):
+                esperado = por_fuerza_bruta(puntos, latitud, longitud)
+                obtenido = list(indice.recorrer(latitud, longitud))
+                self.assertEqual([i for i, _ in obtenido], [i for i, _ in esperado])
+                for (_, d1), (_, d2) in zip(obtenido, esperado):
+                    self.assertAlmostEqual(d1, d2, places=12)
+
+    def test_km_coincide_con_haversine(self):
+        for a, b in [((4.6, -74.1), (6.25, -75.56)), ((0, 179.9), (0, -179.9)), ((-33.9, 151.2), (51.5, -0.1))]:
+            cuerda2 = ls._distancia2(ls.vector(*a), ls.vector(*b))
+            self.assertAlmostEqual(ls.km(cuerda2), ls.haversine_km(*a, *b), places=6)
+
+    def test_sin_bodegas(self):
+        self.assertEqual(list(ls.IndiceBodegas([]).recorrer(0, 0)), [])
+
+
+class BodegasCercanasTests(TestCase):
+    def setUp(self):
+        cache.clear()  # versión nueva del espacio BODEGAS: el índice se reconstruye
+        rnd = random.Random(3)
+        self.producto = Producto.objects.create(codigo='P', codigo_barras='770', tipo='caja', peso=1, volumen=1)
+        self.bodegas = [Bodega.objects.create(codigo=f'B{i}', nombre=f'B{i}', ciudad='-', direccion='-',
+                                              capacidad=100, latitud=rnd.uniform(-5, 12), longitud=rnd.uniform(-80, -68))
+                        for i in range(60)]
+        self.stock = {}
+        for bodega in self.bodegas:
+            if rnd.random() < 0.4:
+                self.stock[bodega.id] = rnd.randint(0, 20)
+                Inventario.objects.create(producto=self.producto, bodega=bodega, cantidad_disponible=self.stock[bodega.id],
+                                          cantidad_reservada=0, ultima_actualizacion=now())
+
+    def _referencia(self, latitud, longitud, cantidad, k):
+        puntos = [(b.id, b.nombre, b.latitud, b.longitud) for b in self.bodegas]
+        nombres = {b.id: b.nombre for b in self.bodegas}
+        return [{'bodega_id': i, 'nombre': nombres[i], 'distancia_km': round(ls.km(d), 3), 'disponible': self.stock[i]}
+                for i, d in por_fuerza_bruta(puntos, latitud, longitud)
+                if self.stock.get(i, -1) >= cantidad][:k]
+
+    def test_igual_a_la_referencia(self):
+        # lotes chicos y tope bajo: se ejercitan la expansión por lotes y la lectura completa
+        for por_resultado, maximo in ((ls.CANDIDATOS_POR_RESULTADO, ls.MAXIMO_CANDIDATOS), (1, 4)):
+            with mock.patch.object(ls, 'CANDIDATOS_POR_RESULTADO', por_resultado), \
+                    mock.patch.object(ls, 'MAXIMO_CANDIDATOS', maximo):
+                for latitud, longitud in ((4.6, -74.1), (11, -70), (-4, -79)):
+                    for cantidad, k in ((1, 1), (1, 5), (10, 3), (18, 10), (21, 3)):
+                        with self.subTest(por_resultado=por_resultado, maximo=maximo, punto=(latitud, longitud),
+                                          cantidad=cantidad, k=k):
+                            self.assertEqual(ls.bodegas_cercanas(latitud, longitud, self.producto.id, cantidad, k),
+                                             self._referencia(latitud, longitud, cantidad, k))
+
+    def test_producto_escaso_lee_todo_el_stock_una_vez(self):
+        Inventario.objects.all().delete()
+        lejana = max(self.bodegas, key=lambda b: ls.haversine_km(4.6, -74.1, b.latitud, b.longitud))
+        Inventario.objects.create(producto=self.producto, bodega=lejana, cantidad_disponible=5,
+                                  cantidad_reservada=0, ultima_actualizacion=now())
+        ls.indice()
+        with mock.patch.object(ls, 'CANDIDATOS_POR_RESULTADO', 1), mock.patch.object(ls, 'MAXIMO_CANDIDATOS', 8):
+            # lotes de 1, 2, 4 y 8 candidatas, y al pasar el tope una lectura de todo el producto
+            with self.assertNumQueries(5):
+                resultado = ls.bodegas_cercanas(4.6, -74.1, self.producto.id, 1, 1)
+        self.assertEqual([r['bodega_id'] for r in resultado], [lejana.id])
+        self.assertEqual(ls.bodegas_cercanas(4.6, -74.1, self.producto.id, 6, 3), [])
+
+    def test_vista(self):
+        response = self.client.get('/api/bodegas/cercanas/', {'producto_id': self.producto.id, 'latitud': 4.6,
+                                                              'longitud': -74.1, 'k': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bodegas'], self._referencia(4.6, -74.1, 1, 2))
+        for parametros, error in (({'latitud': 4.6, 'longitud': -74.1}, 'producto_id is required'),
+                                  ({'producto_id': 'x', 'latitud': 4.6, 'longitud': -74.1}, 'producto_id must be an integer'),
+                                  ({'producto_id': 1, 'k': 51, 'latitud': 4.6, 'longitud': -74.1}, 'k must be <= 50'),
+                                  ({'producto_id': 1, 'latitud': 95, 'longitud': 0}, 'Coordenadas fuera de rango'),
+                                  ({'producto_id': 1}, 'Se requiere direccion_id o latitud y longitud')):
+            with self.subTest(parametros=parametros):
+                response = self.client.get('/api/bodegas/cercanas/', parametros)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['error'], error)
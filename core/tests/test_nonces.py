@@ -0,0 +1,58 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto
+from core.services import nonce_service
+from core.services.checks_service import ChecksService
+
+from .auth import firmado
+
+
+class MemoriaNoncesTests(SimpleTestCase):
+    def test_llena_rechaza_en_vez_de_olvidar_nonces_vigentes(self):
+        almacen = nonce_service.MemoriaNonces(maximo=2)
+        with mock.patch('time.monotonic', return_value=100.0):
+            self.assertIsNone(almacen.reservar('a', 10))
+            self.assertIsNone(almacen.reservar('b', 10))
+            self.assertEqual(almacen.reservar('c', 10), nonce_service.LLENO)
+            # 'a' sigue registrado: repetirla no se acepta como nueva
+            self.assertEqual(almacen.reservar('a', 10), nonce_service.EN_PROCESO)
+        with mock.patch('time.monotonic', return_value=111.0):
+            self.assertIsNone(almacen.reservar('c', 10))
+
+    def test_liberar_deja_lugar(self):
+        almacen = nonce_service.MemoriaNonces(maximo=1)
+        self.assertIsNone(almacen.reservar('a', 10))
+        almacen.liberar('a')
+        self.assertIsNone(almacen.reservar('b', 10))
+
+
+class AntiReplayTests(TestCase):
+    def setUp(self):
+        producto = Producto.objects.create(codigo_barras='770', tipo='caja', peso=1, volumen=1, codigo='P1')
+        bodega = Bodega.objects.create(codigo='B1', nombre='Bodega 1', ciudad='-', direccion='-', capacidad=100)
+        Inventario.objects.create(producto=producto, bodega=bodega, cantidad_disponible=10,
+                                  cantidad_reservada=0, ultima_actualizacion=now())
+        self.datos = {'bodega_id': str(bodega.id), 'cantidad': '1', 'producto_id': str(producto.id)}
+
+    def reservar(self, datos):
+        return self.client.post('/inventario/reservar/', datos)
+
+    def test_sin_nonce_se_acepta_por_defecto(self):
+        self.assertFalse(nonce_service.requerido())
+        datos = {**self.datos, 'hash': ChecksService.generar_hash_hmac(self.datos)}
+        self.assertEqual(self.reservar(datos).status_code, 200)
+
+    def test_nonce_repetido(self):
+        datos = firmado(self.datos)
+        self.assertEqual(self.reservar(datos).status_code, 200)
+        repetida = self.reservar({**datos, 'hash': '0' * 64})
+        self.assertEqual(repetida.status_code, 409)
+
+    def test_almacen_lleno_responde_503(self):
+        almacen = nonce_service.MemoriaNonces(maximo=1)
+        with mock.patch.object(nonce_service, 'almacen', return_value=almacen):
+            self.assertEqual(self.reservar(firmado(self.datos)).status_code, 200)
+            self.assertEqual(self.reservar(firmado(self.datos)).status_code, 503)
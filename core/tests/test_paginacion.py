@@ -0,0 +1,94 @@
+import json
+import re
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TestCase
+
+from core import pagination
+from core.models import Producto
+
+CAMPOS = ('id', 'codigo')
+
+
+def serializar(fila):
+    return {'id': fila['id'], 'codigo': fila['codigo']}
+
+
+class PaginarTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Producto.objects.bulk_create([Producto(codigo=f'P{i:02}', codigo_barras=f'770{i:04}', tipo='caja', peso=1,
+                                               volumen=1) for i in range(23)])
+        cls.ids = list(Producto.objects.order_by('id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def _paginar(self, url, **extra):
+        return pagination.paginar(self.factory.get(url, **extra), Producto.objects.all(), CAMPOS, serializar)
+
+    def _apaginar(self, url, **extra):
+        return async_to_sync(pagination.apaginar)(self.factory.get(url, **extra), Producto.objects.all(),
+                                                  CAMPOS, serializar)
+
+    def _recorrer(self, paginar, url):
+        """Ids de todas las páginas siguiendo el Link rel="next"; también el número de páginas."""
+        ids, paginas = [], 0
+        while url:
+            response = paginar(url)
+            self.assertEqual(response.status_code, 200)
+            pagina = json.loads(response.content)
+            ids += [fila['id'] for fila in pagina]
+            paginas += 1
+            enlace = response.get('Link')
+            if enlace is None:
+                self.assertNotIn('X-Next-Cursor', response)
+                break
+            url = re.fullmatch(r'<(.+)>; rel="next"', enlace).group(1)
+            self.assertIn(f"cursor={response['X-Next-Cursor']}", url)
+            self.assertEqual(response['X-Next-Cursor'], str(pagina[-1]['id']))
+        return ids, paginas
+
+    def test_recorre_todas_las_paginas_por_link(self):
+        for paginar in (self._paginar, self._apaginar):
+            with self.subTest(paginar=paginar.__name__):
+                self.assertEqual(self._recorrer(paginar, '/x/?limit=5&otro=1'), (self.ids, 5))
+                self.assertEqual(self._recorrer(paginar, '/x/?limit=23'), (self.ids, 1))
+                self.assertEqual(self._recorrer(paginar, f'/x/?limit=10&cursor={self.ids[17]}'),
+                                 (self.ids[18:], 1))
+
+    def test_limite_por_defecto_y_maximo(self):
+        with mock.patch.object(pagination, 'LIMITE_DEFECTO', 4), mock.patch.object(pagination, 'LIMITE_MAXIMO', 7):
+            self.assertEqual(len(json.loads(self._paginar('/x/').content)), 4)
+            response = self._paginar('/x/?limit=500')
+            self.assertEqual(len(json.loads(response.content)), 7)
+            self.assertIn('limit=7', response['Link'])
+
+    def test_parametros_invalidos(self):
+        for consulta in ('cursor=-1', 'cursor=abc', 'limit=0', 'limit=x'):
+            for paginar in (self._paginar, self._apaginar):
+                with self.subTest(consulta=consulta, paginar=paginar.__name__):
+                    response = paginar(f'/x/?{consulta}')
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('error', json.loads(response.content))
+
+    def test_ndjson_un_objeto_por_linea(self):
+        response = self._paginar('/x/?formato=ndjson')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], pagination.NDJSON)
+        lineas = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(linea)['id'] for linea in lineas], self.ids)  # sin tope de página
+
+        response = self._paginar(f'/x/?cursor={self.ids[2]}&limit=4', HTTP_ACCEPT=pagination.NDJSON)
+        self.assertEqual([json.loads(linea) for linea in b''.join(response.streaming_content).splitlines()],
+                         [{'id': i, 'codigo': f'P{n:02}'} for n, i in enumerate(self.ids) if 3 <= n < 7])
+
+    def test_ndjson_async(self):
+        response = self._apaginar(f'/x/?formato=ndjson&cursor={self.ids[20]}')
+
+        async def leer():
+            return [parte async for parte in response.streaming_content]
+
+        lineas = b''.join(async_to_sync(leer)()).splitlines()
+        self.assertEqual([json.loads(linea)['id'] for linea in lineas], self.ids[21:])
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.models import EstadoPedido, Pedido
+from core.services import pedido_service as ps
+
+
+class CambiarEstadoTests(TestCase):
+    # el grafo esperado, escrito aparte de TRANSICIONES para que un cambio en él se note
+    PERMITIDAS = {
+        (None, ps.CREADO),
+        (ps.CREADO, ps.ALISTAMIENTO), (ps.CREADO, ps.CANCELADO),
+        (ps.ALISTAMIENTO, ps.EMPACADO), (ps.ALISTAMIENTO, ps.CANCELADO),
+        (ps.EMPACADO, ps.DESPACHADO), (ps.EMPACADO, ps.CANCELADO),
+        (ps.DESPACHADO, ps.ENTREGADO),
+    }
+    # camino más corto desde un pedido sin historial hasta cada estado
+    CAMINOS = {
+        None: [],
+        ps.CREADO: [ps.CREADO],
+        ps.ALISTAMIENTO: [ps.CREADO, ps.ALISTAMIENTO],
+        ps.EMPACADO: [ps.CREADO, ps.ALISTAMIENTO, ps.EMPACADO],
+        ps.DESPACHADO: [ps.CREADO, ps.ALISTAMIENTO, ps.EMPACADO, ps.DESPACHADO],
+        ps.ENTREGADO: [ps.CREADO, ps.ALISTAMIENTO, ps.EMPACADO, ps.DESPACHADO, ps.ENTREGADO],
+        ps.CANCELADO: [ps.CREADO, ps.CANCELADO],
+    }
+
+    def _pedido_en(self, estado, momento):
+        pedido = Pedido.objects.create(precio_calculado=10)
+        for i, paso in enumerate(self.CAMINOS[estado]):
+            ps.cambiar_estado(pedido.id, paso, momento=momento + timedelta(minutes=i))
+        return pedido
+
+    def test_grafo_de_transiciones(self):
+        momento = now()
+        for actual in self.CAMINOS:
+            for estado in ps.ESTADOS:
+                with self.subTest(actual=actual, estado=estado):
+                    pedido = self._pedido_en(actual, momento)
+                    historial = pedido.historial.count()
+                    if (actual, estado) in self.PERMITIDAS:
+                        registro = ps.cambiar_estado(pedido.id, estado, momento=momento + timedelta(hours=1))
+                        self.assertEqual(registro.nombre, estado)
+                        self.assertEqual(pedido.historial.count(), historial + 1)
+                    else:
+                        with self.assertRaises(ps.TransicionInvalida):
+                            ps.cambiar_estado(pedido.id, estado, momento=momento + timedelta(hours=1))
+                        self.assertEqual(pedido.historial.count(), historial)
+
+    def test_estado_actual_sigue_al_historial(self):
+        pedido = Pedido.objects.create(precio_calculado=10)
+        momento = now()
+        for i, estado in enumerate(self.CAMINOS[ps.ENTREGADO]):
+            ps.cambiar_estado(pedido.id, estado, asignado='bodega', momento=momento + timedelta(minutes=i))
+            pedido.refresh_from_db()
+            ultimo = pedido.historial.order_by('-fecha_hora', '-id').first()
+            self.assertEqual((pedido.estado_actual, pedido.fecha_estado), (ultimo.nombre, ultimo.fecha_hora))
+        with self.assertRaises(ps.TransicionInvalida):
+            ps.cambiar_estado(pedido.id, ps.CANCELADO)
+        pedido.refresh_from_db()
+        self.assertEqual(pedido.estado_actual, ps.ENTREGADO)
+        self.assertEqual(ps.diferencias(), [])
+
+    def test_pedido_inexistente_o_estado_desconocido(self):
+        with self.assertRaises(Pedido.DoesNotExist):
+            ps.cambiar_estado(0, ps.CREADO)
+        pedido = Pedido.objects.create(precio_calculado=10)
+        with self.assertRaises(ps.TransicionInvalida):
+            ps.cambiar_estado(pedido.id, 'PERDIDO')
+        self.assertFalse(pedido.historial.exists())
+
+
+class EstadoPedidoAdminTests(TestCase):
+    def test_historial_de_solo_lectura(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+        pedido = Pedido.objects.create(precio_calculado=10)
+        registro = ps.cambiar_estado(pedido.id, ps.CREADO)
+        base = '/admin/core/estadopedido/'
+        self.assertEqual(self.client.get(base).status_code, 200)
+        self.assertEqual(self.client.get(f'{base}add/').status_code, 403)
+        self.assertEqual(self.client.get(f'{base}{registro.id}/delete/').status_code, 403)
+        self.assertEqual(self.client.post(f'{base}{registro.id}/change/', {
+            'nombre': ps.ENTREGADO, 'fecha_hora_0': '2020-01-01', 'fecha_hora_1': '00:00:00',
+            'asignado': 'admin', 'pedido': pedido.id,
+        }).status_code, 403)
+        self.assertEqual(list(EstadoPedido.objects.values_list('nombre', flat=True)), [ps.CREADO])
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+
+from .auth import TokensDePrueba
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_SERVER_TIMING=True)
+class ServerTimingTests(TokensDePrueba, TestCase):
+    def test_anonimo_sin_debug_no_recibe_el_header(self):
+        response = self.client.get('/health')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_staff_y_admin_lo_reciben(self):
+        self.client.force_login(User.objects.create_user('staff', password='clave', is_staff=True))
+        self.assertIn('Server-Timing', self.client.get('/health'))
+        self.client.logout()
+
+        self.client.force_login(User.objects.create_user('otro', password='clave'))
+        self.assertNotIn('Server-Timing', self.client.get('/health'))
+        self.client.logout()
+
+        response = self.client.get('/api/perfil/', **self.autorizacion('admin', ['ADMIN']))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+        self.assertIn('endpoints', response.json())
+
+    @override_settings(DEBUG=True)
+    def test_con_debug_lo_reciben_todos(self):
+        self.assertIn('Server-Timing', self.client.get('/health'))
+
+    def test_perfil_solo_para_admin(self):
+        self.assertEqual(self.client.get('/api/perfil/', **self.autorizacion('x')).status_code, 403)
+        self.assertEqual(self.client.delete('/api/perfil/', **self.autorizacion('admin', ['ADMIN'])).json(),
+                         {'reiniciado': True})
@@ -0,0 +1,37 @@
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.management.commands.verificar_planes import ESCANEO_COMPLETO, consultas_calientes, escaneos_completos
+from core.models import Bodega, Inventario, Producto
+
+
+class PlanesTests(TestCase):
+    def test_consultas_calientes_usan_indices(self):
+        if connection.vendor not in ESCANEO_COMPLETO:
+            self.skipTest(f"EXPLAIN de {connection.vendor} no soportado")
+        for nombre, qs in consultas_calientes().items():
+            with self.subTest(nombre):
+                plan = qs.explain()
+                self.assertEqual(escaneos_completos(plan), [], plan)
+
+    def test_detecta_un_recorrido_completo(self):
+        if connection.vendor not in ESCANEO_COMPLETO:
+            self.skipTest(f"EXPLAIN de {connection.vendor} no soportado")
+        plan = Inventario.objects.filter(cantidad_reservada=1).explain()  # columna sin índice
+        self.assertEqual(escaneos_completos(plan), [Inventario._meta.db_table])
+
+
+class InventarioUnicoTests(TestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(codigo_barras='770', tipo='caja', peso=1, volumen=1, codigo='P1')
+        self.bodega = Bodega.objects.create(codigo='B1', nombre='Bodega 1', ciudad='-', direccion='-', capacidad=100)
+
+    def crear(self):
+        return Inventario.objects.create(producto=self.producto, bodega=self.bodega, cantidad_disponible=1,
+                                         cantidad_reservada=0, ultima_actualizacion=now())
+
+    def test_una_fila_sin_ubicacion_por_bodega_y_producto(self):
+        self.crear()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.crear()
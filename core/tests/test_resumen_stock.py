@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core.models import Bodega, Inventario, Producto, ResumenStockBodega, ResumenStockProducto
+from core.services import bodega_services, resumen_stock_service
+from core.services.inventario_service import InventarioService
+
+
+class ResumenStockTests(TestCase):
+    def setUp(self):
+        self.bodegas = [Bodega.objects.create(codigo=f'B{i}', nombre=f'B{i}', ciudad='-', direccion='-',
+                                              capacidad=100) for i in range(2)]
+        self.productos = [Producto.objects.create(codigo_barras=f'77{i}', tipo='caja', peso=1, volumen=1,
+                                                  codigo=f'P{i}') for i in range(2)]
+
+    def _resumen(self, modelo, **filtro):
+        fila = modelo.objects.filter(**filtro).first()
+        return fila and (fila.total_disponible, fila.total_reservado, fila.registros, fila.stockouts)
+
+    def test_escrituras_del_orm_fuera_del_servicio(self):
+        # admin y scripts: save() y delete() directos, sin InventarioService
+        b0, b1 = self.bodegas
+        fila = Inventario.objects.create(producto=self.productos[0], bodega=b0, cantidad_disponible=10,
+                                         cantidad_reservada=2, ultima_actualizacion=now())
+        otra = Inventario.objects.create(producto=self.productos[1], bodega=b0, cantidad_disponible=0,
+                                         cantidad_reservada=0, ultima_actualizacion=now())
+        self.assertEqual(self._resumen(ResumenStockBodega, bodega=b0), (10, 2, 2, 1))
+
+        fila.cantidad_disponible = 4
+        fila.bodega = b1
+        fila.save()
+        self.assertEqual(self._resumen(ResumenStockBodega, bodega=b0), (0, 0, 1, 1))
+        self.assertEqual(self._resumen(ResumenStockBodega, bodega=b1), (4, 2, 1, 0))
+        self.assertEqual(self._resumen(ResumenStockProducto, producto=self.productos[0]), (4, 2, 1, 0))
+        self.assertEqual(resumen_stock_service.diferencias(), [])
+
+        Inventario.objects.filter(id=otra.id).delete()
+        self.assertEqual(self._resumen(ResumenStockBodega, bodega=b0), (0, 0, 0, 0))
+        self.assertEqual(resumen_stock_service.diferencias(), [])
+
+        b1.delete()  # el inventario se borra en cascada
+        self.assertIsNone(self._resumen(ResumenStockBodega, bodega_id=b1.id))
+        self.assertEqual(self._resumen(ResumenStockProducto, producto=self.productos[0]), (0, 0, 0, 0))
+        self.assertEqual(resumen_stock_service.diferencias(), [])
+
+    def test_escrituras_del_servicio_cuentan_una_vez(self):
+        b0, b1 = self.bodegas
+        fila = InventarioService.crear_inventario(self.productos[0].id, b0.id, cantidad_disponible=8)
+        InventarioService.crear_inventario(self.productos[0].id, b1.id, cantidad_disponible=5)
+        InventarioService.actualizar_inventario(fila.id, cantidad_disponible=6, cantidad_reservada=1)
+        InventarioService.reservar_producto(fila.id, 2)
+        self.assertEqual(self._resumen(ResumenStockBodega, bodega=b0), (4, 3, 1, 0))
+        self.assertEqual(self._resumen(ResumenStockProducto, producto=self.productos[0]), (9, 3, 2, 0))
+
+        InventarioService.eliminar_inventario(fila.id)
+        bodega_services.eliminar_bodega(b1.id)
+        self.assertEqual(self._resumen(ResumenStockProducto, producto=self.productos[0]), (0, 0, 0, 0))
+        self.assertEqual(resumen_stock_service.diferencias(), [])
+
+    def test_reconstruir_corrige_lo_que_no_pasa_por_las_senales(self):
+        fila = Inventario.objects.create(producto=self.productos[0], bodega=self.bodegas[0], cantidad_disponible=10,
+                                         cantidad_reservada=0, ultima_actualizacion=now())
+        Inventario.objects.filter(id=fila.id).update(cantidad_disponible=0)  # update() no dispara señales
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_resumen_stock', '--solo-verificar', stdout=StringIO(), stderr=StringIO())
+        call_command('reconstruir_resumen_stock', stdout=StringIO())
+        self.assertEqual(self._resumen(ResumenStockBodega, bodega=self.bodegas[0]), (0, 0, 1, 1))
+        self.assertEqual(resumen_stock_service.diferencias(), [])
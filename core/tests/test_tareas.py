@@ -0,0 +1,85 @@
+import json
+import threading
+from collections import Counter
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from core.models import Alistador, Bodega, TareaLogistica
+from core.services import tareas_service
+
+from .auth import TokensDePrueba
+
+
+def bodega(codigo='B1'):
+    return Bodega.objects.create(codigo=codigo, nombre=codigo, ciudad='-', direccion='-', capacidad=100)
+
+
+class ReclamoConcurrenteTests(TransactionTestCase):
+    HILOS = 8
+    TAREAS = 200
+
+    def test_cada_tarea_se_reclama_una_vez(self):
+        b = bodega()
+        alistadores = Alistador.objects.bulk_create(
+            [Alistador(nombre=f'A{i}', bodega_asignada=b) for i in range(self.HILOS)])
+        for i in range(self.TAREAS):
+            tareas_service.encolar(b.id, 'ALISTAMIENTO', prioridad=list(tareas_service.NIVELES)[i % 3])
+
+        reclamadas, errores = [], []
+        barrera = threading.Barrier(self.HILOS)
+
+        def trabajar(alistador_id):
+            try:
+                barrera.wait()
+                while (tarea := tareas_service.reclamar(b.id, 'alistador', alistador_id)) is not None:
+                    reclamadas.append((tarea.id, alistador_id))
+            except Exception as e:  # noqa: BLE001 - se revisa en el hilo del test
+                errores.append(e)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=trabajar, args=(a.id,)) for a in alistadores]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(errores, [])
+        veces = Counter(tarea_id for tarea_id, _ in reclamadas)
+        self.assertEqual(len(veces), self.TAREAS)
+        self.assertEqual(set(veces.values()), {1})
+        en_db = dict(TareaLogistica.objects.values_list('id', 'alistador_id'))
+        self.assertEqual(en_db, dict(reclamadas))
+        self.assertFalse(TareaLogistica.objects.exclude(estado=tareas_service.EN_PROCESO, reclamos=1).exists())
+
+
+class TareaViewsTests(TokensDePrueba, TestCase):
+    def setUp(self):
+        b = bodega()
+        self.alistador = Alistador.objects.create(nombre='Ana', bodega_asignada=b, cognito_sub='sub-ana')
+        self.otro = Alistador.objects.create(nombre='Otro', bodega_asignada=b, cognito_sub='sub-otro')
+        self.tarea = tareas_service.encolar(b.id, 'ALISTAMIENTO')
+
+    def post(self, ruta, sub, **body):
+        return self.client.post(ruta, json.dumps({'rol': 'alistador', **body}),
+                                content_type='application/json', **self.autorizacion(sub))
+
+    def test_reclama_a_nombre_del_dueno_del_token(self):
+        response = self.post('/api/tareas/reclamar/', 'sub-ana', trabajador_id=self.otro.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tarea']['id'], self.tarea.id)
+        self.tarea.refresh_from_db()
+        self.assertEqual(self.tarea.alistador_id, self.alistador.id)
+
+    def test_usuario_sin_trabajador_del_rol(self):
+        self.assertEqual(self.post('/api/tareas/reclamar/', 'sub-nadie').status_code, 403)
+        self.assertEqual(self.post('/api/tareas/reclamar/', 'sub-ana', rol='empacador').status_code, 403)
+
+    def test_no_cierra_tareas_de_otro(self):
+        self.post('/api/tareas/reclamar/', 'sub-ana')
+        ruta = f'/api/tarea/{self.tarea.id}/completar/'
+        self.assertEqual(self.post(ruta, 'sub-otro', trabajador_id=self.alistador.id).status_code, 409)
+        self.assertEqual(self.post(ruta, 'sub-ana').status_code, 200)
+        self.tarea.refresh_from_db()
+        self.assertEqual(self.tarea.estado, tareas_service.COMPLETADA)
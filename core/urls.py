@@ -1,5 +1,28 @@
-from django.urls import path
-from core.views import bodega_views, producto_views, inventario_views
+from django.urls import include, path
+from core.views import async_views, bodega_views, eventos_views, pedido_views, perfil_views, producto_views, inventario_views, tarea_views
+
+# Versiones async (ASGI) de las vistas de solo lectura; mismas respuestas que las síncronas
+async_urlpatterns = [
+    path('api/bodegas/', async_views.bodegas_data_api, name='async_bodegas_data_api'),
+    path('api/kpis/', async_views.kpis_api, name='async_kpis_api'),
+    path('api/mix-disponible-reservado/', async_views.mix_disponible_reservado_api, name='async_mix_disponible_reservado_api'),
+    path('api/aging/', async_views.aging_api, name='async_aging_api'),
+    path('api/top-skus/', async_views.top_skus_api, name='async_top_skus_api'),
+    path('api/tareas-estado/', async_views.tareas_estado_api, name='async_tareas_estado_api'),
+    path('api/dashboard/', async_views.dashboard_api, name='async_dashboard_api'),
+
+    path("inventario/detail/", async_views.inventario_detail, name="async_inventario_detail"),
+    path("inventario/bajo_stock/", async_views.inventario_bajo_stock, name="async_inventario_bajo_stock"),
+    path("inventario/por_bodega/", async_views.inventario_por_bodega, name="async_inventario_por_bodega"),
+    path("inventario/por_producto/", async_views.inventario_por_producto, name="async_inventario_por_producto"),
+    path("inventario/disponibilidad/", async_views.inventario_disponibilidad_producto, name="async_inventario_disponibilidad_producto"),
+    path("inventario/disponibilidad_bodega/", async_views.inventario_disponibilidad_bodega_producto, name="async_inventario_disponibilidad_bodega_producto"),
+    path("inventario/total_stock/", async_views.inventario_total_stock, name="async_inventario_total_stock"),
+    path("inventario/buscar/", async_views.inventario_buscar, name="async_inventario_buscar"),
+    path("inventario/sugerencias/", async_views.inventario_sugerencias, name="async_inventario_sugerencias"),
+    path("inventario/contar/", async_views.inventario_contar, name="async_inventario_contar"),
+    path("inventario/contar_bodega/", async_views.inventario_contar_bodega, name="async_inventario_contar_bodega"),
+]
 
 urlpatterns = [
     # Vistas HTML
@@ -8,6 +31,7 @@ urlpatterns = [
 
     # APIs existentes
     path('api/bodegas/', bodega_views.bodegas_data_api, name='bodegas_data_api'),
+    path('api/bodegas/cercanas/', bodega_views.bodegas_cercanas_api, name='bodegas_cercanas_api'),
 
     # APIs nuevas para el dashboard
     path('api/kpis/', bodega_views.kpis_api, name='kpis_api'),
@@ -15,14 +39,33 @@ urlpatterns = [
     path('api/aging/', bodega_views.aging_api, name='aging_api'),
     path('api/top-skus/', bodega_views.top_skus_api, name='top_skus_api'),
     path('api/tareas-estado/', bodega_views.tareas_estado_api, name='tareas_estado_api'),
+    path('api/dashboard/', bodega_views.dashboard_api, name='dashboard_api'),
+
+    # Cambios de stock en vivo (Server-Sent Events, requiere ASGI)
+    path('api/eventos/stock/', eventos_views.stock_eventos, name='stock_eventos'),
+
+    # Perfilado de endpoints (solo ADMIN)
+    path('api/perfil/', perfil_views.perfil_api, name='perfil_api'),
 
     # Endpoints CRUD para Producto
     path('api/productos/', producto_views.productos_list_create_api, name='productos_list_create_api'),
     path('api/producto/<int:producto_id>/', producto_views.producto_detail_api, name='producto_detail_api'),
+
+    # Pedidos por estado (estado_actual denormalizado) y cambios de estado
+    path('api/pedidos/', pedido_views.pedidos_api, name='pedidos_api'),
+    path('api/pedidos/estados/', pedido_views.pedidos_estados_api, name='pedidos_estados_api'),
+    path('api/pedido/<int:pedido_id>/estado/', pedido_views.pedido_estado_api, name='pedido_estado_api'),
+
+    # Cola de tareas logísticas por bodega: reclamar la siguiente, renovar el lease, cerrar
+    path('api/tareas/reclamar/', tarea_views.tarea_reclamar_api, name='tarea_reclamar_api'),
+    path('api/tarea/<int:tarea_id>/renovar/', tarea_views.tarea_renovar_api, name='tarea_renovar_api'),
+    path('api/tarea/<int:tarea_id>/completar/', tarea_views.tarea_completar_api, name='tarea_completar_api'),
+    path('api/tarea/<int:tarea_id>/soltar/', tarea_views.tarea_soltar_api, name='tarea_soltar_api'),
     
     #------ Endpoints Inventario------
     path("inventario/", inventario_views.inventario_list, name="inventario_list"),
     path("inventario/create/", inventario_views.inventario_create, name="inventario_create"),
+    path("inventario/importar/", inventario_views.inventario_importar, name="inventario_importar"),
 
     # Detail + update + delete
     path("inventario/detail/", inventario_views.inventario_detail, name="inventario_detail"),
@@ -31,6 +74,9 @@ urlpatterns = [
 
     # Reservation operations
     path("inventario/reservar/", inventario_views.inventario_reservar, name="inventario_reservar"),
+    path("inventario/reservar_lote/", inventario_views.inventario_reservar_lote, name="inventario_reservar_lote"),
+    path("inventario/asignacion/", inventario_views.inventario_asignacion, name="inventario_asignacion"),
+    path("inventario/asignar/", inventario_views.inventario_asignar, name="inventario_asignar"),
     path("inventario/liberar/", inventario_views.inventario_liberar_reserva, name="inventario_liberar_reserva"),
     path("inventario/confirmar/", inventario_views.inventario_confirmar_reserva, name="inventario_confirmar_reserva"),
 
@@ -42,8 +88,11 @@ urlpatterns = [
     path("inventario/disponibilidad_bodega/", inventario_views.inventario_disponibilidad_bodega_producto, name="inventario_disponibilidad_bodega_producto"),
     path("inventario/total_stock/", inventario_views.inventario_total_stock, name="inventario_total_stock"),
     path("inventario/buscar/", inventario_views.inventario_buscar, name="inventario_buscar"),
+    path("inventario/sugerencias/", inventario_views.inventario_sugerencias, name="inventario_sugerencias"),
 
     # Counts
     path("inventario/contar/", inventario_views.inventario_contar, name="inventario_contar"),
-    path("inventario/contar_bodega/", inventario_views.inventario_contar_bodega, name="inventario_contar_bodega")
+    path("inventario/contar_bodega/", inventario_views.inventario_contar_bodega, name="inventario_contar_bodega"),
+
+    path("async/", include(async_urlpatterns)),
     ]
\ No newline at end of file
@@ -0,0 +1,289 @@
+# core/views/async_views.py
+#
+# Versiones async de las vistas de solo lectura de inventario y del dashboard, montadas
+# bajo /async/ (core/urls.py). Responden lo mismo que las síncronas. Bajo ASGI no pasan
+# por el adaptador sync -> async de Django ni ocupan un hilo del servidor: solo las
+# consultas van a un hilo (el ORM async de Django aún las ejecuta de forma síncrona).
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from core.decorators import cache_dashboard
+from core.models import Bodega
+from core.pagination import apaginar, entero
+from core.services import busqueda_service, dashboard_service
+from core.services.cache_service import DIA, INVENTARIO, PRODUCTOS, TAREAS
+from core.services.inventario_service import InventarioService
+
+
+@lru_cache(maxsize=None)
+def _hilos_db():
+    # propio y no el executor por defecto del loop (min(32, CPUs + 4) hilos, compartido)
+    return ThreadPoolExecutor(max_workers=getattr(settings, 'ASYNC_DB_THREADS', 16),
+                              thread_name_prefix='async-db')
+
+
+def _en_paralelo(funcion, *args):
+    """Corre `funcion` (ORM síncrono) en un hilo de _hilos_db(), con su propia conexión.
+
+    El ORM async (aaggregate, acount...) ejecuta las consultas de una petición en un único
+    hilo, así que asyncio.gather sobre ellas las serializa; así cada parte usa su hilo y
+    las consultas independientes corren a la vez.
+    """
+    def ejecutar():
+        close_old_connections()
+        return funcion(*args)
+    return sync_to_async(ejecutar, thread_sensitive=False, executor=_hilos_db())()
+
+
+# -----------------------------
+# Inventario (lectura)
+# -----------------------------
+
+@require_http_methods(["GET"])
+async def inventario_detail(request):
+    """Get inventory details"""
+    try:
+        inventario = await InventarioService.aobtener_inventario(request.GET.get('id'))
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=404)
+    return JsonResponse({
+        'id': inventario.id,
+        'producto_id': inventario.producto_id,
+        'bodega_id': inventario.bodega_id,
+        'ubicacion_id': inventario.ubicacion_id,
+        'cantidad_disponible': inventario.cantidad_disponible,
+        'cantidad_reservada': inventario.cantidad_reservada,
+    })
+
+@require_http_methods(["GET"])
+async def inventario_bajo_stock(request):
+    """Get inventory with low stock (cursor-paginated, see core.pagination)"""
+    try:
+        umbral = entero(request, 'umbral', 10, 0)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return await apaginar(
+        request, InventarioService.obtener_inventario_bajo(umbral),
+        ('id', 'producto__codigo', 'bodega__nombre', 'cantidad_disponible'),
+        lambda inv: {
+            'id': inv['id'],
+            'producto': inv['producto__codigo'],
+            'bodega': inv['bodega__nombre'],
+            'cantidad_disponible': inv['cantidad_disponible']
+        }
+    )
+
+@require_http_methods(["GET"])
+async def inventario_por_bodega(request):
+    """Get all inventory for a bodega (cursor-paginated, see core.pagination)"""
+    return await apaginar(
+        request, InventarioService.obtener_inventario_por_bodega(request.GET.get('bodega_id')),
+        ('id', 'producto__codigo', 'cantidad_disponible', 'cantidad_reservada'),
+        lambda inv: {
+            'id': inv['id'],
+            'producto': inv['producto__codigo'],
+            'disponible': inv['cantidad_disponible'],
+            'reservado': inv['cantidad_reservada']
+        }
+    )
+
+@require_http_methods(["GET"])
+async def inventario_por_producto(request):
+    """Get all inventory locations for a product (cursor-paginated, see core.pagination)"""
+    return await apaginar(
+        request, InventarioService.obtener_inventario_por_producto(request.GET.get('producto_id')),
+        ('id', 'bodega__nombre', 'cantidad_disponible', 'cantidad_reservada', 'ubicacion__codigo'),
+        lambda inv: {
+            'id': inv['id'],
+            'bodega': inv['bodega__nombre'],
+            'disponible': inv['cantidad_disponible'],
+            'reservado': inv['cantidad_reservada'],
+            'ubicacion': inv['ubicacion__codigo'] or 'N/A'
+        }
+    )
+
+@require_http_methods(["GET"])
+async def inventario_disponibilidad_producto(request):
+    """Get total available quantity for a product across all bodegas"""
+    producto_id = request.GET.get('producto_id')
+    total = await InventarioService.aobtener_disponibilidad_producto(producto_id)
+    return JsonResponse({'producto_id': producto_id, 'total_disponible': total})
+
+@require_http_methods(["GET"])
+async def inventario_disponibilidad_bodega_producto(request):
+    """Get available quantity for a product in a specific bodega"""
+    producto_id = request.GET.get('producto_id')
+    bodega_id = request.GET.get('bodega_id')
+    disponible = await InventarioService.aobtener_disponibilidad_producto_bodega(producto_id, bodega_id)
+    return JsonResponse({
+        'producto_id': producto_id,
+        'bodega_id': bodega_id,
+        'disponible': disponible
+    })
+
+@require_http_methods(["GET"])
+async def inventario_total_stock(request):
+    """Get total stock (available + reserved) optionally filtered by bodega"""
+    return JsonResponse(await InventarioService.aobtener_total_stock(request.GET.get('bodega_id')))
+
+@require_http_methods(["GET"])
+async def inventario_buscar(request):
+    """Search inventory by product code and/or bodega name (cursor-paginated, see core.pagination)"""
+    # resolver el texto contra el índice de búsqueda consulta la base: va en un hilo
+    inventarios = await sync_to_async(InventarioService.buscar_inventario)(
+        request.GET.get('producto_codigo'), request.GET.get('bodega_nombre'))
+    return await apaginar(
+        request, inventarios,
+        ('id', 'producto__codigo', 'bodega__nombre', 'cantidad_disponible', 'cantidad_reservada'),
+        lambda inv: {
+            'id': inv['id'],
+            'producto': inv['producto__codigo'],
+            'bodega': inv['bodega__nombre'],
+            'disponible': inv['cantidad_disponible'],
+            'reservado': inv['cantidad_reservada']
+        }
+    )
+
+@require_http_methods(["GET"])
+async def inventario_sugerencias(request):
+    """Ranked product and bodega matches for the search box (?q=, ?limit=)"""
+    texto = (request.GET.get('q') or '').strip()
+    try:
+        limite = min(entero(request, 'limit', 10, 1), 50)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not texto:
+        return JsonResponse({'productos': [], 'bodegas': []})
+    productos, bodegas = await asyncio.gather(
+        _en_paralelo(busqueda_service.buscar_productos, texto, limite),
+        _en_paralelo(busqueda_service.buscar_bodegas, texto, limite),
+    )
+    return JsonResponse({
+        'productos': [{'id': p.id, 'codigo': p.codigo, 'codigo_barras': p.codigo_barras} for p in productos],
+        'bodegas': [{'id': b.id, 'nombre': b.nombre} for b in bodegas],
+    })
+
+@require_http_methods(["GET"])
+async def inventario_contar(request):
+    """Count total inventory records"""
+    return JsonResponse({'total_inventarios': await InventarioService.acontar_inventarios()})
+
+@require_http_methods(["GET"])
+async def inventario_contar_bodega(request):
+    """Count inventory records for a specific bodega"""
+    bodega_id = request.GET.get('bodega_id')
+    total = await InventarioService.acontar_inventarios_por_bodega(bodega_id)
+    return JsonResponse({'bodega_id': bodega_id, 'total_inventarios': total})
+
+
+# -----------------------------
+# Dashboard
+# -----------------------------
+
+def _bodega_json(b):
+    capacidad = float(b.capacidad) if b.capacidad else 0.0
+    ocupacion_pct = ((b.disp + b.res) / capacidad) * 100.0 if capacidad > 0 else 0.0
+    return {
+        'latitud': b.latitud,
+        'longitud': b.longitud,
+        'nombre': b.nombre,
+        'direccion': b.direccion,
+        'capacidad': capacidad,
+        'total_disponible': b.disp,
+        'total_reservado': b.res,
+        'ocupacion_pct': round(ocupacion_pct, 2),
+    }
+
+
+async def bodegas_data_api(request):
+    """Datos de bodegas para el mapa (una sola consulta agrupada)."""
+    return JsonResponse({
+        b.id: _bodega_json(b)
+        async for b in dashboard_service.totales_por_bodega(request.GET.get('bodega_id'))
+    })
+
+
+def _kpis_json(kpis, bodega):
+    return {
+        "total_warehouses": kpis["total_warehouses"],
+        "overall_occupancy_pct": kpis["overall_occupancy_pct"],
+        "sku_count": kpis["sku_count"],
+        "stockout_skus": kpis["stockout_skus"],
+        "filtered_bodega_id": bodega.id if bodega else None,
+        "filtered_bodega_nombre": bodega.nombre if bodega else None,
+    }
+
+
+@cache_dashboard(INVENTARIO)
+async def kpis_api(request):
+    """KPIs globales o filtrados por ?bodega_id="""
+    bodega_id = request.GET.get('bodega_id')
+    bodega = await Bodega.objects.filter(id=bodega_id).afirst() if bodega_id else None
+    return JsonResponse(_kpis_json(await dashboard_service.acalcular_kpis(bodega), bodega))
+
+
+def _mix_json(bodegas):
+    return {
+        "labels": [b.nombre for b in bodegas],
+        "disponible": [b.disp for b in bodegas],
+        "reservado": [b.res for b in bodegas],
+    }
+
+
+@cache_dashboard(INVENTARIO)
+async def mix_disponible_reservado_api(request):
+    bodegas = [b async for b in dashboard_service.totales_por_bodega(request.GET.get('bodega_id'))]
+    return JsonResponse(_mix_json(bodegas))
+
+
+@cache_dashboard(INVENTARIO, DIA)
+async def aging_api(request):
+    """Aging de inventario; los límites de los buckets se pueden cambiar con ?limites=30,60,90"""
+    try:
+        limites = dashboard_service.parsear_limites_aging(request.GET.get('limites'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    data = await dashboard_service.acalcular_aging(request.GET.get('bodega_id'), limites)
+    return JsonResponse({"labels": dashboard_service.etiquetas_aging(limites), "data": data})
+
+
+@cache_dashboard(INVENTARIO, PRODUCTOS)
+async def top_skus_api(request):
+    filas = [x async for x in dashboard_service.top_skus(request.GET.get('bodega_id'))]
+    return JsonResponse({"labels": [x['nombre'] for x in filas], "data": [x['total'] for x in filas]})
+
+
+@cache_dashboard(TAREAS)
+async def tareas_estado_api(request):
+    filas = [x async for x in dashboard_service.tareas_por_estado(request.GET.get('bodega_id'))]
+    return JsonResponse({"labels": [x['estado'] for x in filas], "data": [x['total'] for x in filas]})
+
+
+@cache_dashboard(INVENTARIO, PRODUCTOS, TAREAS, DIA)
+async def dashboard_api(request):
+    """Todas las secciones del dashboard en una respuesta (la misma que /api/dashboard/).
+    Sus consultas son independientes, así que corren a la vez (ver _en_paralelo)."""
+    bodega_id = request.GET.get('bodega_id')
+    try:
+        limites = dashboard_service.parsear_limites_aging(request.GET.get('limites'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    bodegas, aging, ranking, tareas = await asyncio.gather(
+        _en_paralelo(lambda: list(dashboard_service.totales_por_bodega(bodega_id))),
+        _en_paralelo(dashboard_service.calcular_aging, bodega_id, limites),
+        _en_paralelo(lambda: list(dashboard_service.ranking_skus(bodega_id))),
+        _en_paralelo(lambda: list(dashboard_service.tareas_por_estado(bodega_id))),
+    )
+    if bodega_id and not bodegas:
+        return JsonResponse({"error": "Bodega no encontrada"}, status=404)
+    return JsonResponse(dashboard_service.armar_dashboard(
+        bodegas, aging, ranking, tareas, limites, filtrada=bool(bodega_id)))
@@ -1,12 +1,13 @@
 # core/views/bodega_views.py
 
-import json
 from django.http import JsonResponse
 from django.shortcuts import render
-from django.db.models import Sum, Count, F, Avg, Q
-from django.utils.timezone import now
 
-from core.models import Bodega, Inventario, TareaLogistica
+from core.models import Bodega, Direccion
+from core.decorators import cache_dashboard
+from core.pagination import entero
+from core.services import dashboard_service, localizador_service
+from core.services.cache_service import DIA, INVENTARIO, PRODUCTOS, TAREAS
 
 # -----------------------------
 # VISTAS HTML
@@ -20,7 +21,7 @@ def mapa_bodegas_view(request):
 
 def dashboard_bodegas_view(request):
     """
-    Renderiza la página del dashboard. El HTML usa endpoints /api/... para gráficos.
+    Renderiza la página del dashboard. El HTML carga todo con fetch('/api/dashboard/').
     """
     return render(request, "dashboard_bodegas.html")
 
@@ -29,23 +30,13 @@ def dashboard_bodegas_view(request):
 # -----------------------------
 
 def bodegas_data_api(request):
-    """Devuelve datos de bodegas para el mapa."""
+    """Devuelve datos de bodegas para el mapa (una sola consulta agrupada)."""
     bodega_id = request.GET.get('bodega_id')
-    qs = Bodega.objects.all()
-    if bodega_id:
-        qs = qs.filter(id=bodega_id)
     data = {}
-    for b in qs:
-        invs = Inventario.objects.filter(bodega=b)  # Changed from bodegas=b
-        agg = invs.aggregate(
-            disp=Sum('cantidad_disponible'),
-            res=Sum('cantidad_reservada'),
-        )
-        disp = agg['disp'] or 0
-        res = agg['res'] or 0
+    for b in dashboard_service.totales_por_bodega(bodega_id):
         capacidad = float(b.capacidad) if b.capacidad else 0.0
         if capacidad > 0:
-            ocupacion_pct = ((disp + res) / capacidad) * 100.0
+            ocupacion_pct = ((b.disp + b.res) / capacidad) * 100.0
         else:
             ocupacion_pct = 0.0
         data[b.id] = {
@@ -54,12 +45,13 @@ def bodegas_data_api(request):
             'nombre': b.nombre,
             'direccion': b.direccion,
             'capacidad': capacidad,
-            'total_disponible': disp,
-            'total_reservado': res,
+            'total_disponible': b.disp,
+            'total_reservado': b.res,
             'ocupacion_pct': round(ocupacion_pct, 2),
         }
     return JsonResponse(data)
 
+@cache_dashboard(INVENTARIO)
 def kpis_api(request):
     """KPIs globales o filtrados por ?bodega_id="""
     bodega_id = request.GET.get('bodega_id')
@@ -67,101 +59,96 @@ def kpis_api(request):
     if bodega_id:
         bodega = Bodega.objects.filter(id=bodega_id).first()
 
-    if bodega:
-        inv_qs = Inventario.objects.filter(bodega=bodega)  # Changed from bodegas=bodega
-        total_warehouses = 1
-        sku_count = inv_qs.values('producto').distinct().count()  # Changed from productos
-        stockout_skus = inv_qs.filter(cantidad_disponible=0).count()
-        total_disponible = inv_qs.aggregate(total=Sum('cantidad_disponible'))['total'] or 0
-        total_reservado = inv_qs.aggregate(total=Sum('cantidad_reservada'))['total'] or 0
-        total_capacity = bodega.capacidad or 1
-    else:
-        inv_qs = Inventario.objects.all()
-        total_warehouses = Bodega.objects.count()
-        sku_count = inv_qs.values('producto').distinct().count()  # Changed from productos
-        stockout_skus = inv_qs.filter(cantidad_disponible=0).count()
-        total_disponible = inv_qs.aggregate(total=Sum('cantidad_disponible'))['total'] or 0
-        total_reservado = inv_qs.aggregate(total=Sum('cantidad_reservada'))['total'] or 0
-        total_capacity = Bodega.objects.aggregate(cap=Sum('capacidad'))['cap'] or 1
-
-    occupancy = round(((total_disponible + total_reservado) / float(total_capacity)) * 100, 2)
+    kpis = dashboard_service.calcular_kpis(bodega)
     return JsonResponse({
-        "total_warehouses": total_warehouses,
-        "overall_occupancy_pct": occupancy,
-        "sku_count": sku_count,
-        "stockout_skus": stockout_skus,
+        "total_warehouses": kpis["total_warehouses"],
+        "overall_occupancy_pct": kpis["overall_occupancy_pct"],
+        "sku_count": kpis["sku_count"],
+        "stockout_skus": kpis["stockout_skus"],
         "filtered_bodega_id": bodega.id if bodega else None,
         "filtered_bodega_nombre": bodega.nombre if bodega else None,
     })
 
+@cache_dashboard(INVENTARIO)
 def mix_disponible_reservado_api(request):
     bodega_id = request.GET.get('bodega_id')
     labels, disponible, reservado = [], [], []
-    if bodega_id:
-        b = Bodega.objects.filter(id=bodega_id).first()
-        if not b:
-            return JsonResponse({"labels": [], "disponible": [], "reservado": []})
-        invs = Inventario.objects.filter(bodega=b)  # Changed from bodegas=b
-        disp = invs.aggregate(total=Sum('cantidad_disponible'))['total'] or 0
-        res = invs.aggregate(total=Sum('cantidad_reservada'))['total'] or 0
+    for b in dashboard_service.totales_por_bodega(bodega_id):
         labels.append(b.nombre)
-        disponible.append(disp)
-        reservado.append(res)
-    else:
-        for b in Bodega.objects.all():
-            labels.append(b.nombre)
-            invs = Inventario.objects.filter(bodega=b)  # Changed from bodegas=b
-            disp = invs.aggregate(total=Sum('cantidad_disponible'))['total'] or 0
-            res = invs.aggregate(total=Sum('cantidad_reservada'))['total'] or 0
-            disponible.append(disp)
-            reservado.append(res)
+        disponible.append(b.disp)
+        reservado.append(b.res)
     return JsonResponse({"labels": labels, "disponible": disponible, "reservado": reservado})
 
+@cache_dashboard(INVENTARIO, DIA)
 def aging_api(request):
+    """Aging de inventario; los límites de los buckets se pueden cambiar con ?limites=30,60,90"""
     bodega_id = request.GET.get('bodega_id')
-    hoy = now()
-    buckets = {"0-30": 0, "31-60": 0, "61-90": 0, ">90": 0}
-    invs = Inventario.objects.all()
-    if bodega_id:
-        invs = invs.filter(bodega_id=bodega_id)  # Changed from bodegas_id
-    for inv in invs:
-        if not inv.ultima_actualizacion:
-            continue
-        dias = (hoy - inv.ultima_actualizacion).days
-        qty = inv.cantidad_disponible or 0
-        if dias <= 30: buckets["0-30"] += qty
-        elif dias <= 60: buckets["31-60"] += qty
-        elif dias <= 90: buckets["61-90"] += qty
-        else: buckets[">90"] += qty
-    return JsonResponse({"labels": list(buckets.keys()), "data": list(buckets.values())})
+    try:
+        limites = dashboard_service.parsear_limites_aging(request.GET.get('limites'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    data = dashboard_service.calcular_aging(bodega_id, limites)
+    return JsonResponse({"labels": dashboard_service.etiquetas_aging(limites), "data": data})
 
+@cache_dashboard(INVENTARIO, PRODUCTOS)
 def top_skus_api(request):
-    bodega_id = request.GET.get('bodega_id')
-    qs_base = Inventario.objects.all()
-    if bodega_id:
-        qs_base = qs_base.filter(bodega_id=bodega_id)  # Changed from bodegas_id
-    qs = (qs_base
-          .values(nombre=F('producto__codigo'))  # Changed from productos__codigo
-          .annotate(total=Sum('cantidad_disponible'))
-          .order_by('-total')[:5])
+    qs = dashboard_service.top_skus(request.GET.get('bodega_id'))
     labels = [x['nombre'] for x in qs]
     data = [x['total'] for x in qs]
     return JsonResponse({"labels": labels, "data": data})
 
+@cache_dashboard(TAREAS)
 def tareas_estado_api(request):
-    bodega_id = request.GET.get('bodega_id')
-    qs_tasks = TareaLogistica.objects.all()
-    if bodega_id:
-        qs_tasks = qs_tasks.filter(
-            Q(alistador__bodega_asignada_id=bodega_id) |
-            Q(verificador__bodega_asignada_id=bodega_id) |
-            Q(empacador__bodega_asignada_id=bodega_id) |
-            Q(administrador__bodega_asignada_id=bodega_id)
-        )
-    qs = (qs_tasks
-          .values('estado')
-          .annotate(total=Count('id', distinct=True))
-          .order_by())
+    qs = dashboard_service.tareas_por_estado(request.GET.get('bodega_id'))
     labels = [x['estado'] for x in qs]
     data = [x['total'] for x in qs]
-    return JsonResponse({"labels": labels, "data": data})
\ No newline at end of file
+    return JsonResponse({"labels": labels, "data": data})
+
+@cache_dashboard(INVENTARIO, PRODUCTOS, TAREAS, DIA)
+def dashboard_api(request):
+    """Todas las secciones del dashboard (kpis, mix, aging, top_skus, tareas) en una
+    respuesta (ver dashboard_service.datos_dashboard). Acepta ?bodega_id= y ?limites="""
+    try:
+        limites = dashboard_service.parsear_limites_aging(request.GET.get('limites'))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    data = dashboard_service.datos_dashboard(request.GET.get('bodega_id'), limites)
+    if data is None:
+        return JsonResponse({"error": "Bodega no encontrada"}, status=404)
+    return JsonResponse(data)
+
+
+def bodegas_cercanas_api(request):
+    """Las k bodegas más cercanas a un punto con stock suficiente de un producto
+    (ver localizador_service.bodegas_cercanas).
+
+    ?producto_id= y ?cantidad= (1 por defecto), ?k= (3 por defecto) y el punto como
+    ?direccion_id= (una Direccion con coordenadas) o ?latitud=&longitud=
+    """
+    try:
+        producto_id = entero(request, 'producto_id', requerido=True)
+        cantidad = entero(request, 'cantidad', 1)
+        k = entero(request, 'k', 3, maximo=localizador_service.MAXIMO_RESULTADOS)
+        if request.GET.get('direccion_id'):
+            direccion = Direccion.objects.filter(id=entero(request, 'direccion_id')).values('latitud', 'longitud').first()
+            if direccion is None:
+                return JsonResponse({"error": "Direccion no encontrada"}, status=404)
+            latitud, longitud = direccion['latitud'], direccion['longitud']
+            if latitud is None or longitud is None:
+                raise ValueError("La direccion no tiene coordenadas")
+        else:
+            latitud, longitud = float(request.GET['latitud']), float(request.GET['longitud'])
+            if not (-90 <= latitud <= 90 and -180 <= longitud <= 180):
+                raise ValueError("Coordenadas fuera de rango")
+    except KeyError:
+        return JsonResponse({"error": "Se requiere direccion_id o latitud y longitud"}, status=400)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    bodegas = localizador_service.bodegas_cercanas(latitud, longitud, producto_id, cantidad, k)
+    return JsonResponse({
+        "producto_id": producto_id,
+        "cantidad": cantidad,
+        "latitud": latitud,
+        "longitud": longitud,
+        "bodegas": bodegas,
+    })
@@ -0,0 +1,47 @@
+# core/views/eventos_views.py
+#
+# Flujo de eventos (Server-Sent Events) con los cambios de stock por bodega. Los publica
+# InventarioService al confirmar cada escritura (core.services.eventos_service); el mapa y
+# el dashboard aplican los deltas sobre lo que ya cargaron en vez de volver a pedirlo.
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_http_methods
+
+from core.services import eventos_service
+
+
+@require_http_methods(["GET"])
+async def stock_eventos(request):
+    """Deltas de stock (?bodega_id= para una sola bodega) como text/event-stream.
+
+    Cada evento `stock` trae bodega_id y los deltas de disponible, reservado, registros y
+    stockouts; `resync` indica que se perdieron eventos y hay que releer los totales.
+    Solo bajo ASGI: con WSGI la conexión ocuparía un hilo del servidor para siempre.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'El flujo de eventos requiere un servidor ASGI'}, status=501)
+    try:
+        bodega_id = int(request.GET['bodega_id']) if request.GET.get('bodega_id') else None
+    except ValueError:
+        return JsonResponse({'error': 'bodega_id debe ser un entero'}, status=400)
+
+    async def flujo():
+        broker = eventos_service.broker()
+        suscripcion = broker.suscribir(bodega_id)
+        try:
+            yield ': conectado\n\n'
+            while True:
+                eventos = await suscripcion.recibir(eventos_service.latido())
+                if not eventos:
+                    yield ': latido\n\n'
+                for evento in eventos:
+                    yield eventos_service.formatear(*evento)
+        finally:
+            # el cliente se desconectó (Django cancela el flujo) o el servidor se detiene
+            broker.cancelar(suscripcion)
+
+    response = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # sin buffer en nginx
+    return response
@@ -1,10 +1,16 @@
 from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import render
+import csv
+import io
 import json
-from core.services.inventario_service import InventarioService
+from core.decorators import anti_replay, idempotency_key, require_auth
+from core.services.inventario_service import InventarioService, StockInsuficiente
 from core.services.checks_service import ChecksService
-from core.models import Bodega, Producto, Ubicacion, Inventario
+from core.models import Bodega, Producto, Ubicacion, Inventario, Pedido
+from core.pagination import entero, paginar
+from core.services import asignacion_service, busqueda_service, importacion_service, nonce_service
 
 @require_http_methods(["GET"])
 def inventario_list(request):
@@ -23,6 +29,8 @@ def inventario_list(request):
     return render(request, "inventario_template.html", context)
 
 @require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
 def inventario_create(request):
     """Create a new inventory record with integrity check"""
     try:
@@ -39,12 +47,9 @@ def inventario_create(request):
             'ubicacion_id': request.POST.get('ubicacion_id'),
             'cantidad_disponible': request.POST.get('cantidad_disponible', '0'),
             'cantidad_reservada': request.POST.get('cantidad_reservada', '0'),
+            **nonce_service.campos_firmados(request),
         }
         
-        print("HASH REC:", hash_recibido)
-        print("EXPECTED:", ChecksService.generar_hash_hmac(data_to_verify))
-        print("DATA:", data_to_verify)
-        
         # Verify integrity
         if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
             return JsonResponse({'success': False, 'error': 'Hash verification failed - Data integrity compromised'}, status=400)
@@ -64,6 +69,38 @@ def inventario_create(request):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+@require_auth(required_role='ADMIN')
+def inventario_importar(request):
+    """
+    Bulk upsert of inventory from an uploaded CSV/NDJSON file (multipart field 'archivo').
+    Optional 'formato' (csv|ndjson, default from the file extension) and 'lote' (rows per
+    transaction). Each batch commits on its own, so an error mid-file keeps earlier batches.
+    """
+    archivo = request.FILES.get('archivo')
+    if archivo is None:
+        return JsonResponse({'success': False, 'error': 'Missing archivo file'}, status=400)
+
+    formato = request.POST.get('formato')
+    if not formato:
+        formato = 'csv' if archivo.name.lower().endswith('.csv') else 'ndjson'
+    if formato not in importacion_service.FORMATOS:
+        return JsonResponse({'success': False, 'error': f'formato must be one of {importacion_service.FORMATOS}'}, status=400)
+    try:
+        lote = int(request.POST.get('lote', importacion_service.TAMANO_LOTE))
+        if lote < 1:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'lote must be a positive integer'}, status=400)
+
+    lineas = io.TextIOWrapper(archivo.file, encoding='utf-8-sig', newline='')
+    try:
+        reporte = importacion_service.importar(importacion_service.leer(lineas, formato), lote)
+    except (UnicodeDecodeError, csv.Error) as e:
+        return JsonResponse({'success': False, 'error': f'Unreadable file: {e}'}, status=400)
+    return JsonResponse({'success': True, **reporte})
+
 @require_http_methods(["GET"])
 def inventario_detail(request):
     """Get inventory details (no integrity check needed for read operations)"""
@@ -82,6 +119,8 @@ def inventario_detail(request):
         return JsonResponse({'error': str(e)}, status=404)
 
 @require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
 def inventario_update(request):
     """Update an inventory record with integrity check"""
     try:
@@ -98,6 +137,7 @@ def inventario_update(request):
             'cantidad_disponible': request.POST.get('cantidad_disponible', ''),
             'cantidad_reservada': request.POST.get('cantidad_reservada', ''),
             'ubicacion_id': request.POST.get('ubicacion_id', ''),
+            **nonce_service.campos_firmados(request),
         }
         
         # Verify integrity
@@ -119,6 +159,7 @@ def inventario_update(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 @require_http_methods(["DELETE"])
+@anti_replay()
 def inventario_delete(request):
     """Delete an inventory record with integrity check"""
     try:
@@ -130,7 +171,7 @@ def inventario_delete(request):
             return JsonResponse({'success': False, 'error': 'Missing hash parameter'}, status=400)
         
         # Prepare data to verify
-        data_to_verify = {'inventario_id': inventario_id}
+        data_to_verify = {'inventario_id': inventario_id, **nonce_service.campos_firmados(request)}
         
         # Verify integrity
         if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
@@ -142,6 +183,8 @@ def inventario_delete(request):
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 @require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
 def inventario_reservar(request):
     """
     Reserve product quantity with integrity check
@@ -156,15 +199,9 @@ def inventario_reservar(request):
         'bodega_id': str(request.POST.get('bodega_id')),
         'cantidad': str(request.POST.get('cantidad')),
         'producto_id': str(request.POST.get('producto_id')),
+        **nonce_service.campos_firmados(request),
     }
 
-    # DEBUG PRINTS
-    print("===== INVENTARIO DEBUG =====")
-    print("HASH RECIBIDO:", hash_recibido)
-    print("HASH ESPERADO:", ChecksService.generar_hash_hmac(data_to_verify))
-    print("DATA NORMALIZADO:", data_to_verify)
-    print("============================")
-
     # HASH verification
     if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
         return JsonResponse({
@@ -185,8 +222,11 @@ def inventario_reservar(request):
     if cantidad <= 0:
         return JsonResponse({'success': False, 'error': 'Quantity must be > 0'}, status=400)
 
-    # Reservar
-    inventario = InventarioService.reservar_producto(inventario.id, cantidad)
+    # Reservar (single conditional UPDATE, safe against concurrent reservations)
+    try:
+        inventario = InventarioService.reservar_producto(inventario.id, cantidad)
+    except StockInsuficiente as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
 
     return JsonResponse({
         'success': True,
@@ -196,6 +236,131 @@ def inventario_reservar(request):
     })
 
 @require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
+def inventario_reservar_lote(request):
+    """
+    Reserve every line of an order all-or-nothing with a single integrity check.
+    Accepts either `pedido_id` (reserves its ProductoPedido lines in `bodega_id`)
+    or `lineas`, a JSON list of {producto_id, cantidad[, bodega_id]}.
+    """
+    hash_recibido = request.POST.get('hash')
+
+    if not hash_recibido:
+        return JsonResponse({'success': False, 'error': 'Missing hash parameter'}, status=400)
+
+    try:
+        lineas = json.loads(request.POST.get('lineas') or '[]')
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'lineas must be a JSON list'}, status=400)
+
+    # Canonical payload - the client signs the parsed lines, not the raw string
+    data_to_verify = {
+        'bodega_id': str(request.POST.get('bodega_id', '')),
+        'lineas': lineas,
+        'pedido_id': str(request.POST.get('pedido_id', '')),
+        **nonce_service.campos_firmados(request),
+    }
+
+    if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
+        return JsonResponse({
+            'success': False,
+            'error': 'Hash verification failed'
+        }, status=403)
+
+    bodega_id = data_to_verify['bodega_id'] or None
+    try:
+        if data_to_verify['pedido_id']:
+            if not bodega_id:
+                return JsonResponse({'success': False, 'error': 'bodega_id is required with pedido_id'}, status=400)
+            lineas = Pedido.objects.filter(id=data_to_verify['pedido_id']).first()
+            if not lineas:
+                return JsonResponse({'success': False, 'error': 'Pedido not found'}, status=404)
+        inventarios = InventarioService.reservar_lote(lineas, bodega_id)
+    except Inventario.DoesNotExist as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=404)
+    except StockInsuficiente as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    except (KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': f'Invalid lines: {e}'}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'reservas': [{
+            'inventario_id': inv.id,
+            'producto_id': inv.producto_id,
+            'bodega_id': inv.bodega_id,
+            'disponible': inv.cantidad_disponible,
+            'reservado': inv.cantidad_reservada
+        } for inv in inventarios]
+    })
+
+def _pedido_para_asignar(pedido_id):
+    """The Pedido with its delivery address, or a JsonResponse error"""
+    if not pedido_id:
+        return JsonResponse({'success': False, 'error': 'pedido_id is required'}, status=400)
+    try:
+        pedido = Pedido.objects.select_related('direccion').filter(id=int(pedido_id)).first()
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'pedido_id must be an integer'}, status=400)
+    if not pedido:
+        return JsonResponse({'success': False, 'error': 'Pedido not found'}, status=404)
+    return pedido
+
+@require_http_methods(["GET"])
+def inventario_asignacion(request):
+    """
+    Shipment plan for a Pedido without reserving anything: which bodega sends each line,
+    using as few bodegas as possible and then the closest to its delivery address
+    (see asignacion_service). Lines no bodega can fully cover are split.
+    """
+    pedido = _pedido_para_asignar(request.GET.get('pedido_id'))
+    if isinstance(pedido, JsonResponse):
+        return pedido
+    plan = asignacion_service.asignar_pedido(pedido)
+    return JsonResponse({'success': True, 'pedido_id': pedido.id, **plan})
+
+@require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
+def inventario_asignar(request):
+    """
+    Compute the shipment plan of a Pedido and reserve it all-or-nothing with a single
+    integrity check. Answers 409 with the plan when part of the order has no stock.
+    """
+    hash_recibido = request.POST.get('hash')
+
+    if not hash_recibido:
+        return JsonResponse({'success': False, 'error': 'Missing hash parameter'}, status=400)
+
+    data_to_verify = {
+        'pedido_id': request.POST.get('pedido_id'),
+        **nonce_service.campos_firmados(request),
+    }
+
+    if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
+        return JsonResponse({
+            'success': False,
+            'error': 'Hash verification failed'
+        }, status=403)
+
+    pedido = _pedido_para_asignar(data_to_verify['pedido_id'])
+    if isinstance(pedido, JsonResponse):
+        return pedido
+    try:
+        plan = asignacion_service.asignar_pedido(pedido, reservar=True)
+    except StockInsuficiente as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
+    if not plan['envios'] and not plan['faltantes']:
+        return JsonResponse({'success': False, 'error': 'Pedido has no lines'}, status=400)
+    if not plan['reservado']:
+        return JsonResponse({'success': False, 'error': 'Insufficient stock to fulfill the order',
+                             'pedido_id': pedido.id, **plan}, status=409)
+    return JsonResponse({'success': True, 'pedido_id': pedido.id, **plan})
+
+@require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
 def inventario_liberar_reserva(request):
     """Release reserved quantity with integrity check"""
     try:
@@ -207,6 +372,7 @@ def inventario_liberar_reserva(request):
         data_to_verify = {
             'inventario_id': request.POST.get('inventario_id'),
             'cantidad': request.POST.get('cantidad'),
+            **nonce_service.campos_firmados(request),
         }
         
         if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
@@ -224,10 +390,14 @@ def inventario_liberar_reserva(request):
             'disponible': inventario.cantidad_disponible,
             'reservado': inventario.cantidad_reservada
         })
+    except StockInsuficiente as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 @require_http_methods(["POST"])
+@idempotency_key
+@anti_replay()
 def inventario_confirmar_reserva(request):
     """Confirm a reservation with integrity check"""
     try:
@@ -239,6 +409,7 @@ def inventario_confirmar_reserva(request):
         data_to_verify = {
             'inventario_id': request.POST.get('inventario_id'),
             'cantidad': request.POST.get('cantidad'),
+            **nonce_service.campos_firmados(request),
         }
         
         if not ChecksService.verificar_integridad(hash_recibido, data_to_verify):
@@ -255,49 +426,63 @@ def inventario_confirmar_reserva(request):
             'inventario_id': inventario.id,
             'reservado': inventario.cantidad_reservada
         })
+    except StockInsuficiente as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=409)
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
 # READ operations (no integrity check needed)
 @require_http_methods(["GET"])
 def inventario_bajo_stock(request):
-    """Get inventory with low stock"""
-    umbral = int(request.GET.get('umbral', 10))
+    """Get inventory with low stock (cursor-paginated, see core.pagination)"""
+    try:
+        umbral = entero(request, 'umbral', 10, 0)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     inventarios = InventarioService.obtener_inventario_bajo(umbral)
-    data = [{
-        'id': inv.id,
-        'producto': inv.producto.codigo,
-        'bodega': inv.bodega.nombre,
-        'cantidad_disponible': inv.cantidad_disponible
-    } for inv in inventarios]
-    return JsonResponse(data, safe=False)
+    return paginar(
+        request, inventarios,
+        ('id', 'producto__codigo', 'bodega__nombre', 'cantidad_disponible'),
+        lambda inv: {
+            'id': inv['id'],
+            'producto': inv['producto__codigo'],
+            'bodega': inv['bodega__nombre'],
+            'cantidad_disponible': inv['cantidad_disponible']
+        }
+    )
 
 @require_http_methods(["GET"])
 def inventario_por_bodega(request):
-    """Get all inventory for a bodega"""
+    """Get all inventory for a bodega (cursor-paginated, see core.pagination)"""
     bodega_id = request.GET.get('bodega_id')
     inventarios = InventarioService.obtener_inventario_por_bodega(bodega_id)
-    data = [{
-        'id': inv.id,
-        'producto': inv.producto.codigo,
-        'disponible': inv.cantidad_disponible,
-        'reservado': inv.cantidad_reservada
-    } for inv in inventarios]
-    return JsonResponse(data, safe=False)
+    return paginar(
+        request, inventarios,
+        ('id', 'producto__codigo', 'cantidad_disponible', 'cantidad_reservada'),
+        lambda inv: {
+            'id': inv['id'],
+            'producto': inv['producto__codigo'],
+            'disponible': inv['cantidad_disponible'],
+            'reservado': inv['cantidad_reservada']
+        }
+    )
 
 @require_http_methods(["GET"])
 def inventario_por_producto(request):
-    """Get all inventory locations for a product"""
+    """Get all inventory locations for a product (cursor-paginated, see core.pagination)"""
     producto_id = request.GET.get('producto_id')
     inventarios = InventarioService.obtener_inventario_por_producto(producto_id)
-    data = [{
-        'id': inv.id,
-        'bodega': inv.bodega.nombre,
-        'disponible': inv.cantidad_disponible,
-        'reservado': inv.cantidad_reservada,
-        'ubicacion': inv.ubicacion.codigo if inv.ubicacion else 'N/A'
-    } for inv in inventarios]
-    return JsonResponse(data, safe=False)
+    return paginar(
+        request, inventarios,
+        ('id', 'bodega__nombre', 'cantidad_disponible', 'cantidad_reservada', 'ubicacion__codigo'),
+        lambda inv: {
+            'id': inv['id'],
+            'bodega': inv['bodega__nombre'],
+            'disponible': inv['cantidad_disponible'],
+            'reservado': inv['cantidad_reservada'],
+            'ubicacion': inv['ubicacion__codigo'] or 'N/A'
+        }
+    )
 
 @require_http_methods(["GET"])
 def inventario_disponibilidad_producto(request):
@@ -327,19 +512,44 @@ def inventario_total_stock(request):
 
 @require_http_methods(["GET"])
 def inventario_buscar(request):
-    """Search inventory by product code and/or bodega name"""
+    """Search inventory by product code and/or bodega name (cursor-paginated, see core.pagination)"""
     producto_codigo = request.GET.get('producto_codigo')
     bodega_nombre = request.GET.get('bodega_nombre')
     
     inventarios = InventarioService.buscar_inventario(producto_codigo, bodega_nombre)
-    data = [{
-        'id': inv.id,
-        'producto': inv.producto.codigo,
-        'bodega': inv.bodega.nombre,
-        'disponible': inv.cantidad_disponible,
-        'reservado': inv.cantidad_reservada
-    } for inv in inventarios]
-    return JsonResponse(data, safe=False)
+    return paginar(
+        request, inventarios,
+        ('id', 'producto__codigo', 'bodega__nombre', 'cantidad_disponible', 'cantidad_reservada'),
+        lambda inv: {
+            'id': inv['id'],
+            'producto': inv['producto__codigo'],
+            'bodega': inv['bodega__nombre'],
+            'disponible': inv['cantidad_disponible'],
+            'reservado': inv['cantidad_reservada']
+        }
+    )
+
+@require_http_methods(["GET"])
+def inventario_sugerencias(request):
+    """Ranked product and bodega matches for the search box (?q=, ?limit=)"""
+    texto = (request.GET.get('q') or '').strip()
+    try:
+        limite = min(entero(request, 'limit', 10, 1), 50)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not texto:
+        return JsonResponse({'productos': [], 'bodegas': []})
+    return JsonResponse({
+        'productos': [{
+            'id': p.id,
+            'codigo': p.codigo,
+            'codigo_barras': p.codigo_barras
+        } for p in busqueda_service.buscar_productos(texto, limite)],
+        'bodegas': [{
+            'id': b.id,
+            'nombre': b.nombre
+        } for b in busqueda_service.buscar_bodegas(texto, limite)],
+    })
 
 @require_http_methods(["GET"])
 def inventario_contar(request):
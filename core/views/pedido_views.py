@@ -0,0 +1,76 @@
+# core/views/pedido_views.py
+#
+# Pedidos por estado y cambios de estado. El estado actual está denormalizado en
+# Pedido.estado_actual (core.services.pedido_service), así filtrar por estado es una
+# consulta sobre un índice en vez de buscar el último EstadoPedido de cada pedido.
+
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from core.decorators import require_auth
+from core.models import Pedido
+from core.pagination import paginar
+from core.services import pedido_service
+
+CAMPOS_PEDIDO = ('id', 'estado_actual', 'fecha_estado', 'cliente_id', 'direccion_id', 'precio_calculado')
+
+
+def _serialize_pedido(p):
+    return {
+        'id': p['id'],
+        'estado': p['estado_actual'],
+        'fecha_estado': p['fecha_estado'],
+        'cliente_id': p['cliente_id'],
+        'direccion_id': p['direccion_id'],
+        'precio_calculado': float(p['precio_calculado']),
+    }
+
+
+@require_http_methods(["GET"])
+def pedidos_api(request):
+    """Pedidos paginados por id (ver core.pagination), filtrados por ?estado= si se da."""
+    estado = request.GET.get('estado')
+    if estado and estado not in pedido_service.ESTADOS:
+        return JsonResponse({'error': f"estado debe ser uno de: {', '.join(pedido_service.ESTADOS)}"}, status=400)
+    return paginar(request, pedido_service.pedidos_en_estado(estado), CAMPOS_PEDIDO, _serialize_pedido)
+
+
+@require_http_methods(["GET"])
+def pedidos_estados_api(request):
+    """Cantidad de pedidos en cada estado (una consulta agrupada sobre el índice)."""
+    conteo = pedido_service.conteo_por_estado()
+    return JsonResponse({
+        'estados': {estado: conteo.get(estado, 0) for estado in pedido_service.ESTADOS},
+        'sin_estado': conteo.get(None, 0),
+    })
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@require_auth(required_role='ADMIN')
+def pedido_estado_api(request, pedido_id):
+    """Pasa el pedido a otro estado (JSON body con estado y observacion opcional),
+    validando la transición contra pedido_service.TRANSICIONES."""
+    try:
+        body = json.loads(request.body.decode('utf-8'))
+        estado = body['estado']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'JSON inválido: se requiere estado'}, status=400)
+    claims = getattr(request, 'cognito_claims', {})
+    asignado = claims.get('email') or claims.get('cognito:username') or claims.get('sub') or 'sistema'
+    try:
+        registro = pedido_service.cambiar_estado(pedido_id, estado, asignado=asignado,
+                                                 observacion=body.get('observacion'))
+    except Pedido.DoesNotExist:
+        return JsonResponse({'error': 'Pedido no encontrado'}, status=404)
+    except pedido_service.TransicionInvalida as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse({
+        'id': pedido_id,
+        'estado': registro.nombre,
+        'fecha_estado': registro.fecha_hora,
+        'asignado': registro.asignado,
+    })
@@ -0,0 +1,22 @@
+# core/views/perfil_views.py
+#
+# Reporte del middleware de perfilado (core.middleware.ProfilingMiddleware): percentiles
+# de tiempo, consultas y tamaño de respuesta por endpoint. Solo para administradores.
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from core.decorators import require_auth
+from core.middleware import estadisticas, sample_rate
+
+
+@csrf_exempt
+@require_http_methods(["GET", "DELETE"])
+@require_auth(required_role='ADMIN')
+def perfil_api(request):
+    """GET: percentiles por endpoint del middleware de perfilado. DELETE: reinicia las estadísticas."""
+    if request.method == 'DELETE':
+        estadisticas.limpiar()
+        return JsonResponse({'reiniciado': True})
+    return JsonResponse({'sample_rate': sample_rate(), 'endpoints': estadisticas.reporte()})
@@ -0,0 +1,111 @@
+# core/views/tarea_views.py
+#
+# Cola de tareas logísticas por bodega (core.services.tareas_service). Cada trabajador
+# (alistador, verificador o empacador) reclama la siguiente tarea de su tipo en su
+# bodega, la renueva mientras trabaja y la completa; si deja de renovarla, el lease
+# vence y la tarea vuelve a la cola. El trabajador es siempre el dueño del token: se
+# busca por el `sub` verificado (Usuario.cognito_sub), nunca por un id del body.
+
+import json
+
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from core.decorators import require_auth
+from core.services import tareas_service
+
+
+def _serialize_tarea(t):
+    return {
+        'id': t.id,
+        'tipo': t.tipo,
+        'estado': t.estado,
+        'prioridad': t.prioridad,
+        'bodega_id': t.bodega_id,
+        'pedido_id': t.pedido_id,
+        'fecha_asignacion': t.fecha_asignacion,
+        'vence_reclamo': t.vence_reclamo,
+        'reclamos': t.reclamos,
+    }
+
+
+def _trabajador(request):
+    """(rol, trabajador_id, bodega_id) del que llama: el rol del JSON body y el trabajador
+    de ese rol asociado al `sub` del token. Si no, una respuesta 400 o 403."""
+    try:
+        rol = json.loads(request.body.decode('utf-8'))['rol']
+    except (ValueError, KeyError, TypeError):
+        return None, JsonResponse({'error': 'JSON inválido: se requiere rol'}, status=400)
+    if rol not in tareas_service.ROLES:
+        return None, JsonResponse({'error': f"rol debe ser uno de: {', '.join(tareas_service.ROLES)}"}, status=400)
+    modelo = tareas_service.ROLES[rol][0]
+    try:
+        trabajador_id, bodega_id = tareas_service.trabajador_de(rol, request.cognito_claims.get('sub'))
+    except modelo.DoesNotExist:
+        return None, JsonResponse({'error': f'El usuario no es un {rol}'}, status=403)
+    return (rol, trabajador_id, bodega_id), None
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@require_auth()
+def tarea_reclamar_api(request):
+    """Reclama la siguiente tarea pendiente de la bodega del trabajador (JSON body con
+    su rol). {'tarea': null} si la cola está vacía."""
+    trabajador, error = _trabajador(request)
+    if error:
+        return error
+    rol, trabajador_id, bodega_id = trabajador
+    if bodega_id is None:
+        return JsonResponse({'error': f'El {rol} no tiene bodega asignada'}, status=409)
+    tarea = tareas_service.reclamar(bodega_id, rol, trabajador_id)
+    return JsonResponse({'tarea': _serialize_tarea(tarea) if tarea else None})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@require_auth()
+def tarea_renovar_api(request, tarea_id):
+    """Extiende el lease de una tarea reclamada por el trabajador."""
+    trabajador, error = _trabajador(request)
+    if error:
+        return error
+    rol, trabajador_id, _ = trabajador
+    try:
+        vence = tareas_service.renovar(tarea_id, rol, trabajador_id)
+    except tareas_service.ReclamoInvalido as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse({'id': tarea_id, 'vence_reclamo': vence})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@require_auth()
+def tarea_completar_api(request, tarea_id):
+    """Marca COMPLETADA una tarea reclamada por el trabajador."""
+    trabajador, error = _trabajador(request)
+    if error:
+        return error
+    rol, trabajador_id, _ = trabajador
+    try:
+        tareas_service.completar(tarea_id, rol, trabajador_id)
+    except tareas_service.ReclamoInvalido as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse({'id': tarea_id, 'estado': tareas_service.COMPLETADA})
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+@require_auth()
+def tarea_soltar_api(request, tarea_id):
+    """Devuelve a la cola una tarea reclamada por el trabajador."""
+    trabajador, error = _trabajador(request)
+    if error:
+        return error
+    rol, trabajador_id, _ = trabajador
+    try:
+        tareas_service.soltar(tarea_id, rol, trabajador_id)
+    except tareas_service.ReclamoInvalido as e:
+        return JsonResponse({'error': str(e)}, status=409)
+    return JsonResponse({'id': tarea_id, 'estado': tareas_service.PENDIENTE})
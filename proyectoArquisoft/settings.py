@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -79,8 +80,60 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Take the write lock when a transaction starts so select_for_update()
+        # batches (e.g. InventarioService.reservar_lote) serialize instead of
+        # failing with "database is locked" on the read -> write upgrade.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        # Tests with several threads writing at once (TransactionTestCase) need a file:
+        # on the default in-memory test database they fail with "table is locked"
+        # instead of waiting for the write lock.
+        "TEST": {"NAME": BASE_DIR / "test_db.sqlite3"},
     }
 }
+# Dashboard API responses are cached per endpoint/bodega and invalidated by
+# version counters (core.services.cache_service). Uses the default cache backend.
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Perfilado por endpoint (core.middleware.ProfilingMiddleware, reporte en /api/perfil/).
+# Con PROFILING_ENABLED = False el middleware se descarta al arrancar; en producción
+# basta una tasa de muestreo baja.
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+PROFILING_WINDOW = 500  # muestras por endpoint para los percentiles
+PROFILING_SERVER_TIMING = True  # header solo para staff (o con DEBUG)
+
+# Protección contra repetición de peticiones firmadas (core.decorators.anti_replay).
+# Los clientes pueden firmar también `nonce` y `timestamp`; mientras REPLAY_NONCE_REQUIRED
+# sea False se aceptan aún peticiones sin ellos (transición: pasarlo a True cuando todos
+# los clientes los envíen). MemoriaNonces es por proceso: con varios workers usar
+# 'core.services.nonce_service.CacheNonces' sobre un cache compartido. Con
+# REPLAY_MAX_NONCES vigentes, MemoriaNonces responde 503 a los nonces nuevos.
+REPLAY_NONCE_REQUIRED = False
+REPLAY_WINDOW = 300  # segundos de desfase aceptados en el timestamp
+REPLAY_NONCE_STORE = 'core.services.nonce_service.MemoriaNonces'
+REPLAY_MAX_NONCES = 100_000
+
+# Respuestas guardadas por Idempotency-Key (core.decorators.idempotency_key). Las
+# vencidas se borran con `manage.py limpiar_idempotencia` (p. ej. cada hora por cron).
+IDEMPOTENCY_TTL = 24 * 3600
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT = 60  # segundos tras los que una petición en curso se da por abandonada
+
+# Hilos (cada uno con su conexión) en los que las vistas de core.views.async_views corren
+# consultas independientes a la vez, p. ej. las secciones de /async/api/dashboard/.
+ASYNC_DB_THREADS = 16
+
+# Cambios de stock en vivo (/api/eventos/stock/, core.services.eventos_service). El broker
+# en memoria solo reparte los cambios hechos en el mismo proceso que sirve el flujo (ASGI):
+# con varios workers se reemplaza por uno externo con la misma interfaz.
+STOCK_EVENTS_BROKER = 'core.services.eventos_service.MemoriaEventos'
+STOCK_EVENTS_QUEUE = 1000  # eventos pendientes por cliente antes de pedirle releer (resync)
+STOCK_EVENTS_HEARTBEAT = 15  # segundos sin eventos entre comentarios de keep-alive
+
+# Cola de tareas logísticas (core.services.tareas_service). Una tarea reclamada cuyo lease
+# vence sin renovarse vuelve a la cola en el siguiente reclamo de su bodega, o con
+# `manage.py liberar_tareas_vencidas` (p. ej. cada minuto por cron).
+TAREAS_LEASE_SEGUNDOS = 300
+
 COGNITO_REGION = "us-east-1"
 COGNITO_USER_POOL_ID = "us-east-1_tPnCimwiB"
 COGNITO_APP_CLIENT_ID = "593e5kv7f4fm12vmpldkfbe85e"